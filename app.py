@@ -1,11 +1,19 @@
 import streamlit as st
-import pandas as pd
 import math
+import functools
+import importlib.util
+import logging
+import os
+import threading
+import time
 from datetime import datetime # Import datetime here
 
-# Import functions from nb.py and db_funcs.py
-from nb import naive_bayes_diagnosis
-from db_funcs import init_connection, get_table_data, get_tables, get_row_count, get_disease_details_by_code, insert_new_case_to_db
+# Modul berat (pandas, numpy, mysql.connector lewat db_funcs, nb, fc) diimpor saat pertama kali dipakai,
+# sehingga pertanyaan pertama tampil tanpa menunggu modul tersebut (lihat startup.py)
+from metrics import metrics, start_file_exporter
+from catalog import load_catalog, DEFAULT_CATALOG_PATH
+
+logger = logging.getLogger(__name__)
 
 # Konfigurasi halaman
 st.set_page_config(
@@ -14,31 +22,63 @@ st.set_page_config(
     layout="wide"
 )
 
+# Pilihan jumlah baris per halaman pada menu Database
+PAGE_SIZES = [25, 50, 100, 500]
+
+# Ekspor Parquet hanya ditawarkan jika pyarrow terpasang
+PARQUET_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+# Durasi render halaman dicatat ke metrics (lihat Panel Diagnostik di sidebar)
+render_start = time.perf_counter()
+
+# Setelah render pertama, modul berat diimpor dan model serta aturan dibangun di thread latar
+# (sekali per proses), sehingga tombol analisis tidak perlu menunggu. WARMUP=0 untuk mematikan.
+@st.cache_resource
+def start_warmup():
+    def run():
+        try:
+            import nb
+            import fc
+            nb.get_model()
+            fc.get_rule_engine()
+        except Exception:
+            logger.exception("Warmup failed; the model and rules will be built on first use")
+    thread = threading.Thread(target=run, name='warmup', daemon=True)
+    thread.start()
+    return thread
+
+# Watcher perubahan case base (watcher.py) dinyalakan terpisah dari pemanasan, juga di thread latar agar
+# import modulnya tidak menunda render pertama. MODEL_WATCH_INTERVAL=0 untuk mematikan.
+@st.cache_resource
+def start_watcher():
+    def run():
+        try:
+            from watcher import start_model_watcher
+            start_model_watcher()
+        except Exception:
+            logger.exception("Could not start the model watcher")
+    thread = threading.Thread(target=run, name='watcher-start', daemon=True)
+    thread.start()
+    return thread
+
+# Jika METRICS_FILE diset, metrics ditulis berkala ke file tersebut dalam format teks Prometheus
+@st.cache_resource
+def init_metrics_exporter(path):
+    return start_file_exporter(path)
+
+if os.environ.get('METRICS_FILE'):
+    init_metrics_exporter(os.environ['METRICS_FILE'])
+
+# Katalog gejala (kode gejala dan teks pertanyaan) dibaca sekali dari tabel gejala dan di-cache lintas sesi.
+# KNOWLEDGE_BASE=knowledge_base.spkb: katalog, model, dan aturan dibaca dari artefak terkompilasi
+# (python knowledge.py build), diagnosis berjalan tanpa database
+catalog = load_catalog(os.environ.get('KNOWLEDGE_BASE') or DEFAULT_CATALOG_PATH)
+
 # Initialize session states if not already present
-if 'questions' not in st.session_state:
-    st.session_state.questions = [
-        "Apakah Anda mual dan muntah?",
-        "Apakah Anda hilang nafsu makan?",
-        "Apakah Anda kesulitan menelan makanan?",
-        "Apakah Anda nyeri pada tulang dada?",
-        "Apakah Anda nyeri pada punggung?",
-        "Apakah Anda merasakan pahit pada lidah?",
-        "Apakah Anda cepat merasa kenyang?",
-        "Apakah perut Anda kembung?",
-        "Apakah perut terasa nyeri atau mulas?",
-        "Apakah tinja Anda berwarna hitam pekat saat buang air besar?",
-        "Apakah Anda mengalami gangguan pencernaan?",
-        "Apakah Anda mengalami muntah darah?",
-        "Apakah Anda sering bersendawa?",
-        "Apakah Anda mengalami penurunan berat badan tanpa sebab?",
-        "Apakah Anda kekurangan sel darah merah/Anemia?",
-        "Apakah Anda mengalami keringat dingin?",
-        "Apakah Anda merasa lemah?",
-        "Apakah Anda perut terasa penuh?",
-        "Apakah Anda tidak nyaman setelah makan?",
-        "Apakah Anda merasa perih diperut bagian atas?",
-        "Apakah keluar cairan dari lambung?"
-    ]
+# Jawaban ke-i adalah jawaban untuk gejala question_codes[i]
+if 'questions' not in st.session_state or 'question_codes' not in st.session_state:
+    st.session_state.questions = catalog.questions
+    st.session_state.question_codes = catalog.codes
 
 # Inisialisasi jawaban jika belum ada
 if 'answers' not in st.session_state:
@@ -54,6 +94,13 @@ if 'diagnosis_complete' not in st.session_state:
 if 'diagnosis_result' not in st.session_state:
     st.session_state.diagnosis_result = None
 
+if 'fc_result' not in st.session_state:
+    st.session_state.fc_result = None
+
+# Urutan indeks pertanyaan yang sudah ditanyakan (dipakai tombol kembali pada mode adaptif)
+if 'asked' not in st.session_state:
+    st.session_state.asked = []
+
 # Fungsi untuk menampilkan progress bar
 def show_progress():
     progress = (st.session_state.current_step + 1) / len(st.session_state.questions)
@@ -64,163 +111,155 @@ def show_progress():
     with col2:
         st.caption(f"Progress: {progress*100:.1f}%")
 
-# Sidebar untuk navigasi
-with st.sidebar:
-    st.title("📊 Menu Navigasi")
-    selected_menu = st.selectbox(
-        "Pilih Menu:",
-        ["Database", "Sistem Pakar"],
-        key="menu_select"
-    )
-
-    if selected_menu == "Database":
-        st.subheader("Database Operations")
-        st.write("Pilih tabel dari database untuk melihat data")
-    if selected_menu == "Sistem Pakar":
-        st.subheader("Tahapan Diagnosis")
-        st.write("1. Jawab pertanyaan gejala")
-        st.write("2. Analisis dengan Naive Bayes")
-        st.write("3. Hasil diagnosis")
+# Fungsi untuk menentukan indeks pertanyaan yang sedang ditampilkan
+def current_question_index():
+    if st.session_state.get('adaptive_mode'):
+        from nb import next_question_index
+        return next_question_index(st.session_state.answers, st.session_state.get('stop_threshold', 0.95),
+                                   st.session_state.question_codes)
+    return st.session_state.current_step
+
+# Callback tombol jawaban: mencatat jawaban dan lanjut ke pertanyaan berikutnya
+# (dijalankan sebelum fragment pertanyaan dirender ulang, sehingga tidak perlu st.rerun)
+def answer_question(question_index, answer):
+    st.session_state.answers[question_index] = answer
+    # Riwayat hanya dibutuhkan tombol kembali pada mode adaptif; mode berurutan cukup memakai current_step
+    if st.session_state.get('adaptive_mode'):
+        st.session_state.asked.append(question_index)
+    st.session_state.current_step += 1
+
+# Callback tombol kembali ke pertanyaan sebelumnya
+def previous_question():
+    if st.session_state.get('adaptive_mode') and st.session_state.asked:
+        st.session_state.answers[st.session_state.asked.pop()] = None
+    st.session_state.current_step -= 1
+
+# Kunci session state yang dihapus saat diagnosis direset
+DIAGNOSIS_STATE_KEYS = ['answers', 'current_step', 'diagnosis_complete', 'diagnosis_result', 'fc_result', 'asked', 'disease_details']
+
+# Fungsi untuk mengambil informasi penyakit sekali per hasil diagnosis (disimpan di session state,
+# sehingga rerun halaman hasil tidak meminjam koneksi database lagi)
+def disease_details_for(kode_penyakit):
+    cached = st.session_state.get('disease_details')
+    if cached is None or cached[0] != kode_penyakit:
+        from db_funcs import get_connection, get_disease_details_by_code
+        disease_details = None
+        with get_connection() as conn:
+            if conn:
+                disease_details = get_disease_details_by_code(conn, kode_penyakit)
+        st.session_state.disease_details = (kode_penyakit, disease_details)
+    return st.session_state.disease_details[1]
+
+# Fungsi untuk menampilkan panel diagnostik: histogram fase diagnosis, render halaman, dan query database
+def show_metrics_panel():
+    import pandas as pd
+    with st.expander("⏱️ Panel Diagnostik", expanded=True):
+        for title, name in [("Fase Diagnosis", 'diagnosis_phase_seconds'),
+                            ("Pembangunan Model", 'model_build_phase_seconds'),
+                            ("Render Halaman", 'page_render_seconds')]:
+            summary = metrics.summary(name)
+            if summary:
+                st.write(f"**{title}**")
+                st.dataframe(pd.DataFrame(summary).round(3), hide_index=True, use_container_width=True)
+
+        queries = metrics.summary('query_seconds')
+        if queries:
+            st.write("**Query Database**")
+            for row in queries:
+                row['baris'] = metrics.counter('query_rows_total', query=row['query'])
+                row['bytes'] = metrics.counter('query_bytes_total', query=row['query'])
+            st.dataframe(pd.DataFrame(queries).round(3), hide_index=True, use_container_width=True)
+            st.write("**Query Terakhir**")
+            st.dataframe(pd.DataFrame(list(metrics.recent_queries)[::-1]).round(3), hide_index=True, use_container_width=True)
+
+        # Cache hasil diagnosis lintas sesi (pola jawaban berulang tidak dihitung ulang)
+        from nb import diagnosis_cache
+        cache_stats = diagnosis_cache.stats()
+        st.write(f"**Cache Diagnosis:** {cache_stats['hits']} hit / {cache_stats['misses']} miss "
+                 f"({cache_stats['hit_rate']*100:.1f}%), {cache_stats['size']}/{cache_stats['maxsize']} entri, "
+                 f"{cache_stats['invalidations']} dibuang karena model berubah")
+
+        st.download_button("📥 Metrics (Prometheus)", data=metrics.render_prometheus(),
+                           file_name="metrics.prom", mime="text/plain", key="download_metrics")
+        if st.button("🧹 Reset Metrics", key="reset_metrics"):
+            metrics.reset()
+            st.rerun()
 
-    st.divider()
+# Fragment pertanyaan: klik Ya/Tidak/Lewati/Kembali hanya merender ulang pertanyaan dan progress bar,
+# bukan seluruh app.py (sidebar, summary jawaban, dan halaman lain)
+@st.fragment
+def question_step():
+    with metrics.timer('page_render_seconds', page='Sistem Pakar/pertanyaan'):
+        question_index = None
+        if st.session_state.current_step < len(st.session_state.questions):
+            question_index = current_question_index()
 
-    # Tampilkan status diagnosis
-    if st.session_state.diagnosis_complete:
-        st.success("✅ Diagnosis Selesai")
-        if st.session_state.diagnosis_result:
-            st.write(f"Hasil: {st.session_state.diagnosis_result['nama_penyakit']}")
-    else:
-        st.info("🔍 Diagnosis Berlangsung")
-        st.write(f"Pertanyaan: {st.session_state.current_step + 1}/{len(st.session_state.questions)}")
+        if question_index is None:
+            # Semua pertanyaan sudah dijawab (atau mode adaptif: tidak perlu pertanyaan lagi),
+            # halaman ringkasan dirender lewat rerun penuh
+            st.session_state.current_step = len(st.session_state.questions)
+            st.rerun()
 
-    # Tombol reset
-    if st.button("🔄 Reset Diagnosis", type="secondary"):
-        for key in ['answers', 'current_step', 'diagnosis_complete', 'diagnosis_result']:
-            if key in st.session_state:
-                del st.session_state[key]
-        st.rerun()
+        st.subheader("📋 Pertanyaan Gejala")
+        show_progress()
 
-    st.caption("Sistem Pakar v1.0")
+        # Tampilkan pertanyaan
+        question = st.session_state.questions[question_index]
+        st.markdown(f"### {question}")
 
+        # Pilihan jawaban
+        col1, col2, col3 = st.columns([1, 1, 2])
 
-if selected_menu == "Sistem Pakar":
-    # Judul halaman
-    st.title("🦾 Sistem Pakar - Diagnosis Penyakit Lambung")
-    st.markdown("---")
+        with col1:
+            st.button("✅ Ya", use_container_width=True, type="primary",
+                      on_click=answer_question, args=(question_index, 'Ya'))
 
-    # Tampilkan berdasarkan status
-    if not st.session_state.diagnosis_complete:
-        # Tampilkan pertanyaan saat ini
-        if st.session_state.current_step < len(st.session_state.questions):
-            st.subheader("📋 Pertanyaan Gejala")
-            show_progress()
-
-            # Tampilkan pertanyaan
-            question = st.session_state.questions[st.session_state.current_step]
-            st.markdown(f"### {question}")
-
-            # Pilihan jawaban
-            col1, col2, col3 = st.columns([1, 1, 2])
-
-            with col1:
-                if st.button("✅ Ya", use_container_width=True, type="primary"):
-                    st.session_state.answers[st.session_state.current_step] = 'Ya'
-                    st.session_state.current_step += 1
-                    st.rerun()
-
-            with col2:
-                if st.button("❌ Tidak", use_container_width=True, type="secondary"):
-                    st.session_state.answers[st.session_state.current_step] = 'Tidak'
-                    st.session_state.current_step += 1
-                    st.rerun()
-
-            with col3:
-                # Tombol skip (opsional)
-                if st.button("⏭️ Lewati", use_container_width=True):
-                    st.session_state.answers[st.session_state.current_step] = 'Tidak Diketahui'
-                    st.session_state.current_step += 1
-                    st.rerun()
-
-            # Tampilkan summary jawaban
-            st.divider()
-            with st.expander("📊 Summary Jawaban Sementara"):
-                answered = sum(1 for ans in st.session_state.answers if ans is not None)
-                ya_count = sum(1 for ans in st.session_state.answers if ans == 'Ya')
-
-                col_sum1, col_sum2, col_sum3 = st.columns(3)
-                with col_sum1:
-                    st.metric("Total Pertanyaan", len(st.session_state.questions))
-                with col_sum2:
-                    st.metric("Sudah Dijawab", answered)
-                with col_sum3:
-                    st.metric("Gejala 'Ya'", ya_count)
-
-                # Tampilkan jawaban sebelumnya
-                if answered > 0:
-                    st.write("**Jawaban terakhir:**")
-                    for i, (q, a) in enumerate(zip(st.session_state.questions[:answered],
-                                                  st.session_state.answers[:answered])):
-                        if a:
-                            st.write(f"{i+1}. {q} → **{a}**")
-
-            # Tombol kembali
-            if st.session_state.current_step > 0:
-                st.divider()
-                if st.button("↩️ Kembali ke Pertanyaan Sebelumnya"):
-                    st.session_state.current_step -= 1
-                    st.rerun()
+        with col2:
+            st.button("❌ Tidak", use_container_width=True, type="secondary",
+                      on_click=answer_question, args=(question_index, 'Tidak'))
 
-        else:
-            # Semua pertanyaan sudah dijawab, tampilkan summary dan tombol analisis
-            st.success("✅ Semua pertanyaan telah dijawab!")
+        with col3:
+            # Tombol skip (opsional)
+            st.button("⏭️ Lewati", use_container_width=True,
+                      on_click=answer_question, args=(question_index, 'Tidak Diketahui'))
 
-            st.subheader("📊 Ringkasan Jawaban Anda")
-
-            # Hitung statistik
-            ya_count = sum(1 for ans in st.session_state.answers if ans == 'Ya')
-            tidak_count = sum(1 for ans in st.session_state.answers if ans == 'Tidak')
-            unknown_count = sum(1 for ans in st.session_state.answers if ans == 'Tidak Diketahui')
-
-            col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
-            with col_stat1:
-                st.metric("Total Gejala", len(st.session_state.answers))
-            with col_stat2:
-                st.metric("Gejala 'Ya'", ya_count)
-            with col_stat3:
-                st.metric("Gejala 'Tidak'", tidak_count)
-            with col_stat4:
-                st.metric("Tidak Diketahui", unknown_count)
-
-            # Tampilkan detail jawaban
-            with st.expander("📋 Lihat Detail Jawaban"):
-                for i, (question, answer) in enumerate(zip(st.session_state.questions, st.session_state.answers)):
-                    if answer == 'Ya':
-                        st.markdown(f"**{i+1}. {question}** → ✅ {answer}")
-                    elif answer == 'Tidak':
-                        st.markdown(f"**{i+1}. {question}** → ❌ {answer}")
-                    else:
-                        st.markdown(f"**{i+1}. {question}** → ❓ {answer}")
+        # Tampilkan summary jawaban (fragment bersarang, ikut diperbarui setiap pertanyaan dijawab)
+        answer_summary()
 
+        # Tombol kembali
+        if st.session_state.current_step > 0:
             st.divider()
+            st.button("↩️ Kembali ke Pertanyaan Sebelumnya", on_click=previous_question)
 
-            # Tombol untuk memulai analisis
-            st.subheader("🔬 Analisis Naive Bayes")
-            st.write("Klik tombol di bawah untuk memulai analisis menggunakan algoritma Naive Bayes:")
-
-            if st.button("🚀 Mulai Analisis", type="primary", use_container_width=True):
-                with st.spinner("Menganalisis gejala menggunakan Naive Bayes..."):
-                    # Panggil fungsi Naive Bayes
-                    result = naive_bayes_diagnosis(st.session_state.answers)
-                    if result:
-                        st.session_state.diagnosis_result = result
-                        st.session_state.diagnosis_complete = True
-                        st.rerun()
-                    else:
-                        st.error("Gagal melakukan diagnosis. Silakan coba lagi.")
-
-    else:
-        # Tampilkan hasil diagnosis
-        result = st.session_state.diagnosis_result
+# Fragment summary jawaban sementara; isinya hanya dirender saat ditampilkan
+# (isi st.expander tetap dieksekusi walaupun tertutup), membuka/menutupnya tidak merender ulang pertanyaan
+@st.fragment
+def answer_summary():
+    st.divider()
+    if st.toggle("📊 Summary Jawaban Sementara", key="show_summary"):
+        answered = sum(1 for ans in st.session_state.answers if ans is not None)
+        ya_count = sum(1 for ans in st.session_state.answers if ans == 'Ya')
+
+        col_sum1, col_sum2, col_sum3 = st.columns(3)
+        with col_sum1:
+            st.metric("Total Pertanyaan", len(st.session_state.questions))
+        with col_sum2:
+            st.metric("Sudah Dijawab", answered)
+        with col_sum3:
+            st.metric("Gejala 'Ya'", ya_count)
+
+        # Tampilkan jawaban sebelumnya
+        if answered > 0:
+            st.write("**Jawaban terakhir:**")
+            for i, (q, a) in enumerate(zip(st.session_state.questions,
+                                          st.session_state.answers)):
+                if a:
+                    st.write(f"{i+1}. {q} → **{a}**")
+
+# Fragment halaman hasil: tombol di dalamnya (mis. Cetak Hasil) tidak menjalankan ulang seluruh app.py
+@st.fragment
+def result_page(result):
+    with metrics.timer('page_render_seconds', page='Sistem Pakar/hasil'):
 
         st.success("🎉 Diagnosis Selesai!")
 
@@ -239,6 +278,13 @@ if selected_menu == "Sistem Pakar":
             # Progress bar untuk confidence
             st.progress(result['confidence'])
 
+            # Hasil Forward Chaining (aturan IF ... THEN yang terpenuhi)
+            fc_result = st.session_state.fc_result
+            if fc_result and fc_result['aturan_terpenuhi']:
+                st.markdown(f"**Aturan Forward Chaining terpenuhi:** {', '.join(fc_result['aturan_terpenuhi'])}")
+            elif fc_result:
+                st.caption("Tidak ada aturan Forward Chaining yang terpenuhi sepenuhnya.")
+
         with col_result2:
             st.metric("Gejala Terdeteksi", f"{result['gejala_terdeteksi']}/{result['total_gejala']}")
             st.metric("Status", "✅ Terdeteksi")
@@ -248,12 +294,8 @@ if selected_menu == "Sistem Pakar":
         # Informasi penyakit (hardcoded for P01 - GERD) - This part will need to be dynamic later
         st.subheader("ℹ️ Informasi Penyakit")
 
-        # Fetch dynamic disease details
-        conn = init_connection()
-        disease_details = None
-        if conn:
-            disease_details = get_disease_details_by_code(conn, result['kode_penyakit'])
-            conn.close()
+        # Fetch dynamic disease details (sekali per hasil diagnosis)
+        disease_details = disease_details_for(result['kode_penyakit'])
 
         if disease_details:
             st.markdown(f"**{disease_details['nama_penyakit']}**\n\n{disease_details['deskripsi']}")
@@ -315,129 +357,272 @@ if selected_menu == "Sistem Pakar":
         st.divider() # Add divider after the new button section to maintain layout
 
         if st.button("🔄 Diagnosis Baru", use_container_width=True, type="primary"):
-            for key in ['answers', 'current_step', 'diagnosis_complete', 'diagnosis_result']:
+            for key in DIAGNOSIS_STATE_KEYS:
                 if key in st.session_state:
                     del st.session_state[key]
             st.rerun()
 
-    # Footer
-    st.markdown("---")
-    st.caption("⚠️ **Disclaimer:** Hasil diagnosis ini hanya sebagai referensi. Silakan konsultasi dengan dokter untuk diagnosa dan pengobatan yang tepat.")
-if selected_menu == "Database":
-    # Judul halaman
-    st.title("📑 Menu Database")
-    st.markdown("---")
+# Sidebar untuk navigasi
+with st.sidebar:
+    st.title("📊 Menu Navigasi")
+    selected_menu = st.selectbox(
+        "Pilih Menu:",
+        ["Database", "Sistem Pakar"],
+        key="menu_select"
+    )
 
-    # Membuat koneksi database
-    connection = init_connection()
+    if selected_menu == "Database":
+        st.subheader("Database Operations")
+        st.write("Pilih tabel dari database untuk melihat data")
+    if selected_menu == "Sistem Pakar":
+        st.subheader("Tahapan Diagnosis")
+        st.write("1. Jawab pertanyaan gejala")
+        st.write("2. Analisis dengan Forward Chaining dan Naive Bayes")
+        st.write("3. Hasil diagnosis")
 
-    if connection:
-        if connection.is_connected():
-            st.success("✅ Terhubung ke database MySQL!")
+        # Mode adaptif: pertanyaan paling informatif lebih dulu, berhenti jika diagnosis sudah cukup yakin
+        st.toggle("Mode Adaptif", key="adaptive_mode",
+                  help="Pilih pertanyaan paling informatif berikutnya dan berhenti lebih awal jika hasil sudah pasti")
+        if st.session_state.get('adaptive_mode'):
+            st.slider("Ambang Keyakinan", min_value=0.5, max_value=0.99, value=0.95, step=0.01, key="stop_threshold")
 
-            # Dapatkan daftar tabel
-            tables = get_tables(connection)
+    st.divider()
 
-            if tables:
-                # Membuat tabs untuk setiap tabel
-                tabs = st.tabs([f"📋 {table}" for table in tables])
+    # Tampilkan status diagnosis
+    if st.session_state.diagnosis_complete:
+        st.success("✅ Diagnosis Selesai")
+        if st.session_state.diagnosis_result:
+            st.write(f"Hasil: {st.session_state.diagnosis_result['nama_penyakit']}")
+    else:
+        # Nomor pertanyaan di sini diperbarui saat rerun penuh; progress terkini ada di fragment pertanyaan
+        st.info("🔍 Diagnosis Berlangsung")
+        st.write(f"Pertanyaan: {st.session_state.current_step + 1}/{len(st.session_state.questions)}")
 
-                for i, table_name in enumerate(tables):
-                    with tabs[i]:
-                        col1, col2, col3 = st.columns([2, 1, 1])
+    # Tombol reset
+    if st.button("🔄 Reset Diagnosis", type="secondary"):
+        for key in DIAGNOSIS_STATE_KEYS:
+            if key in st.session_state:
+                del st.session_state[key]
+        st.rerun()
 
-                        with col1:
-                            st.subheader(f"Tabel: {table_name}")
+    if st.toggle("Panel Diagnostik", key="show_metrics", help="Tampilkan waktu per fase diagnosis dan per query database"):
+        show_metrics_panel()
 
-                        # Hitung jumlah baris
-                        row_count = get_row_count(connection, table_name)
+    st.caption("Sistem Pakar v1.0")
 
-                        with col2:
-                            st.metric("Jumlah Baris", row_count)
 
-                        with col3:
-                            if st.button("🔄 Refresh", key=f"refresh_{table_name}"):
-                                st.rerun()
+if selected_menu == "Sistem Pakar":
+    # Judul halaman
+    st.title("🦾 Sistem Pakar - Diagnosis Penyakit Lambung")
+    st.markdown("---")
 
-                        # Ambil data tabel
-                        df = get_table_data(connection, table_name)
+    # Tampilkan berdasarkan status
+    if not st.session_state.diagnosis_complete:
+        if st.session_state.current_step < len(st.session_state.questions):
+            question_step()
+        else:
+            # Semua pertanyaan sudah dijawab, tampilkan summary dan tombol analisis
+            if any(ans is None for ans in st.session_state.answers):
+                st.success("✅ Jawaban sudah cukup untuk diagnosis, pertanyaan lainnya tidak perlu ditanyakan!")
+            else:
+                st.success("✅ Semua pertanyaan telah dijawab!")
 
-                        if not df.empty:
-                            # Tampilkan dataframe
-                            st.dataframe(
-                                df,
-                                use_container_width=True,
-                                hide_index=True
-                            )
+            st.subheader("📊 Ringkasan Jawaban Anda")
 
-                            # Tombol untuk melihat statistik
-                            with st.expander("📊 Lihat Statistik"):
-                                col_stat1, col_stat2, col_stat3 = st.columns(3)
+            # Hitung statistik
+            ya_count = sum(1 for ans in st.session_state.answers if ans == 'Ya')
+            tidak_count = sum(1 for ans in st.session_state.answers if ans == 'Tidak')
+            unknown_count = sum(1 for ans in st.session_state.answers if ans == 'Tidak Diketahui')
 
-                                with col_stat1:
-                                    st.write("**Info Kolom:**")
-                                    for col in df.columns:
-                                        st.write(f"• {col}")
+            col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
+            with col_stat1:
+                st.metric("Total Gejala", len(st.session_state.answers))
+            with col_stat2:
+                st.metric("Gejala 'Ya'", ya_count)
+            with col_stat3:
+                st.metric("Gejala 'Tidak'", tidak_count)
+            with col_stat4:
+                st.metric("Tidak Diketahui", unknown_count)
 
-                                with col_stat2:
-                                    st.write("**Tipe Data:**")
-                                    for col in df.columns:
-                                        dtype = str(df[col].dtype)
-                                        st.write(f"• {dtype}")
+            # Tampilkan detail jawaban
+            with st.expander("📋 Lihat Detail Jawaban"):
+                for i, (question, answer) in enumerate(zip(st.session_state.questions, st.session_state.answers)):
+                    if answer == 'Ya':
+                        st.markdown(f"**{i+1}. {question}** → ✅ {answer}")
+                    elif answer == 'Tidak':
+                        st.markdown(f"**{i+1}. {question}** → ❌ {answer}")
+                    elif answer is None:
+                        st.markdown(f"**{i+1}. {question}** → ➖ Tidak Ditanyakan")
+                    else:
+                        st.markdown(f"**{i+1}. {question}** → ❓ {answer}")
 
-                                with col_stat3:
-                                    st.write("**Statistik:**")
-                                    st.write(f"Total Baris: {len(df)}")
-                                    st.write(f"Total Kolom: {len(df.columns)}")
+            st.divider()
 
-                            # Tombol untuk ekspor data
-                            col_export1, col_export2 = st.columns(2)
+            # Tombol untuk memulai analisis
+            st.subheader("🔬 Analisis Naive Bayes")
+            st.write("Klik tombol di bawah untuk memulai analisis menggunakan algoritma Naive Bayes:")
 
-                            with col_export1:
-                                csv = df.to_csv(index=False).encode('utf-8')
-                                st.download_button(
-                                    label="📥 Download CSV",
-                                    data=csv,
-                                    file_name=f"{table_name}.csv",
-                                    mime="text/csv",
-                                    key=f"csv_{table_name}"
-                                )
+            if st.button("🚀 Mulai Analisis", type="primary", use_container_width=True):
+                with st.spinner("Menganalisis gejala menggunakan Naive Bayes..."):
+                    from nb import naive_bayes_diagnosis
+                    from fc import forward_chaining_diagnosis
 
-                            with col_export2:
-                                # Ekspor ke JSON
-                                json_str = df.to_json(orient='records', indent=2)
+                    # Panggil fungsi Naive Bayes
+                    result = naive_bayes_diagnosis(st.session_state.answers, st.session_state.question_codes)
+                    if result:
+                        st.session_state.diagnosis_result = result
+                        st.session_state.fc_result = forward_chaining_diagnosis(st.session_state.answers, st.session_state.question_codes)
+                        st.session_state.diagnosis_complete = True
+                        st.rerun()
+                    else:
+                        st.error("Gagal melakukan diagnosis. Silakan coba lagi.")
+
+    else:
+        result_page(st.session_state.diagnosis_result)
+
+    # Footer
+    st.markdown("---")
+    st.caption("⚠️ **Disclaimer:** Hasil diagnosis ini hanya sebagai referensi. Silakan konsultasi dengan dokter untuk diagnosa dan pengobatan yang tepat.")
+if selected_menu == "Database":
+    from db_funcs import (get_connection, reset_pool, invalidate_tables, get_query_cache_stats, get_table_page,
+                          export_table_bytes, EXPORT_FORMATS, get_tables, get_row_count)
+
+    # Judul halaman
+    st.title("📑 Menu Database")
+    st.markdown("---")
+
+    # Pinjam koneksi dari pool selama halaman ini dirender
+    with get_connection() as connection:
+        if connection:
+            if connection.is_connected():
+                st.success(f"✅ Terhubung ke database {connection.backend.label}!")
+
+                # Dapatkan daftar tabel
+                tables = get_tables(connection)
+
+                if tables:
+                    # Hanya tabel yang dipilih yang di-query (st.tabs menjalankan isi semua tab setiap rerun)
+                    table_name = st.selectbox("Pilih Tabel:", tables, format_func=lambda table: f"📋 {table}", key="table_select")
+
+                    col1, col2, col3 = st.columns([2, 1, 1])
+
+                    with col1:
+                        st.subheader(f"Tabel: {table_name}")
+
+                    # Hitung jumlah baris
+                    row_count = get_row_count(connection, table_name)
+
+                    with col2:
+                        st.metric("Jumlah Baris", row_count)
+
+                    with col3:
+                        if st.button("🔄 Refresh", key=f"refresh_{table_name}"):
+                            invalidate_tables(table_name)
+                            st.rerun()
+
+                    # Kontrol halaman: hanya halaman yang terlihat yang diambil dari database
+                    col_page1, col_page2, col_page3 = st.columns([1, 1, 2])
+
+                    with col_page1:
+                        page_size = st.selectbox("Baris per Halaman", PAGE_SIZES, index=1, key=f"page_size_{table_name}")
+
+                    total_pages = max(1, math.ceil(row_count / page_size))
+                    page_key = f"page_{table_name}"
+                    if st.session_state.get(page_key, 1) > total_pages:
+                        st.session_state[page_key] = total_pages
+                    elif page_key not in st.session_state:
+                        st.session_state[page_key] = 1
+
+                    with col_page2:
+                        page = st.number_input("Halaman", min_value=1, max_value=total_pages, step=1, key=page_key)
+
+                    with col_page3:
+                        first_row = min(row_count, (page - 1) * page_size + 1)
+                        last_row = min(row_count, page * page_size)
+                        st.caption(f"Menampilkan baris {first_row}–{last_row} dari {row_count} (halaman {page}/{total_pages})")
+
+                    # Ambil data halaman ini
+                    df = get_table_page(connection, table_name, page, page_size)
+
+                    if not df.empty:
+                        # Tampilkan dataframe
+                        st.dataframe(
+                            df,
+                            use_container_width=True,
+                            hide_index=True
+                        )
+
+                        # Tombol untuk melihat statistik
+                        with st.expander("📊 Lihat Statistik"):
+                            col_stat1, col_stat2, col_stat3 = st.columns(3)
+
+                            with col_stat1:
+                                st.write("**Info Kolom:**")
+                                for col in df.columns:
+                                    st.write(f"• {col}")
+
+                            with col_stat2:
+                                st.write("**Tipe Data:**")
+                                for col in df.columns:
+                                    dtype = str(df[col].dtype)
+                                    st.write(f"• {dtype}")
+
+                            with col_stat3:
+                                st.write("**Statistik:**")
+                                st.write(f"Total Baris: {row_count}")
+                                st.write(f"Total Kolom: {len(df.columns)}")
+
+                        # Tombol untuk ekspor seluruh tabel; file dibuat hanya saat tombol diklik,
+                        # dibaca langsung dari cursor per chunk
+                        export_options = ['csv', 'json'] + (['parquet'] if PARQUET_AVAILABLE else [])
+                        export_cols = st.columns(len(export_options))
+
+                        for export_col, fmt in zip(export_cols, export_options):
+                            with export_col:
+                                mime, extension = EXPORT_FORMATS[fmt]
                                 st.download_button(
-                                    label="📥 Download JSON",
-                                    data=json_str,
-                                    file_name=f"{table_name}.json",
-                                    mime="application/json",
-                                    key=f"json_{table_name}"
+                                    label=f"📥 Download {fmt.upper()}",
+                                    data=functools.partial(export_table_bytes, table_name, fmt),
+                                    file_name=f"{table_name}.{extension}",
+                                    mime=mime,
+                                    key=f"{fmt}_{table_name}"
                                 )
-                        else:
-                            st.warning(f"Tabel {table_name} kosong atau tidak dapat diakses.")
-
-                        st.divider()
+                    else:
+                        st.warning(f"Tabel {table_name} kosong atau tidak dapat diakses.")
+
+                    st.divider()
+                else:
+                    st.warning("Tidak ada tabel yang ditemukan dalam database.")
+
+                # Informasi koneksi
+                with st.expander("ℹ️ Informasi Koneksi Database"):
+                    for label, value in connection.backend.describe().items():
+                        st.write(f"**{label}:** {value}")
+                    st.write(f"**Status:** Terhubung")
+
+                    # Statistik cache query (hit tinggi berarti beban database berkurang)
+                    cache_stats = get_query_cache_stats()
+                    st.write(f"**Cache Query:** {cache_stats['hits']} hit / {cache_stats['misses']} miss "
+                             f"({cache_stats['hit_rate']*100:.1f}%), {cache_stats['size']}/{cache_stats['maxsize']} entri")
             else:
-                st.warning("Tidak ada tabel yang ditemukan dalam database.")
-
-            # Informasi koneksi
-            with st.expander("ℹ️ Informasi Koneksi Database"):
-                st.write(f"**Host:** mysql-3b8fdc2f-sistem-pakarrrrrrrrrrrr.j.aivencloud.com")
-                st.write(f"**Port:** 21798")
-                st.write(f"**Database:** defaultdb")
-                st.write(f"**User:** avnadmin")
-                st.write(f"**Status:** Terhubung")
-
-            # Tutup koneksi saat aplikasi selesai
-            if st.button("🔌 Tutup Koneksi Database"):
-                connection.close()
-                st.success("Koneksi database ditutup!")
-                st.rerun()
+                st.error("❌ Gagal terhubung ke database!")
         else:
-            st.error("❌ Gagal terhubung ke database!")
-    else:
-        st.error("❌ Tidak dapat membuat koneksi ke database. Periksa kredensial Anda.")
+            st.error("❌ Tidak dapat membuat koneksi ke database. Periksa kredensial Anda.")
+
+    # Koneksi dikembalikan ke pool otomatis; tombol ini membuang pool dan membuat koneksi baru
+    # (tetap tersedia saat database tidak dapat dihubungi)
+    if st.button("🔌 Reset Pool Koneksi Database"):
+        reset_pool()
+        st.success("Pool koneksi database direset!")
+        st.rerun()
 
 # Footer
 st.markdown("---")
 st.caption("© 2024 Sistem Pakar - Menu Database")
+
+metrics.observe('page_render_seconds', time.perf_counter() - render_start, page=selected_menu)
+
+if os.environ.get('WARMUP', '1') != '0':
+    start_warmup()
+if os.environ.get('MODEL_WATCH_INTERVAL') != '0':
+    start_watcher()
@@ -0,0 +1,309 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from storage import SQLiteBackend, seed_sqlite
+
+# Benchmark lokal (tanpa jaringan) untuk diagnosis, helper db_funcs, dan rerun app.py.
+#
+#   python benchmark.py                                  # ukuran 100, 10.000, 1.000.000 kasus
+#   python benchmark.py --sizes 100,100000 --output hasil.json
+#   python benchmark.py --output baru.json --compare lama.json
+#
+# Database MySQL diganti backend SQLite dari storage.py (file sementara), sehingga helper db_funcs
+# dijalankan apa adanya lewat get_connection(). Ukuran > 100 memakai
+# case base sintetis dari synthetic.py. Hasil disimpan sebagai JSON
+# (beserta commit git) agar bisa dibandingkan antar commit.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = [100, 10_000, 1_000_000]
+BATCH_SIZE = 10_000
+WRITE_BATCH = 100
+SEED = 0
+
+# ---------------------------------------------------------------------------
+# Database: backend SQLite dari storage.py (file sementara, tanpa jaringan)
+# ---------------------------------------------------------------------------
+
+# Isi database: case_base_table, data_penyakit_table, disease_details_table (teks contoh), beserta indeks
+def seed_database(path, case_base, data_penyakit):
+    details = data_penyakit.assign(
+        deskripsi=lambda df: 'Deskripsi ' + df['nama_penyakit'],
+        gejala_umum='-', rekomendasi='-', tindakan_segera='-', konsultasi_medis='-')
+    seed_sqlite(path, {'case_base_table': case_base, 'data_penyakit_table': data_penyakit,
+                       'disease_details_table': details}, replace=True)
+
+# Arahkan db_funcs ke pool SQLite dan kosongkan state yang terikat ke database sebelumnya
+def install_stand_in(path):
+    import db_funcs
+    pool = SQLiteBackend(path).create_pool(db_funcs.POOL_SIZE)
+    db_funcs.init_pool = lambda: pool
+    db_funcs._case_base_counts_ready = False
+    db_funcs._case_id_sequence_ready = False
+    db_funcs.query_cache.clear()
+    db_funcs.bump_case_base_version()
+    return pool
+
+# ---------------------------------------------------------------------------
+# Data
+# ---------------------------------------------------------------------------
+
+def load_shipped_data():
+    case_base = pd.read_excel(os.path.join(BASE_DIR, 'case_base.xlsx'))
+    data_penyakit = pd.read_excel(os.path.join(BASE_DIR, 'data_penyakit.xlsx'))
+    return case_base, data_penyakit
+
+# Case base sintetis dengan frekuensi gejala per penyakit yang dipelajari dari case_base.xlsx (lihat synthetic.py)
+def synthetic_case_base(case_base, n, seed=SEED):
+    from synthetic import CaseProfile
+    profile = CaseProfile.learn(case_base, pd.read_excel(os.path.join(BASE_DIR, 'relasi.xlsx')))
+    return pd.concat(profile.generate(n, seed=seed), ignore_index=True)
+
+def random_answers(rng, n, n_gejala=21):
+    choices = np.array(['Ya', 'Tidak', 'Tidak Diketahui'], dtype=object)
+    return choices[rng.integers(0, 3, size=(n, n_gejala))].tolist()
+
+# ---------------------------------------------------------------------------
+# Pengukuran
+# ---------------------------------------------------------------------------
+
+# Jalankan fn berulang sampai repeat kali atau anggaran waktu habis (minimal sekali);
+# ops = jumlah operasi per panggilan (mis. ukuran batch) untuk menghitung waktu per operasi
+def measure(fn, repeat=5, budget=10.0, setup=None, ops=1):
+    timings = []
+    deadline = time.perf_counter() + budget
+    while len(timings) < repeat and (not timings or time.perf_counter() < deadline):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings)
+    return {
+        'runs': len(timings),
+        'ops': ops,
+        'median_ms': float(np.median(timings) * 1000),
+        'min_ms': float(timings.min() * 1000),
+        'mean_ms': float(timings.mean() * 1000),
+        'p95_ms': float(np.percentile(timings, 95) * 1000),
+        'per_op_us': float(np.median(timings) / ops * 1e6)
+    }
+
+class Suite:
+    def __init__(self, repeat, budget, only=None):
+        self.repeat = repeat
+        self.budget = budget
+        self.only = only
+        self.results = []
+
+    def run(self, name, rows, fn, setup=None, ops=1, repeat=None):
+        if self.only and not any(pattern in name for pattern in self.only):
+            return
+        result = {'benchmark': name, 'rows': rows,
+                  **measure(fn, repeat or self.repeat, self.budget, setup, ops)}
+        self.results.append(result)
+        print(f"  {name:<40} {result['median_ms']:>11.3f} ms  ({result['per_op_us']:.1f} µs/op, {result['runs']} run)",
+              file=sys.stderr)
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def bench_model(suite, rows, case_base, data_penyakit):
+    import nb
+    from bitpack import PackedCaseBase
+
+    data_penyakit = data_penyakit.copy()
+    data_penyakit.columns = [col.lower() for col in data_penyakit.columns]
+    packed = PackedCaseBase.from_frame(case_base, list(data_penyakit['kode_penyakit']))
+    model = nb.NaiveBayesModel.from_frames(data_penyakit, case_base)
+
+    suite.run('model.from_frames', rows, lambda: nb.NaiveBayesModel.from_frames(data_penyakit, case_base))
+    suite.run('model.from_packed', rows, lambda: nb.NaiveBayesModel.from_packed(data_penyakit, packed))
+
+    rng = np.random.default_rng(SEED)
+    answers = random_answers(rng, 1000)
+    suite.run('nb.diagnose', rows, lambda: [model.diagnose(a) for a in answers], ops=len(answers))
+
+    values = rng.integers(0, 2, size=(BATCH_SIZE, 21))
+    known = rng.random((BATCH_SIZE, 21)) < 0.8
+    suite.run(f'nb.posterior_batch[{BATCH_SIZE}]', rows, lambda: model.posterior_batch(values, known), ops=BATCH_SIZE)
+
+    answer_frame = pd.DataFrame(random_answers(rng, BATCH_SIZE), columns=model.gejala_codes)
+    suite.run(f'nb.diagnose_frame[{BATCH_SIZE}]', rows, lambda: model.diagnose_frame(answer_frame), ops=BATCH_SIZE)
+
+def bench_db(suite, rows):
+    import db_funcs
+    import nb
+
+    def uncached():
+        db_funcs.query_cache.clear()
+
+    def with_connection(fn):
+        def call():
+            with db_funcs.get_connection() as cnx:
+                return fn(cnx)
+        return call
+
+    heavy = 3 if rows > 100_000 else None
+    suite.run('db.get_tables', rows, with_connection(db_funcs.get_tables), setup=uncached)
+    suite.run('db.get_row_count', rows, with_connection(lambda c: db_funcs.get_row_count(c, 'case_base_table')),
+              setup=uncached)
+    suite.run('db.get_table_page[50]', rows,
+              with_connection(lambda c: db_funcs.get_table_page(c, 'case_base_table', 1, 50)), setup=uncached)
+    suite.run('db.get_table_data', rows,
+              with_connection(lambda c: db_funcs.get_table_data(c, 'case_base_table')), setup=uncached, repeat=heavy)
+    suite.run('db.get_table_data[cached]', rows,
+              with_connection(lambda c: db_funcs.get_table_data(c, 'data_penyakit_table')))
+    suite.run('db.get_case_base_counts', rows, with_connection(db_funcs.get_case_base_counts), setup=uncached)
+    suite.run('db.get_disease_details_by_code', rows,
+              with_connection(lambda c: db_funcs.get_disease_details_by_code(c, 'P01')), setup=uncached)
+
+    rng = np.random.default_rng(SEED)
+    cases = [(f'P0{rng.integers(1, 5)}', rng.integers(0, 2, 21).tolist()) for _ in range(WRITE_BATCH)]
+    suite.run(f'db.write_cases[{WRITE_BATCH}]', rows, with_connection(lambda c: db_funcs.write_cases(c, cases)),
+              ops=WRITE_BATCH)
+
+    answers = random_answers(rng, WRITE_BATCH)
+    def insert_and_flush():
+        for a in answers:
+            db_funcs.insert_new_case_to_db({'kode_penyakit': 'P01'}, a)
+        db_funcs.init_case_writer().flush()
+    suite.run(f'db.insert_new_case_to_db[{WRITE_BATCH}]', rows, insert_and_flush, ops=WRITE_BATCH)
+
+    # Diagnosis lewat jalur aplikasi: model di-cache dari tabel ringkasan database
+    nb.load_model.clear()
+    suite.run('nb.load_model[db]', rows, lambda: nb.load_model(-1), setup=nb.load_model.clear)
+    answers = random_answers(rng, 1000)
+    suite.run('nb.naive_bayes_diagnosis', rows, lambda: [nb.naive_bayes_diagnosis(a) for a in answers],
+              setup=nb.diagnosis_cache.clear, ops=len(answers))
+    suite.run('nb.naive_bayes_diagnosis[cached]', rows, lambda: [nb.naive_bayes_diagnosis(a) for a in answers],
+              ops=len(answers))
+
+def bench_app(suite, rows):
+    from streamlit.testing.v1 import AppTest
+    # Pemanasan latar dan watcher app.py dimatikan agar tidak berebut CPU dengan pengukuran
+    os.environ.setdefault('WARMUP', '0')
+    os.environ.setdefault('MODEL_WATCH_INTERVAL', '0')
+    app_path = os.path.join(BASE_DIR, 'app.py')
+
+    def new_app():
+        return AppTest.from_file(app_path, default_timeout=60)
+
+    suite.run('app.first_run[database]', rows, lambda: new_app().run())
+
+    state = {}
+    def questionnaire():
+        at = new_app().run()
+        at.selectbox(key='menu_select').set_value('Sistem Pakar').run()
+        state['app'] = at
+    suite.run('app.first_run[sistem_pakar]', rows, questionnaire)
+
+    def click_ya():
+        at = state['app']
+        if not any('Ya' in button.label for button in at.button):
+            questionnaire()
+            at = state['app']
+        next(button for button in at.button if 'Ya' in button.label).click().run()
+    suite.run('app.rerun[jawab_pertanyaan]', rows, click_ya)
+
+    def analyse():
+        at = state['app']
+        at.selectbox(key='menu_select').set_value('Sistem Pakar').run()
+        while any('Ya' in button.label for button in at.button):
+            next(button for button in at.button if 'Ya' in button.label).click().run()
+        next(button for button in at.button if 'Mulai' in button.label).click().run()
+    suite.run('app.rerun[semua_jawaban+analisis]', rows, analyse, setup=questionnaire, repeat=3)
+
+    def database_page():
+        at = state['db_app']
+        at.selectbox(key='table_select').set_value('case_base_table').run()
+    def open_database():
+        state['db_app'] = new_app().run()
+    suite.run('app.rerun[tabel_case_base]', rows, database_page, setup=open_database)
+
+# ---------------------------------------------------------------------------
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'waktu': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+def run_suite(sizes, repeat=5, budget=10.0, only=None, skip_app=False):
+    import logging
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+    shipped, data_penyakit = load_shipped_data()
+    suite = Suite(repeat, budget, only)
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            case_base = shipped if rows == len(shipped) else synthetic_case_base(shipped, rows)
+            print(f"[{rows} kasus]", file=sys.stderr)
+            path = os.path.join(tmp, f'case_base_{rows}.sqlite')
+            seed_database(path, case_base, data_penyakit)
+            install_stand_in(path)
+
+            bench_model(suite, rows, case_base, data_penyakit)
+            bench_db(suite, rows)
+            if not skip_app:
+                bench_app(suite, rows)
+    return {'meta': environment(), 'results': suite.results}
+
+# Bandingkan dengan hasil sebelumnya (rasio median baru / lama)
+def compare(report, baseline):
+    old = {(r['benchmark'], r['rows']): r for r in baseline['results']}
+    lines = [f"Dibandingkan dengan {baseline['meta'].get('commit')} ({baseline['meta'].get('waktu')}):"]
+    for result in report['results']:
+        previous = old.get((result['benchmark'], result['rows']))
+        if previous is None or not previous['median_ms']:
+            continue
+        ratio = result['median_ms'] / previous['median_ms']
+        flag = '  <-- lebih lambat' if ratio > 1.2 else ''
+        lines.append(f"  {result['benchmark']:<40} {result['rows']:>9}  {previous['median_ms']:>10.3f} -> "
+                     f"{result['median_ms']:>10.3f} ms  x{ratio:.2f}{flag}")
+    if len(lines) == 1:
+        lines.append("  (tidak ada benchmark dengan nama dan ukuran yang sama)")
+    return '\n'.join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark lokal diagnosis, helper database, dan rerun aplikasi")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help="Ukuran case base dipisah koma (100 = case_base.xlsx asli)")
+    parser.add_argument('--repeat', type=int, default=5, help="Jumlah pengulangan per benchmark")
+    parser.add_argument('--budget', type=float, default=10.0, help="Batas waktu (detik) per benchmark")
+    parser.add_argument('--only', action='append', help="Hanya benchmark yang namanya memuat teks ini (boleh berulang)")
+    parser.add_argument('--skip-app', action='store_true', help="Lewati benchmark rerun app.py")
+    parser.add_argument('--output', default='benchmark.json', help="File JSON hasil")
+    parser.add_argument('--compare', help="File JSON hasil sebelumnya untuk dibandingkan")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    report = run_suite(sizes, args.repeat, args.budget, args.only, args.skip_app)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"{len(report['results'])} hasil disimpan ke {args.output}", file=sys.stderr)
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(report, json.load(f)))
+    return report
+
+if __name__ == '__main__':
+    main()
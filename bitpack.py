@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+# Representasi case base yang dipadatkan: satu bilangan bulat per kasus (bit ke-j = gejala ke-j,
+# G01 = bit 0) ditambah array indeks penyakit. Untuk 21 gejala cukup uint32 (4 byte per kasus)
+# dibanding 21 kolom int64 (168 byte per kasus) di pandas.
+
+# Tabel popcount per byte, untuk NumPy lama yang belum punya np.bitwise_count
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def popcount(array):
+    array = np.ascontiguousarray(array)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(array)
+    return _POPCOUNT8[array.view(np.uint8)].reshape(array.shape + (-1,)).sum(axis=-1)
+
+# Fungsi untuk memadatkan matriks 0/1 (N x gejala) menjadi satu bilangan bulat per baris
+def pack_bits(matrix):
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=bool))
+    width = matrix.shape[1]
+    if width > 64:
+        raise ValueError(f"Bit packing supports at most 64 symptoms, got {width}.")
+    dtype = np.uint32 if width <= 32 else np.uint64
+    packed = np.zeros(len(matrix), dtype=dtype)
+    for j in range(width):
+        packed |= matrix[:, j].astype(dtype) << dtype(j)
+    return packed
+
+# Kebalikan pack_bits: (N,) bilangan bulat -> matriks 0/1 (N x width)
+def unpack_bits(packed, width):
+    packed = np.asarray(packed)
+    shifts = np.arange(width, dtype=packed.dtype)
+    return ((packed[:, None] >> shifts) & 1).astype(np.int8)
+
+# Bitmap per kolom: bit ke-i menandai kasus ke-i, dipadatkan 64 kasus per kata uint64
+def _bitmap(mask):
+    packed = np.packbits(mask, bitorder='little')
+    padding = (-len(packed)) % 8
+    if padding:
+        packed = np.concatenate([packed, np.zeros(padding, dtype=np.uint8)])
+    return packed.view(np.uint64)
+
+class PackedCaseBase:
+    def __init__(self, rows, disease_idx, disease_codes, gejala_codes):
+        self.rows = np.asarray(rows)                                # (kasus,) uint32/uint64
+        self.disease_idx = np.asarray(disease_idx, dtype=np.int16)  # (kasus,) indeks ke disease_codes, -1 = tidak dikenal
+        self.disease_codes = list(disease_codes)
+        self.gejala_codes = list(gejala_codes)
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def nbytes(self):
+        return self.rows.nbytes + self.disease_idx.nbytes
+
+    # Padatkan case_base_table (DataFrame dengan kolom penyakit dan G01..G21)
+    @classmethod
+    def from_frame(cls, case_base, disease_codes=None):
+        gejala_codes = [col for col in case_base.columns if col.startswith('G')]
+        if disease_codes is None:
+            disease_codes = sorted(case_base['penyakit'].dropna().unique())
+        index = {code: i for i, code in enumerate(disease_codes)}
+        disease_idx = case_base['penyakit'].map(index).fillna(-1).to_numpy()
+        return cls(pack_bits(case_base[gejala_codes].to_numpy()), disease_idx, disease_codes, gejala_codes)
+
+    # Padatkan case base yang dibaca per chunk (mis. dari cursor) sehingga memori tetap kecil
+    @classmethod
+    def from_chunks(cls, chunks, disease_codes):
+        rows = []
+        disease_idx = []
+        gejala_codes = None
+        for chunk in chunks:
+            packed = cls.from_frame(chunk, disease_codes)
+            gejala_codes = packed.gejala_codes
+            rows.append(packed.rows)
+            disease_idx.append(packed.disease_idx)
+        if gejala_codes is None:
+            return cls(np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.int16), disease_codes, [])
+        return cls(np.concatenate(rows), np.concatenate(disease_idx), disease_codes, gejala_codes)
+
+    # Jumlah kasus per penyakit dan jumlah 'Ya' per (penyakit, gejala) dengan AND + popcount
+    # antara bitmap penyakit dan bitmap gejala (64 kasus per operasi)
+    def counts(self):
+        n_disease = len(self.disease_codes)
+        n_gejala = len(self.gejala_codes)
+        disease_bitmaps = [_bitmap(self.disease_idx == d) for d in range(n_disease)]
+        gejala_bitmaps = [_bitmap(((self.rows >> self.rows.dtype.type(j)) & 1).astype(bool)) for j in range(n_gejala)]
+
+        class_counts = np.array([popcount(bitmap).sum() for bitmap in disease_bitmaps], dtype=np.int64)
+        symptom_counts = np.zeros((n_disease, n_gejala), dtype=np.int64)
+        for d, disease_bitmap in enumerate(disease_bitmaps):
+            for j, gejala_bitmap in enumerate(gejala_bitmaps):
+                symptom_counts[d, j] = popcount(disease_bitmap & gejala_bitmap).sum()
+        return class_counts, symptom_counts
+
+    def to_frame(self):
+        frame = pd.DataFrame(unpack_bits(self.rows, len(self.gejala_codes)), columns=self.gejala_codes)
+        codes = np.asarray(self.disease_codes + [None], dtype=object)
+        frame.insert(0, 'penyakit', codes[self.disease_idx])
+        return frame
+
+    # Simpan/muat format padat (.npz)
+    def save(self, path):
+        np.savez(path, rows=self.rows, disease_idx=self.disease_idx,
+                 disease_codes=np.asarray(self.disease_codes), gejala_codes=np.asarray(self.gejala_codes))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['rows'], data['disease_idx'], data['disease_codes'].tolist(), data['gejala_codes'].tolist())
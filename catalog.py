@@ -0,0 +1,129 @@
+import csv
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from st_compat import cache_resource
+
+# Katalog gejala: urutan pertanyaan, kode gejala (G01, G02, ...) dan teks pertanyaan dibaca dari tabel
+# gejala (data_gejala.xlsx). Jawaban kuesioner disimpan per posisi katalog dan dipetakan ke model,
+# aturan, dan case base berdasarkan kode gejala, bukan berdasarkan posisi.
+# Katalog dibaca tanpa pandas (openpyxl/csv), karena dibutuhkan untuk render pertanyaan pertama.
+# Hasil parse xlsx disimpan sebagai JSON di CATALOG_CACHE_DIR (kunci: path, mtime, dan ukuran file), jadi
+# openpyxl hanya dimuat saat tabel gejala berubah, bukan pada setiap cold start.
+
+logger = logging.getLogger(__name__)
+
+# Path bawaan relatif terhadap direktori modul, bukan direktori kerja
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CATALOG_PATH = os.path.join(BASE_DIR, 'data_gejala.xlsx')
+CATALOG_CACHE_VERSION = 1
+
+class SymptomCatalog:
+    def __init__(self, codes, names, questions):
+        self.codes = list(codes)
+        self.names = list(names)
+        self.questions = list(questions)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+
+    # Baris tabel gejala (dict) dengan kolom kode_gejala dan gejala; kolom pertanyaan opsional
+    @classmethod
+    def from_records(cls, records):
+        codes, names, questions = [], [], []
+        for record in records:
+            record = {str(key).lower(): value for key, value in record.items() if key is not None}
+            code = record.get('kode_gejala')
+            if code is None or (isinstance(code, float) and code != code) or not str(code).strip():
+                continue
+            name = record.get('gejala')
+            name = name.strip() if isinstance(name, str) else ''
+            question = record.get('pertanyaan')
+            codes.append(str(code).strip())
+            names.append(name)
+            questions.append(question.strip() if isinstance(question, str) and question.strip() else question_text(name))
+        return cls(codes, names, questions)
+
+    @classmethod
+    def from_frame(cls, data_gejala):
+        return cls.from_records(data_gejala.to_dict('records'))
+
+    def __len__(self):
+        return len(self.codes)
+
+    # Jawaban per kode gejala: {'G01': 'Ya', ...}
+    def answers_by_code(self, answers):
+        return dict(zip(self.codes, answers))
+
+# Teks pertanyaan bawaan jika tabel gejala tidak memiliki kolom pertanyaan
+def question_text(gejala):
+    return f"Apakah Anda mengalami {gejala[:1].lower() + gejala[1:]}?"
+
+# Susun ulang jawaban (berurutan sesuai codes) mengikuti target_codes; kode yang tidak ditanyakan diisi missing
+def reorder_answers(answers, codes, target_codes, missing=None):
+    if codes is None:
+        return list(answers)
+    by_code = dict(zip(codes, answers))
+    return [by_code.get(code, missing) for code in target_codes]
+
+def catalog_cache_dir():
+    return os.environ.get('CATALOG_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'sistem-pakar-catalog')
+
+# Path file cache untuk versi file sumber saat ini
+def catalog_cache_path(path):
+    stat = os.stat(path)
+    key = f"{CATALOG_CACHE_VERSION}:{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+    return os.path.join(catalog_cache_dir(), hashlib.sha1(key.encode()).hexdigest() + '.json')
+
+def read_cached_catalog(cache_path):
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            data = json.load(f)
+        return SymptomCatalog(data['codes'], data['names'], data['questions'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+# Cache hanya mempercepat; kegagalan menulis (direktori read-only, disk penuh) tidak menggagalkan pembacaan
+def write_cached_catalog(cache_path, catalog):
+    data = {'codes': catalog.codes, 'names': catalog.names, 'questions': catalog.questions}
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        logger.warning("Could not write the catalog cache %s", cache_path, exc_info=True)
+
+def read_xlsx_catalog(path):
+    import openpyxl
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, ())
+        return SymptomCatalog.from_records(dict(zip(header, row)) for row in rows)
+    finally:
+        workbook.close()
+
+def read_catalog(path=DEFAULT_CATALOG_PATH):
+    path = str(path)
+    if path.endswith('.spkb'):
+        from knowledge import KnowledgeBase
+        return KnowledgeBase.load(path).catalog
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            return SymptomCatalog.from_records(csv.DictReader(f))
+    if path.endswith('.parquet'):
+        import pandas as pd
+        return SymptomCatalog.from_frame(pd.read_parquet(path))
+    cache_path = catalog_cache_path(path)
+    catalog = read_cached_catalog(cache_path)
+    if catalog is None:
+        catalog = read_xlsx_catalog(path)
+        write_cached_catalog(cache_path, catalog)
+    return catalog
+
+# Katalog dibaca sekali dan di-cache lintas sesi
+@cache_resource
+def load_catalog(path=DEFAULT_CATALOG_PATH):
+    return read_catalog(path)
@@ -1,36 +1,284 @@
-import mysql.connector
+import atexit
+import copy
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import ExitStack, contextmanager
 import pandas as pd
-import streamlit as st
+from metrics import metrics, row_bytes
+from storage import DB_ERRORS, ConnectionPool, MySQLBackend, backend_from_env
+from st_compat import cache_resource, show_error
 
-# Fungsi untuk koneksi database
-@st.cache_resource
-def init_connection():
+logger = logging.getLogger(__name__)
+
+# Versi case base di proses ini; dinaikkan jika case base berubah dengan cara yang
+# tidak bisa diterapkan secara inkremental, sehingga model yang di-cache dibangun ulang
+_case_base_version = 0
+_case_base_version_lock = threading.Lock()
+
+def get_case_base_version():
+    return _case_base_version
+
+def bump_case_base_version():
+    global _case_base_version
+    with _case_base_version_lock:
+        _case_base_version += 1
+        return _case_base_version
+
+# Konfigurasi database
+DB_CONFIG = {#tambahkan kredensial database Anda di sini
+    'user': '',
+    'password': '',
+    'host': '',
+    'port': '',
+    'database': ''
+}
+POOL_SIZE = 5            # jumlah koneksi maksimum yang dibuka bersamaan
+
+# Backend penyimpanan (MySQL atau SQLite lokal) dipilih lewat DB_BACKEND; lihat storage.py
+def get_backend():
+    return backend_from_env(DB_CONFIG)
+
+# Backend pemilik koneksi (koneksi dari get_connection membawa backend-nya; selain itu dianggap MySQL)
+def backend_of(connection):
+    return getattr(connection, 'backend', None) or MySQLBackend(DB_CONFIG)
+
+# Fungsi untuk membuat pool koneksi database (satu pool dipakai bersama oleh semua sesi).
+# Kegagalan dilempar sebagai exception sehingga tidak di-cache: request berikutnya mencoba lagi.
+@cache_resource
+def init_pool():
+    return get_backend().create_pool(POOL_SIZE)
+
+# Fungsi untuk membuang pool; koneksi baru dibuat lagi pada request berikutnya
+def reset_pool():
+    init_pool.clear()
+
+# Fungsi untuk meminjam koneksi dari pool selama blok with berjalan.
+# Kegagalan koneksi dilempar (DB_ERRORS/ImportError); dipakai di luar Streamlit, mis. service.py.
+@contextmanager
+def open_connection():
+    pool = init_pool()
+    cnx = pool.checkout()
+    instrumented = InstrumentedConnection(cnx, pool.backend)
     try:
-        cnx = mysql.connector.connect(#tambahkan kredensial database Anda di sini
-            user='',
-            password='',
-            host='',
-            port='',
-            database=''
-        )
-        return cnx
-    except mysql.connector.Error as err:
-        st.error(f"Error connecting to MySQL: {err}")
-        return None
+        yield instrumented
+    finally:
+        instrumented.finish()
+        pool.checkin(cnx)
+
+# Versi untuk halaman Streamlit: error ditampilkan (show_error) dan menghasilkan None
+@contextmanager
+def get_connection():
+    with ExitStack() as stack:
+        try:
+            connection = stack.enter_context(open_connection())
+        except (*DB_ERRORS, ImportError) as err:
+            show_error(f"Error connecting to {get_backend().label}: {err}")
+            connection = None
+        yield connection
+
+# Proxy koneksi: cursor yang dibuat lewat proxy ini mencatat setiap query ke metrics
+class InstrumentedConnection:
+    def __init__(self, cnx, backend=None):
+        self._cnx = cnx
+        self.backend = backend
+        self._cursors = []
+
+    def cursor(self, *args, **kwargs):
+        cursor = InstrumentedCursor(self._cnx.cursor(*args, **kwargs))
+        self._cursors.append(cursor)
+        return cursor
+
+    # Catat query yang masih terbuka sebelum koneksi dikembalikan ke pool
+    def finish(self):
+        for cursor in self._cursors:
+            cursor.finish()
+        self._cursors.clear()
+
+    def __getattr__(self, name):
+        return getattr(self._cnx, name)
+
+# Proxy cursor: latensi execute + fetch, jumlah baris dan perkiraan bytes per query.
+# Satu query dicatat saat query berikutnya dijalankan, cursor ditutup, atau koneksi dikembalikan.
+class InstrumentedCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._query = None  # [sql, baris, bytes, detik]
+
+    def _timed(self, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if self._query is not None:
+                self._query[3] += time.perf_counter() - start
+
+    def _fetched(self, rows):
+        if self._query is not None and rows:
+            self._query[1] += len(rows)
+            self._query[2] += row_bytes(rows)
+
+    def finish(self):
+        if self._query is None:
+            return
+        sql, rows, nbytes, seconds = self._query
+        self._query = None
+        if not rows and self._cursor.description is None:
+            # INSERT/UPDATE/DELETE: jumlah baris yang terpengaruh
+            rows = max(self._cursor.rowcount or 0, 0)
+        metrics.record_query(sql, rows, nbytes, seconds)
+
+    def execute(self, operation, *args, **kwargs):
+        self.finish()
+        self._query = [operation, 0, 0, 0.0]
+        return self._timed(self._cursor.execute, operation, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        self.finish()
+        self._query = [operation, 0, 0, 0.0]
+        return self._timed(self._cursor.executemany, operation, seq_params, *args, **kwargs)
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        self._fetched([row] if row is not None else [])
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._timed(self._cursor.fetchmany, *args, **kwargs)
+        self._fetched(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        self._fetched(rows)
+        return rows
+
+    def close(self):
+        self.finish()
+        return self._cursor.close()
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+# Cache hasil query (read-through) yang dipakai bersama oleh semua sesi: TTL per query,
+# ukuran terbatas dengan eviksi LRU, dan invalidasi eksplisit per tabel setelah penulisan
+QUERY_CACHE_SIZE = 256
+SCHEMA = '__schema__'    # tag untuk query daftar tabel (berubah jika ada CREATE/DROP TABLE)
+_MISSING = object()
+
+class QueryCache:
+    def __init__(self, maxsize=QUERY_CACHE_SIZE, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, tables, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, value, ttl, tables):
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, frozenset(tables), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # Hapus semua entri yang bergantung pada salah satu tabel
+    def invalidate(self, *tables):
+        tables = set(tables)
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry[1] & tables]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'size': len(self._entries),
+                'maxsize': self.maxsize
+            }
+
+query_cache = QueryCache()
+
+# Hasil kosong tidak di-cache karena helper mengembalikan nilai kosong saat query gagal
+def _is_cacheable(result):
+    if isinstance(result, pd.DataFrame):
+        return not result.empty
+    return bool(result)
+
+# Decorator untuk helper query berbentuk f(connection, ...). Koneksi tidak ikut menjadi kunci cache.
+# Tanpa tables, argumen pertama setelah connection dianggap nama tabel yang dibaca.
+def cached_query(ttl, tables=None):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(connection, *args, **kwargs):
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            value = query_cache.get(key)
+            if value is not _MISSING:
+                return copy.copy(value)
+
+            value = func(connection, *args, **kwargs)
+            if _is_cacheable(value):
+                query_cache.put(key, copy.copy(value), ttl, tables if tables is not None else args[:1])
+            return value
+        return wrapper
+    return decorator
+
+# Fungsi untuk membuang hasil query yang di-cache untuk tabel yang baru saja diubah
+def invalidate_tables(*tables):
+    query_cache.invalidate(*tables)
+
+def get_query_cache_stats():
+    return query_cache.stats()
 
 # Fungsi untuk mendapatkan daftar tabel
+@cached_query(ttl=300, tables=[SCHEMA])
 def get_tables(connection):
     try:
         cursor = connection.cursor()
-        cursor.execute("SHOW TABLES")
+        cursor.execute(backend_of(connection).list_tables_sql)
         tables = cursor.fetchall()
         cursor.close()
         return [table[0] for table in tables]
-    except mysql.connector.Error as err:
-        st.error(f"Error getting tables: {err}")
+    except DB_ERRORS as err:
+        show_error(f"Error getting tables: {err}")
         return []
 
 # Fungsi untuk mendapatkan data dari tabel
+@cached_query(ttl=60)
 def get_table_data(connection, table_name):
     try:
         cursor = connection.cursor()
@@ -39,11 +287,114 @@ def get_table_data(connection, table_name):
         columns = [desc[0] for desc in cursor.description]
         cursor.close()
         return pd.DataFrame(data, columns=columns)
-    except mysql.connector.Error as err:
-        st.error(f"Error fetching data from {table_name}: {err}")
+    except DB_ERRORS as err:
+        show_error(f"Error fetching data from {table_name}: {err}")
+        return pd.DataFrame()
+
+# Fungsi untuk mendapatkan satu halaman data dari tabel (LIMIT/OFFSET, urut kolom pertama).
+# Baris dibaca bertahap dengan fetchmany sehingga hanya halaman yang terlihat yang ditransfer.
+FETCH_BATCH_SIZE = 500
+
+@cached_query(ttl=30)
+def get_table_page(connection, table_name, page=1, page_size=50):
+    try:
+        cursor = connection.cursor()
+        offset = (max(int(page), 1) - 1) * int(page_size)
+        cursor.execute(f"SELECT * FROM {table_name} ORDER BY 1 LIMIT %s OFFSET %s", (int(page_size), offset))
+        columns = [desc[0] for desc in cursor.description]
+        data = []
+        while True:
+            rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            data.extend(rows)
+        cursor.close()
+        return pd.DataFrame(data, columns=columns)
+    except DB_ERRORS as err:
+        show_error(f"Error fetching data from {table_name}: {err}")
         return pd.DataFrame()
 
+# Ekspor tabel langsung dari cursor per chunk (fetchmany) ke file biner, tanpa membangun DataFrame penuh.
+# Format: 'csv', 'json' (array of records, indent 2 seperti ekspor sebelumnya) atau 'parquet' (butuh pyarrow).
+EXPORT_CHUNK_SIZE = 5000
+EXPORT_SPOOL_SIZE = 8 * 1024 * 1024   # file ekspor di atas ukuran ini ditulis ke disk selama dibangun
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'json': ('application/json', 'json'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet')
+}
+
+def export_table(connection, table_name, fmt, out, chunk_size=EXPORT_CHUNK_SIZE):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow).")
+
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT * FROM {table_name}")
+    columns = [desc[0] for desc in cursor.description]
+    writer = None
+    rows_written = 0
+    try:
+        if fmt == 'json':
+            out.write(b'[\n')
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            chunk = pd.DataFrame(rows, columns=columns)
+
+            if fmt == 'csv':
+                out.write(chunk.to_csv(index=False, header=(rows_written == 0)).encode('utf-8'))
+            elif fmt == 'json':
+                records = chunk.to_json(orient='records', indent=2)[2:-2]
+                out.write(((',\n' if rows_written else '') + records).encode('utf-8'))
+            else:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(out, table.schema)
+                writer.write_table(table.cast(writer.schema))
+            rows_written += len(chunk)
+
+        # Tabel kosong: tetap tulis header/skema
+        if rows_written == 0 and fmt == 'csv':
+            out.write(pd.DataFrame(columns=columns).to_csv(index=False).encode('utf-8'))
+        elif rows_written == 0 and fmt == 'parquet':
+            writer = pq.ParquetWriter(out, pa.Table.from_pandas(pd.DataFrame(columns=columns), preserve_index=False).schema)
+        if fmt == 'json':
+            out.write(b'\n]')
+    finally:
+        if writer is not None:
+            writer.close()
+        cursor.close()
+    return rows_written
+
+# Fungsi untuk membuat file unduhan sebuah tabel; dipanggil hanya saat tombol download diklik.
+# Memakai koneksi sendiri karena Streamlit menjalankannya di thread terpisah dari rerun halaman.
+# Ekspor dibangun di SpooledTemporaryFile (pindah ke disk di atas EXPORT_SPOOL_SIZE) lalu dibaca sekali,
+# jadi file besar tidak disimpan dua kali di memori seperti BytesIO + getvalue(). Batas sebenarnya:
+# download_button hanya menerima bytes/BytesIO dan MediaFileManager Streamlit menyimpan seluruh isi unduhan
+# di memori, jadi puncak memori tetap sekitar satu kali ukuran file ekspor. Tabel yang lebih besar dari itu
+# sebaiknya diekspor dengan dump database (mysqldump/sqlite3 .dump).
+def export_table_bytes(table_name, fmt):
+    with get_connection() as cnx:
+        if cnx is None:
+            return b""
+        with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE) as out:
+            try:
+                export_table(cnx, table_name, fmt, out)
+            except DB_ERRORS as err:
+                show_error(f"Error exporting {table_name}: {err}")
+                return b""
+            out.seek(0)
+            return out.read()
+
 # Fungsi untuk menghitung jumlah baris
+@cached_query(ttl=30)
 def get_row_count(connection, table_name):
     try:
         cursor = connection.cursor()
@@ -51,79 +402,490 @@ def get_row_count(connection, table_name):
         count = cursor.fetchone()[0]
         cursor.close()
         return count
-    except mysql.connector.Error as err:
+    except DB_ERRORS as err:
         return 0
 
+# Tabel ringkasan case base: jumlah kasus dan jumlah 'Ya' per gejala untuk setiap penyakit.
+# Diperbarui dalam transaksi yang sama dengan insert_new_case_to_db sehingga tidak perlu scan ulang.
+CASE_BASE_COUNTS_TABLE = 'case_base_counts_table'
+_case_base_counts_ready = False
+
+# Fungsi untuk mendapatkan kolom gejala (G01, G02, ...) dari case_base_table
+def get_gejala_columns(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT * FROM case_base_table LIMIT 0")
+    cursor.fetchall()
+    gejala_cols = [desc[0] for desc in cursor.description if desc[0].startswith('G')]
+    cursor.close()
+    return gejala_cols
+
+# Isi ulang tabel ringkasan dari case_base_table dengan satu query GROUP BY
+def rebuild_case_base_counts(connection, gejala_cols=None):
+    if gejala_cols is None:
+        gejala_cols = get_gejala_columns(connection)
+    columns_str = ', '.join(gejala_cols)
+    sums = ', '.join(f"SUM({col})" for col in gejala_cols)
+
+    cursor = connection.cursor()
+    cursor.execute(f"DELETE FROM {CASE_BASE_COUNTS_TABLE}")
+    cursor.execute(f"""
+    INSERT INTO {CASE_BASE_COUNTS_TABLE} (penyakit, jumlah_kasus, {columns_str})
+    SELECT penyakit, COUNT(*), {sums} FROM case_base_table GROUP BY penyakit
+    """)
+    connection.commit()
+    cursor.close()
+    invalidate_tables(CASE_BASE_COUNTS_TABLE)
+
+# Apakah tabel ringkasan sesuai dengan case_base_table. full=False hanya membandingkan jumlah kasus per penyakit
+# (murah, memakai indeks penyakit); full=True juga membandingkan jumlah 'Ya' per gejala (scan penuh).
+def case_base_counts_match(connection, full=False, gejala_cols=None):
+    if gejala_cols is None:
+        gejala_cols = get_gejala_columns(connection) if full else []
+    columns = ['jumlah_kasus'] + list(gejala_cols)
+    aggregates = ', '.join(['COUNT(*)'] + [f"SUM({col})" for col in gejala_cols])
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT penyakit, {aggregates} FROM case_base_table GROUP BY penyakit")
+    actual = {row[0]: tuple(int(value or 0) for value in row[1:]) for row in cursor.fetchall()}
+    cursor.execute(f"SELECT penyakit, {', '.join(columns)} FROM {CASE_BASE_COUNTS_TABLE} WHERE jumlah_kasus > 0")
+    stored = {row[0]: tuple(int(value) for value in row[1:]) for row in cursor.fetchall()}
+    cursor.close()
+    return actual == stored
+
+# Buat tabel ringkasan jika belum ada dan bangun ulang jika jumlah kasus per penyakit tidak sesuai
+# dengan case_base_table (mis. baris ditambahkan dari luar saat aplikasi berhenti); sekali per proses
+def ensure_case_base_counts(connection):
+    global _case_base_counts_ready
+    if _case_base_counts_ready:
+        return
+
+    gejala_cols = get_gejala_columns(connection)
+    col_defs = ', '.join(f"{col} INT NOT NULL DEFAULT 0" for col in gejala_cols)
+    cursor = connection.cursor()
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {CASE_BASE_COUNTS_TABLE} (
+        penyakit VARCHAR(10) NOT NULL PRIMARY KEY,
+        jumlah_kasus INT NOT NULL DEFAULT 0,
+        {col_defs}
+    )
+    """)
+    cursor.close()
+
+    invalidate_tables(SCHEMA)
+    if not case_base_counts_match(connection):
+        rebuild_case_base_counts(connection, gejala_cols)
+    _case_base_counts_ready = True
+
+# Fungsi untuk mendapatkan statistik case base per penyakit (jumlah kasus dan jumlah 'Ya' per gejala)
+# Yang dikirim hanya (penyakit x gejala) angka dari tabel ringkasan, bukan seluruh baris case base
+def get_case_base_counts(connection):
+    try:
+        ensure_case_base_counts(connection)
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT * FROM {CASE_BASE_COUNTS_TABLE}")
+        data = cursor.fetchall()
+        columns = [desc[0] for desc in cursor.description]
+        cursor.close()
+
+        counts = pd.DataFrame(data, columns=columns)
+        count_cols = [col for col in columns if col != 'penyakit']
+        counts[count_cols] = counts[count_cols].astype(int)
+        return counts
+    except DB_ERRORS as err:
+        show_error(f"Error fetching case base counts: {err}")
+        return pd.DataFrame()
+
+# Detail penyakit berdasarkan kode (None jika kode tidak ada); error database dilempar ke pemanggil
+@cached_query(ttl=600, tables=['disease_details_table'])
+def fetch_disease_details(connection, kode_penyakit):
+    cursor = connection.cursor(dictionary=True) # Return rows as dictionaries
+    try:
+        cursor.execute("SELECT * FROM disease_details_table WHERE kode_penyakit = %s", (kode_penyakit,))
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
 # New function to get disease details by code
 def get_disease_details_by_code(connection, kode_penyakit):
     try:
-        cursor = connection.cursor(dictionary=True) # Return rows as dictionaries
-        query = "SELECT * FROM disease_details_table WHERE kode_penyakit = %s"
-        cursor.execute(query, (kode_penyakit,))
-        details = cursor.fetchone()
-        cursor.close()
-        return details
-    except mysql.connector.Error as err:
-        st.error(f"Error fetching disease details for {kode_penyakit}: {err}")
+        return fetch_disease_details(connection, kode_penyakit)
+    except DB_ERRORS as err:
+        show_error(f"Error fetching disease details for {kode_penyakit}: {err}")
         return None
 
-# New function to insert diagnosis as a new case
-def insert_new_case_to_db(diagnosis_result, user_answers):
-    cnx = init_connection()
-    if cnx is None:
-        return False
+# Tabel sequence untuk ID kasus: blok ID dipesan secara atomik (LAST_INSERT_ID di MySQL, RETURNING di SQLite),
+# sehingga dua proses tidak pernah mendapat d_case yang sama (tanpa SELECT ... ORDER BY lalu INSERT)
+CASE_ID_SEQUENCE_TABLE = 'case_id_sequence'
+_case_id_sequence_ready = False
+
+def ensure_case_id_sequence(connection):
+    global _case_id_sequence_ready
+    if _case_id_sequence_ready:
+        return
+
+    backend = backend_of(connection)
+    cursor = connection.cursor()
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS {CASE_ID_SEQUENCE_TABLE} (
+        id TINYINT NOT NULL PRIMARY KEY,
+        next_id INT NOT NULL
+    )
+    """)
+    # Mulai dari nomor kasus terbesar secara numerik ('C1000' > 'C999')
+    cursor.execute(f"""
+    {backend.insert_ignore} INTO {CASE_ID_SEQUENCE_TABLE} (id, next_id)
+    SELECT 1, COALESCE(MAX(CAST(SUBSTRING(d_case, 2) AS {backend.unsigned_type})), 0) + 1 FROM case_base_table
+    """)
+    connection.commit()
+    cursor.close()
+    reconcile_case_id_sequence(connection)
+    invalidate_tables(SCHEMA)
+    _case_id_sequence_ready = True
+
+# Majukan sequence melewati nomor d_case terbesar. Kasus yang ditambahkan dari luar aplikasi (impor, edit
+# langsung di tabel) tidak memajukan sequence, sehingga nomor yang dipesan bisa sudah terpakai.
+def reconcile_case_id_sequence(connection):
+    backend = backend_of(connection)
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT COALESCE(MAX(CAST(SUBSTRING(d_case, 2) AS {backend.unsigned_type})), 0) + 1 FROM case_base_table")
+    next_id = int(cursor.fetchone()[0])
+    cursor.execute(f"UPDATE {CASE_ID_SEQUENCE_TABLE} SET next_id = %s WHERE id = 1 AND next_id < %s", (next_id, next_id))
+    connection.commit()
+    cursor.close()
+
+# Pesan n nomor kasus berurutan; mengembalikan nomor pertama
+def reserve_case_ids(connection, n):
+    cursor = connection.cursor()
+    next_id = backend_of(connection).increment_sequence(cursor, CASE_ID_SEQUENCE_TABLE, n)
+    connection.commit()
+    cursor.close()
+    return int(next_id) - n
+
+def format_case_ids(first_id, n):
+    return [f"C{first_id + i:03d}" for i in range(n)]
+
+# Cek apakah salah satu nomor yang dipesan sudah ada di case_base_table (lookup lewat indeks unik d_case)
+def case_ids_taken(connection, case_ids):
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM case_base_table WHERE d_case IN ({', '.join(['%s'] * len(case_ids))})",
+                   tuple(case_ids))
+    taken = cursor.fetchone()[0]
+    cursor.close()
+    return taken > 0
 
+# Tulis sekumpulan kasus (kode_penyakit, nilai gejala) dalam satu transaksi dengan executemany,
+# termasuk pembaruan tabel ringkasan (satu baris upsert per penyakit).
+# Nilai gejala berupa dict {kode gejala: 0/1} (gejala yang tidak ada = 0) atau list berurutan G01, G02, ...
+def write_cases(connection, cases):
+    # Tabel pendukung harus ada sebelum transaksi dimulai (DDL di MySQL melakukan commit implisit)
+    ensure_case_base_counts(connection)
+    ensure_case_id_sequence(connection)
+    case_ids = format_case_ids(reserve_case_ids(connection, len(cases)), len(cases))
+    # Nomor bentrok dengan kasus yang ditambahkan dari luar sejak sequence terakhir disamakan: samakan lagi
+    if case_ids_taken(connection, case_ids):
+        reconcile_case_id_sequence(connection)
+        case_ids = format_case_ids(reserve_case_ids(connection, len(cases)), len(cases))
+
+    gejala_cols = get_gejala_columns(connection)
+    cases = [(penyakit_code, [symptom_values.get(col, 0) for col in gejala_cols]
+              if isinstance(symptom_values, dict) else list(symptom_values))
+             for penyakit_code, symptom_values in cases]
+    cols = ['d_case', 'penyakit'] + gejala_cols
+    insert_query = f"""
+    INSERT INTO case_base_table ({', '.join(cols)})
+    VALUES ({', '.join(['%s'] * len(cols))})
+    """
+    rows = [tuple([case_id, penyakit_code] + list(symptom_values))
+            for case_id, (penyakit_code, symptom_values) in zip(case_ids, cases)]
+
+    counts_cols = ['penyakit', 'jumlah_kasus'] + gejala_cols
+    counts_query = backend_of(connection).upsert_increment_sql(CASE_BASE_COUNTS_TABLE, counts_cols, 'penyakit')
+    per_disease = {}
+    for penyakit_code, symptom_values in cases:
+        totals = per_disease.setdefault(penyakit_code, [0] * (len(gejala_cols) + 1))
+        totals[0] += 1
+        for i, value in enumerate(symptom_values):
+            totals[i + 1] += value
+    counts_rows = [tuple([penyakit_code] + totals) for penyakit_code, totals in per_disease.items()]
+
+    cursor = connection.cursor()
     try:
-        cursor = cnx.cursor()
+        cursor.executemany(insert_query, rows)
+        cursor.executemany(counts_query, counts_rows)
+        # Commit, pencatatan kasus sendiri, dan pembaruan model di memori (listener) dalam satu lock:
+        # watcher dan pemuatan model melihat semuanya atau tidak sama sekali
+        with _own_writes_lock:
+            connection.commit()
+            if _own_writes_tracked:
+                _own_case_ids.extend(case_ids)
+            _notify_case_listeners(gejala_cols, cases)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    invalidate_tables('case_base_table', CASE_BASE_COUNTS_TABLE)
+    return case_ids
 
-        # 1. Generate unique d_case ID
-        cursor.execute("SELECT d_case FROM case_base_table ORDER BY d_case DESC LIMIT 1;")
-        last_d_case = cursor.fetchone()
+# Kasus yang ditulis aplikasi ini sendiri (write_cases) sejak pemeriksaan watcher terakhir. Model di proses
+# ini sudah memuatnya (listener dari nb menambahkannya setelah commit), jadi watcher tidak menganggapnya
+# perubahan dari luar. Pencatatan dimulai saat watcher pertama kali memeriksa, sehingga daftar tidak tumbuh
+# tanpa watcher.
+_own_writes_lock = threading.RLock()
+_own_writes_tracked = False
+_own_case_ids = []
+_case_listeners = []
 
-        if last_d_case:
-            last_id_num = int(last_d_case[0][1:]) # e.g., 'C100' -> 100
-            new_id_num = last_id_num + 1
-            new_d_case = f"C{new_id_num:03d}"
-        else:
-            new_d_case = "C001"
-
-        # 2. Convert user_answers to G01-G21 format (0 or 1)
-        symptom_values = []
-        for answer in user_answers:
-            if answer == 'Ya':
-                symptom_values.append(1)
-            elif answer == 'Tidak':
-                symptom_values.append(0)
-            else:
-                symptom_values.append(0) # Treat 'Tidak Diketahui' as 0 for insertion
+# Daftarkan listener(gejala_cols, cases) yang dipanggil setelah write_cases commit, masih di dalam lock.
+# cases = [(kode_penyakit, nilai gejala berurutan sesuai gejala_cols)]. Kasus yang gagal ditulis atau masuk
+# dead-letter tidak pernah sampai ke listener.
+def add_case_listener(listener):
+    if listener not in _case_listeners:
+        _case_listeners.append(listener)
 
-        # Ensure we have 21 symptom values (G01 to G21)
-        if len(symptom_values) != 21:
-            st.error(f"Unexpected number of symptom answers: {len(symptom_values)}. Expected 21.")
-            return False
+def _notify_case_listeners(gejala_cols, cases):
+    for listener in _case_listeners:
+        try:
+            listener(gejala_cols, cases)
+        except Exception:
+            logger.exception("Case listener %r failed", listener)
 
-        # 3. Construct INSERT statement
-        penyakit_code = diagnosis_result['kode_penyakit']
+# Tahan write_cases selama blok with berjalan, mis. saat membangun model dari database: kasus yang di-commit
+# sesudahnya sampai ke model lewat listener, bukan lewat data yang dibaca
+@contextmanager
+def case_writes_paused():
+    with _own_writes_lock:
+        yield
 
-        cols = ['d_case', 'penyakit'] + [f'G{i:02d}' for i in range(1, 22)]
-        placeholders = ', '.join(['%s'] * len(cols))
-        columns_str = ', '.join(cols)
+# Ambil (dan kosongkan) daftar d_case yang ditulis sendiri; write_cases menunggu selama blok with berjalan,
+# sehingga sidik tabel yang diambil di dalam blok konsisten dengan daftar tersebut
+@contextmanager
+def own_case_writes():
+    global _own_writes_tracked
+    with _own_writes_lock:
+        _own_writes_tracked = True
+        case_ids = list(_own_case_ids)
+        _own_case_ids.clear()
+        yield case_ids
 
-        insert_query = f"""
-        INSERT INTO case_base_table ({columns_str})
-        VALUES ({placeholders})
-        """
+# Sidik tabel untuk mendeteksi perubahan dari luar aplikasi: (jumlah baris, nilai maksimum kolom pertama)
+# dan, jika checksum=True, jumlah checksum semua baris (full scan, menangkap UPDATE yang tidak mengubah
+# jumlah baris). Mengembalikan None jika query gagal. Tidak di-cache.
+def get_table_fingerprint(connection, table_name, checksum=False):
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT * FROM {table_name} LIMIT 0")
+        cursor.fetchall()
+        columns = [desc[0] for desc in cursor.description]
+        select = f"COUNT(*), MAX({columns[0]})"
+        if checksum:
+            select += f", SUM({backend_of(connection).row_checksum_sql(columns)})"
+        cursor.execute(f"SELECT {select} FROM {table_name}")
+        fingerprint = tuple(cursor.fetchone())
+        cursor.close()
+        return fingerprint
+    except DB_ERRORS as err:
+        logger.warning("Could not fingerprint %s: %s", table_name, err)
+        return None
+
+# Checksum (seperti get_table_fingerprint) untuk baris tertentu saja: key_column IN keys, per blok 1000 kunci
+def get_rows_checksum(connection, table_name, key_column, keys):
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT * FROM {table_name} LIMIT 0")
+        cursor.fetchall()
+        checksum_sql = backend_of(connection).row_checksum_sql([desc[0] for desc in cursor.description])
+        total = 0
+        for start in range(0, len(keys), 1000):
+            block = keys[start:start + 1000]
+            cursor.execute(f"SELECT SUM({checksum_sql}) FROM {table_name} WHERE {key_column} IN ({', '.join(['%s'] * len(block))})",
+                           tuple(block))
+            total += cursor.fetchone()[0] or 0
+        cursor.close()
+        return total
+    except DB_ERRORS as err:
+        logger.warning("Could not checksum rows of %s: %s", table_name, err)
+        return None
+
+# Antrian tulis (write-behind): kasus baru masuk antrian di memori dan ditulis oleh thread latar
+# per batch. Batch yang gagal dikembalikan ke depan antrian dan dicoba lagi sampai WRITE_MAX_RETRIES kali;
+# setelah itu kasusnya ditulis satu per satu agar kasus yang bermasalah terpisah dari yang lain, dan kasus
+# yang tetap gagal dicatat ke file dead-letter (JSON Lines) untuk diperiksa dan diimpor ulang. Saat proses
+# berhenti, antrian yang tidak dapat ditulis juga masuk dead-letter (tidak dibuang).
+#
+#   CASE_DEAD_LETTER_PATH=case_dead_letter.jsonl
+WRITE_BATCH_SIZE = 100
+WRITE_FLUSH_INTERVAL = 2.0   # detik maksimum sebuah kasus menunggu di antrian
+WRITE_RETRY_DELAY = 5.0
+WRITE_MAX_RETRIES = 3
+DEAD_LETTER_PATH = 'case_dead_letter.jsonl'
+
+class CaseWriter:
+    def __init__(self, batch_size=WRITE_BATCH_SIZE, flush_interval=WRITE_FLUSH_INTERVAL,
+                 max_retries=WRITE_MAX_RETRIES, retry_delay=WRITE_RETRY_DELAY, dead_letter_path=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max(int(max_retries), 1)
+        self.retry_delay = retry_delay
+        self.dead_letter_path = dead_letter_path or os.environ.get('CASE_DEAD_LETTER_PATH', DEAD_LETTER_PATH)
+        self._pending = deque()
+        self._in_flight = 0
+        self._attempts = 0          # percobaan gagal berturut-turut untuk batch di depan antrian
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='case-writer', daemon=True)
+        self.written = 0
+        self.failed_flushes = 0
+        self.dead_lettered = 0
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, penyakit_code, symptom_values):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Case writer is closed.")
+            self._pending.append((penyakit_code, dict(symptom_values) if isinstance(symptom_values, dict) else list(symptom_values)))
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    @property
+    def pending(self):
+        with self._cond:
+            return len(self._pending) + self._in_flight
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._pending) < self.batch_size:
+                    self._cond.wait(timeout=self.flush_interval)
+                if not self._pending:
+                    if self._closed:
+                        return
+                    continue
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                self._in_flight = len(batch)
 
-        values_to_insert = [new_d_case, penyakit_code] + symptom_values
+            try:
+                self._write(batch)
+                with self._cond:
+                    self.written += len(batch)
+                    self._attempts = 0
+            except Exception:
+                with self._cond:
+                    self.failed_flushes += 1
+                    self._attempts += 1
+                    retry = self._attempts < self.max_retries and not self._closed
+                    if retry:
+                        logger.exception("Failed to write %d queued cases (attempt %d of %d); will retry",
+                                         len(batch), self._attempts, self.max_retries)
+                        self._pending.extendleft(reversed(batch))
+                        self._cond.wait(timeout=self.retry_delay)
+                    else:
+                        self._attempts = 0
+                if not retry:
+                    logger.exception("Failed to write %d queued cases; writing them one by one", len(batch))
+                    self._write_each(batch)
+            finally:
+                with self._cond:
+                    self._in_flight = 0
+                    self._cond.notify_all()
 
-        # 4. Execute INSERT statement
-        cursor.execute(insert_query, tuple(values_to_insert))
-        cnx.commit()
+    # Dipanggil dari thread latar: memakai open_connection (bukan get_connection/show_error), kegagalan dicatat di _run
+    def _write(self, batch):
+        with ExitStack() as stack:
+            try:
+                cnx = stack.enter_context(open_connection())
+            except (*DB_ERRORS, ImportError) as err:
+                raise ConnectionError(f"Could not connect to database for case insertion: {err}") from err
+            write_cases(cnx, batch)
+
+    # Tulis kasus satu per satu; kasus yang gagal masuk dead-letter. Jika database tidak dapat dihubungi,
+    # sisa kasus langsung masuk dead-letter tanpa dicoba satu per satu.
+    def _write_each(self, batch):
+        for i, case in enumerate(batch):
+            try:
+                self._write([case])
+                with self._cond:
+                    self.written += 1
+            except ConnectionError as err:
+                self._dead_letter(batch[i:], err)
+                return
+            except Exception as err:
+                self._dead_letter([case], err)
+
+    def _dead_letter(self, cases, error):
+        try:
+            with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+                for penyakit_code, symptom_values in cases:
+                    record = {'penyakit': penyakit_code, 'gejala': symptom_values, 'error': str(error),
+                              'waktu': time.strftime('%Y-%m-%dT%H:%M:%S')}
+                    f.write(json.dumps(record, default=int) + '\n')
+            logger.error("Wrote %d unwritable cases to %s: %s", len(cases), self.dead_letter_path, error)
+        except OSError:
+            logger.exception("Could not write dead-letter file %s; dropping %d cases", self.dead_letter_path, len(cases))
+        with self._cond:
+            self.dead_lettered += len(cases)
+        metrics.inc('case_writer_dead_letter_total', len(cases))
+
+    # Tunggu sampai semua kasus dalam antrian sudah ditulis
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(timeout=remaining)
         return True
 
+    # Hentikan thread setelah antrian dikosongkan (dipanggil otomatis saat proses berhenti)
+    def close(self, timeout=30):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+# Fungsi untuk membuat penulis kasus latar (satu per proses)
+@cache_resource
+def init_case_writer():
+    writer = CaseWriter().start()
+    atexit.register(writer.close)
+    return writer
+
+# New function to insert diagnosis as a new case
+# Kasus dimasukkan ke antrian tulis; ID d_case diberikan saat batch ditulis ke database.
+# codes = kode gejala untuk setiap jawaban (katalog gejala); tanpa codes, jawaban harus berurutan G01-G21.
+def insert_new_case_to_db(diagnosis_result, user_answers, codes=None):
+    # Convert user_answers to G01-G21 format (0 or 1)
+    symptom_values = answers_to_symptom_values(user_answers)
+
+    if codes is not None:
+        if len(codes) != len(symptom_values):
+            show_error(f"Got {len(symptom_values)} answers for {len(codes)} symptom codes.")
+            return False
+        symptom_values = dict(zip(codes, symptom_values))
+    # Ensure we have 21 symptom values (G01 to G21)
+    elif len(symptom_values) != 21:
+        show_error(f"Unexpected number of symptom answers: {len(symptom_values)}. Expected 21.")
+        return False
+
+    try:
+        init_case_writer().submit(diagnosis_result['kode_penyakit'], symptom_values)
+        return True
     except Exception as e:
-        st.error(f"An error occurred during case insertion: {e}")
+        show_error(f"An error occurred during case insertion: {e}")
         return False
-    finally:
-        if cnx and cnx.is_connected():
-            cnx.close()
+
+# Fungsi untuk mengubah jawaban menjadi nilai gejala 0/1 ('Tidak Diketahui' dianggap 0)
+def answers_to_symptom_values(user_answers):
+    symptom_values = []
+    for answer in user_answers:
+        if answer == 'Ya':
+            symptom_values.append(1)
+        elif answer == 'Tidak':
+            symptom_values.append(0)
+        else:
+            symptom_values.append(0) # Treat 'Tidak Diketahui' as 0 for insertion
+    return symptom_values
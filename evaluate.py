@@ -0,0 +1,258 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from nb import NaiveBayesModel, _read_table_file
+from fc import ForwardChainingEngine
+from bitpack import PackedCaseBase, unpack_bits
+
+# Evaluasi akurasi Naive Bayes pada case base dengan stratified k-fold atau leave-one-out.
+#
+#   python evaluate.py --folds 10
+#   python evaluate.py --loo --workers 4 --json hasil.json
+#
+# Model tiap fold tidak dibangun ulang dari DataFrame: jumlah kasus data latih = jumlah total
+# dikurangi jumlah pada fold uji, lalu seluruh fold uji diskor sekaligus (log_scores untuk matriks).
+# Leave-one-out dihitung tanpa membangun N model: hanya skor penyakit milik kasus itu sendiri yang
+# berubah saat kasus dikeluarkan. Fold/blok baris dibagi ke process pool.
+
+LOO_CHUNK_SIZE = 50_000
+
+# Data case base yang sudah dikodekan; dikirim sekali ke setiap worker lewat initializer
+_state = {}
+
+# Ubah case_base (DataFrame penyakit, G01..G21) menjadi matriks gejala dan indeks label.
+# Baris dengan kode penyakit yang tidak dikenal tidak dievaluasi.
+def encode_case_base(data_penyakit, case_base):
+    disease_codes = list(data_penyakit['kode_penyakit'])
+    gejala_codes = [col for col in case_base.columns if col.startswith('G')]
+    index = {code: i for i, code in enumerate(disease_codes)}
+    labels = case_base['penyakit'].map(index).fillna(-1).to_numpy(dtype=np.int64)
+    values = case_base[gejala_codes].fillna(0).to_numpy(dtype=np.int8)
+    keep = labels >= 0
+    return values[keep], labels[keep], gejala_codes
+
+def encode_packed(data_penyakit, packed):
+    disease_codes = list(data_penyakit['kode_penyakit'])
+    position = {code: disease_codes.index(code) if code in disease_codes else -1 for code in packed.disease_codes}
+    mapping = np.array([position[code] for code in packed.disease_codes] + [-1], dtype=np.int64)
+    labels = mapping[packed.disease_idx]
+    values = unpack_bits(packed.rows, len(packed.gejala_codes))
+    keep = labels >= 0
+    return values[keep], labels[keep], packed.gejala_codes
+
+# Jumlah kasus per penyakit dan jumlah 'Ya' per (penyakit, gejala) untuk baris terpilih
+def class_counts(values, labels, n_disease):
+    counts = np.bincount(labels, minlength=n_disease).astype(np.int64)
+    symptoms = np.stack([values[labels == d].sum(axis=0, dtype=np.int64) for d in range(n_disease)])
+    return counts, symptoms.reshape(n_disease, values.shape[1])
+
+# Nomor fold per kasus: kasus tiap penyakit diacak lalu dibagi bergiliran sehingga proporsi penyakit
+# pada setiap fold sama dengan case base
+def stratified_folds(labels, k, seed=0):
+    rng = np.random.default_rng(seed)
+    folds = np.empty(len(labels), dtype=np.int64)
+    offset = 0
+    for d in np.unique(labels):
+        members = rng.permutation(np.flatnonzero(labels == d))
+        folds[members] = (np.arange(len(members)) + offset) % k
+        offset += len(members)
+    return folds
+
+def _init_worker(values, labels, n_disease):
+    _state['values'] = values
+    _state['labels'] = labels
+    _state['n_disease'] = n_disease
+    _state['totals'] = class_counts(values, labels, n_disease)
+
+def _model(counts, symptoms, total_cases, n_disease, n_gejala):
+    return NaiveBayesModel([f'D{d}' for d in range(n_disease)], [''] * n_disease,
+                           [f'G{j}' for j in range(n_gejala)], counts, symptoms, total_cases)
+
+# Satu fold: latih dengan (total - fold uji), skor seluruh fold uji dalam satu perkalian matriks
+def _run_fold(test_index):
+    values, labels, n_disease = _state['values'], _state['labels'], _state['n_disease']
+    total_counts, total_symptoms = _state['totals']
+    test_values, test_labels = values[test_index], labels[test_index]
+    fold_counts, fold_symptoms = class_counts(test_values, test_labels, n_disease)
+
+    model = _model(total_counts - fold_counts, total_symptoms - fold_symptoms,
+                   len(labels) - len(test_index), n_disease, values.shape[1])
+    scores = model.log_scores(test_values, np.ones(test_values.shape, dtype=bool))
+    return test_labels, scores.argmax(axis=1)
+
+# Skor leave-one-out untuk blok baris [start, stop): skor semua penyakit dari model penuh (dengan N - 1
+# kasus sebagai total prior), lalu skor penyakit milik kasus itu dihitung ulang tanpa kasus tersebut
+def _loo_scores(start, stop):
+    values, labels, n_disease = _state['values'], _state['labels'], _state['n_disease']
+    counts, symptoms = _state['totals']
+    x, y = values[start:stop].astype(float), labels[start:stop]
+
+    model = _model(counts, symptoms, len(labels) - 1, n_disease, values.shape[1])
+    scores = model.log_scores(x, np.ones(x.shape, dtype=bool))
+
+    own_counts = counts[y] - 1
+    own_yes, own_no = NaiveBayesModel._log_likelihood(own_counts, symptoms[y] - x)
+    prior = own_counts / (len(labels) - 1) if len(labels) > 1 else np.zeros(len(y))
+    own_prior = np.log(np.where(prior > 0, prior, 1e-6))
+    scores[np.arange(len(y)), y] = own_prior + (x * own_yes + (1 - x) * own_no).sum(axis=1)
+    return y, scores
+
+def _run_loo_chunk(bounds):
+    y, scores = _loo_scores(*bounds)
+    return y, scores.argmax(axis=1)
+
+def _parallel_map(function, tasks, values, labels, n_disease, workers):
+    if workers <= 1:
+        _init_worker(values, labels, n_disease)
+        return [function(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(values, labels, n_disease)) as pool:
+        return list(pool.map(function, tasks))
+
+def cross_validate(values, labels, n_disease, k=10, seed=0, workers=1):
+    k = min(k, len(labels))
+    folds = stratified_folds(labels, k, seed)
+    tasks = [np.flatnonzero(folds == f) for f in range(k)]
+    return _collect(_parallel_map(_run_fold, tasks, values, labels, n_disease, workers))
+
+def leave_one_out(values, labels, n_disease, workers=1, chunk_size=LOO_CHUNK_SIZE):
+    tasks = [(start, min(start + chunk_size, len(labels))) for start in range(0, len(labels), chunk_size)]
+    return _collect(_parallel_map(_run_loo_chunk, tasks, values, labels, n_disease, workers))
+
+def _collect(results):
+    y_true = np.concatenate([r[0] for r in results]) if results else np.zeros(0, dtype=np.int64)
+    y_pred = np.concatenate([r[1] for r in results]) if results else np.zeros(0, dtype=np.int64)
+    return y_true, y_pred
+
+# Matriks konfusi (baris = penyakit sebenarnya, kolom = prediksi)
+def confusion_matrix(y_true, y_pred, n_disease):
+    return np.bincount(y_true * n_disease + y_pred, minlength=n_disease * n_disease).reshape(n_disease, n_disease)
+
+# Precision/recall/F1 per penyakit dari matriks konfusi
+def per_class_report(confusion, disease_codes):
+    true_positive = np.diag(confusion).astype(float)
+    predicted = confusion.sum(axis=0)
+    support = confusion.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predicted > 0, true_positive / predicted, 0.0)
+        recall = np.where(support > 0, true_positive / support, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    return pd.DataFrame({'precision': precision, 'recall': recall, 'f1': f1, 'support': support},
+                        index=pd.Index(disease_codes, name='penyakit'))
+
+# Aturan forward chaining tidak dilatih dari case base, jadi dievaluasi langsung pada seluruh kasus:
+# untuk tiap penyakit, precision = aturan terpenuhi dan benar / aturan terpenuhi, recall = ... / jumlah kasus
+def rule_report(engine, values, labels, disease_codes):
+    fired = engine.evaluate_batch(values)
+    rows = []
+    for d, code in enumerate(disease_codes):
+        columns = [i for i, rule_code in enumerate(engine.rule_codes) if rule_code == code]
+        hit = fired[:, columns].any(axis=1) if columns else np.zeros(len(labels), dtype=bool)
+        actual = labels == d
+        true_positive = int((hit & actual).sum())
+        rows.append({
+            'penyakit': code,
+            'precision': true_positive / hit.sum() if hit.sum() else 0.0,
+            'recall': true_positive / actual.sum() if actual.sum() else 0.0,
+            'terpenuhi': int(hit.sum()),
+            'support': int(actual.sum())
+        })
+    report = pd.DataFrame(rows).set_index('penyakit')
+    report.attrs['coverage'] = float(fired.any(axis=1).mean()) if len(labels) else 0.0
+    return report
+
+def evaluate(data_penyakit, values, labels, k=10, loo=False, seed=0, workers=1, engine=None):
+    disease_codes = list(data_penyakit['kode_penyakit'])
+    start = time.perf_counter()
+    if loo:
+        y_true, y_pred = leave_one_out(values, labels, len(disease_codes), workers)
+    else:
+        y_true, y_pred = cross_validate(values, labels, len(disease_codes), k, seed, workers)
+    confusion = confusion_matrix(y_true, y_pred, len(disease_codes))
+
+    result = {
+        'metode': 'leave-one-out' if loo else f'stratified {min(k, len(labels))}-fold',
+        'kasus': int(len(labels)),
+        'akurasi': float(np.trace(confusion) / confusion.sum()) if confusion.sum() else 0.0,
+        'confusion': pd.DataFrame(confusion, index=pd.Index(disease_codes, name='aktual'),
+                                  columns=pd.Index(disease_codes, name='prediksi')),
+        'per_penyakit': per_class_report(confusion, disease_codes),
+        'detik': time.perf_counter() - start
+    }
+    if engine is not None:
+        result['aturan'] = rule_report(engine, values, labels, disease_codes)
+    return result
+
+def load_case_base(args):
+    if str(args.case_base).endswith('.spkb'):
+        from knowledge import KnowledgeBase
+        kb = KnowledgeBase.load(args.case_base)
+        values, labels = kb.case_values()
+        keep = labels >= 0
+        return kb.data_penyakit(), (values[keep], labels[keep].astype(np.int64), kb.gejala_codes)
+    if args.db:
+        from db_funcs import get_connection, get_table_data
+        with get_connection() as cnx:
+            if cnx is None:
+                raise ConnectionError("Could not connect to database for evaluation.")
+            data_penyakit = get_table_data(cnx, 'data_penyakit_table')
+            case_base = get_table_data(cnx, 'case_base_table')
+    else:
+        data_penyakit = _read_table_file(args.penyakit)
+        case_base = None if str(args.case_base).endswith('.npz') else _read_table_file(args.case_base)
+    data_penyakit.columns = [col.lower() for col in data_penyakit.columns]
+
+    if case_base is None:
+        return data_penyakit, encode_packed(data_penyakit, PackedCaseBase.load(args.case_base))
+    case_base.columns = [col.lower() if not col.startswith('G') else col for col in case_base.columns]
+    return data_penyakit, encode_case_base(data_penyakit, case_base)
+
+def _to_json(result):
+    output = {}
+    for key, value in result.items():
+        if isinstance(value, pd.DataFrame):
+            output[key] = json.loads(value.to_json(orient='index'))
+            output.update({f'{key}_{name}': attr for name, attr in value.attrs.items()})
+        else:
+            output[key] = value
+    return output
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluasi akurasi Naive Bayes (dan aturan forward chaining) pada case base")
+    parser.add_argument('--folds', type=int, default=10, help="Jumlah fold untuk stratified k-fold")
+    parser.add_argument('--loo', action='store_true', help="Leave-one-out, bukan k-fold")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Jumlah proses untuk fold/blok paralel")
+    parser.add_argument('--penyakit', default='data_penyakit.xlsx', help="File data penyakit (xlsx/csv)")
+    parser.add_argument('--case-base', default='case_base.xlsx', help="File case base (xlsx/csv/parquet, .npz format padat, atau artefak .spkb)")
+    parser.add_argument('--db', action='store_true', help="Baca case base dari database, bukan dari file")
+    parser.add_argument('--relasi', default='relasi.xlsx', help="File relasi untuk mengevaluasi aturan ('' untuk melewati)")
+    parser.add_argument('--json', help="Tulis hasil evaluasi ke file JSON")
+    args = parser.parse_args(argv)
+
+    data_penyakit, (values, labels, gejala_codes) = load_case_base(args)
+    engine = ForwardChainingEngine.from_relasi(_read_table_file(args.relasi)) if args.relasi else None
+    result = evaluate(data_penyakit, values, labels, args.folds, args.loo, args.seed, args.workers, engine)
+
+    print(f"{result['metode']} pada {result['kasus']} kasus ({result['detik']:.2f} s): akurasi {result['akurasi']:.4f}")
+    print(result['per_penyakit'].round(4).to_string())
+    print()
+    print(result['confusion'].to_string())
+    if engine is not None:
+        print()
+        print(f"Aturan forward chaining (cakupan {result['aturan'].attrs['coverage']:.4f}):")
+        print(result['aturan'].round(4).to_string())
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(_to_json(result), f, indent=2)
+        print(f"Hasil disimpan ke {args.json}", file=sys.stderr)
+    return result
+
+if __name__ == '__main__':
+    main()
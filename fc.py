@@ -0,0 +1,184 @@
+import difflib
+import os
+import re
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+from bitpack import pack_bits
+from catalog import reorder_answers
+from st_compat import cache_resource, show_error
+
+# Aturan forward chaining: IF semua gejala pada mask bernilai 'Ya' THEN penyakit.
+# Bit ke-i pada mask mewakili gejala ke-i (G01 = bit 0, G02 = bit 1, ...).
+Rule = namedtuple('Rule', ['kode_penyakit', 'mask', 'gejala'])
+
+# Mesin forward chaining dengan aturan yang dikompilasi menjadi bitmask
+class ForwardChainingEngine:
+    def __init__(self, gejala_codes, rules):
+        self.gejala_codes = list(gejala_codes)
+        self.rules = list(rules)
+        self.rule_codes = [rule.kode_penyakit for rule in self.rules]
+        self.masks = [rule.mask for rule in self.rules]
+        self.rule_sizes = np.array([bin(mask).count('1') for mask in self.masks], dtype=np.int64)
+        self._bit = {code: 1 << i for i, code in enumerate(self.gejala_codes)}
+
+    # Kompilasi aturan dari matriks relasi (baris = gejala, kolom = penyakit)
+    @classmethod
+    def from_relasi(cls, relasi):
+        gejala_codes = list(relasi['kode_gejala'])
+        disease_cols = [col for col in relasi.columns if col not in ('gejala', 'kode_gejala')]
+        rules = []
+        for kode_penyakit in disease_cols:
+            present = relasi[kode_penyakit].fillna(0).astype(float).to_numpy() > 0
+            codes = [code for code, p in zip(gejala_codes, present) if p]
+            mask = sum(1 << i for i, p in enumerate(present) if p)
+            rules.append(Rule(kode_penyakit, mask, codes))
+        return cls(gejala_codes, rules)
+
+    # Kompilasi aturan dari teks IF ... AND ... THEN (representasi_pengetahuan) dengan data_gejala.
+    # Nama gejala pada teks harus sama persis (setelah normalisasi) dengan data_gejala. strict=False mengizinkan
+    # pencocokan terdekat (difflib) untuk teks yang penulisannya berbeda; lihat approximate_matches.
+    @classmethod
+    def from_representasi(cls, representasi, data_gejala, strict=True):
+        gejala_codes = list(data_gejala['kode_gejala'])
+        rules = []
+        for kode_penyakit, antecedents in _rule_antecedents(representasi):
+            codes = [match_symptom(antecedent, data_gejala, strict, kode_penyakit)[0] for antecedent in antecedents]
+            rules.append(Rule(kode_penyakit, sum(1 << gejala_codes.index(code) for code in set(codes)), codes))
+        return cls(gejala_codes, rules)
+
+    # Fungsi untuk mengubah jawaban menjadi bitmask 'Ya' dan bitmask 'Tidak'
+    def pack(self, answers):
+        yes_bits = 0
+        no_bits = 0
+        for i, answer in enumerate(answers[:len(self.gejala_codes)]):
+            if answer == 'Ya':
+                yes_bits |= 1 << i
+            elif answer == 'Tidak':
+                no_bits |= 1 << i
+        return yes_bits, no_bits
+
+    # Aturan yang terpenuhi: setiap gejala pada antecedent dijawab 'Ya'
+    def fired(self, yes_bits):
+        return [rule for rule in self.rules if yes_bits & rule.mask == rule.mask]
+
+    # Aturan yang masih mungkin terpenuhi: belum ada gejala antecedent yang dijawab 'Tidak'
+    def candidates(self, no_bits):
+        return [rule for rule in self.rules if no_bits & rule.mask == 0]
+
+    def evaluate(self, answers):
+        yes_bits, no_bits = self.pack(answers)
+        return {
+            'aturan_terpenuhi': [rule.kode_penyakit for rule in self.fired(yes_bits)],
+            'aturan_kandidat': [rule.kode_penyakit for rule in self.candidates(no_bits)]
+        }
+
+    # Evaluasi semua aturan untuk banyak vektor jawaban sekaligus: hasil (N, aturan) boolean
+    def evaluate_batch(self, values, known=None):
+        values = np.atleast_2d(np.asarray(values))[:, :len(self.gejala_codes)]
+        yes = values.astype(bool)
+        if known is not None:
+            yes &= np.atleast_2d(np.asarray(known, dtype=bool))[:, :len(self.gejala_codes)]
+
+        if len(self.gejala_codes) <= 64:
+            packed = pack_bits(yes)
+            masks = np.array(self.masks, dtype=np.uint64)
+            return (packed[:, None] & masks[None, :]) == masks[None, :]
+
+        # Katalog gejala lebih dari 64: hitung jumlah antecedent yang terpenuhi per aturan
+        rule_matrix = np.array([[(mask >> i) & 1 for i in range(len(self.gejala_codes))] for mask in self.masks])
+        return yes.astype(np.int64) @ rule_matrix.T == self.rule_sizes
+
+    # Sesi inkremental untuk kuesioner: aturan dievaluasi ulang setiap kali satu pertanyaan dijawab
+    def session(self):
+        return ForwardChainingSession(self)
+
+class ForwardChainingSession:
+    def __init__(self, engine):
+        self.engine = engine
+        self.yes_bits = 0
+        self.no_bits = 0
+        self.fired = []
+
+    # Catat jawaban untuk pertanyaan ke-index; mengembalikan aturan yang baru terpenuhi
+    def answer(self, index, answer):
+        bit = 1 << index
+        self.yes_bits &= ~bit
+        self.no_bits &= ~bit
+        if answer == 'Ya':
+            self.yes_bits |= bit
+        elif answer == 'Tidak':
+            self.no_bits |= bit
+
+        fired = [rule.kode_penyakit for rule in self.engine.fired(self.yes_bits)]
+        newly_fired = [code for code in fired if code not in self.fired]
+        self.fired = fired
+        return newly_fired
+
+    @property
+    def candidates(self):
+        return [rule.kode_penyakit for rule in self.engine.candidates(self.no_bits)]
+
+# Fungsi untuk memecah teks aturan "IF A AND B THEN P" menjadi daftar antecedent
+def parse_antecedents(aturan):
+    match = re.search(r'\bIF\b(.*?)\bTHEN\b', aturan, flags=re.IGNORECASE | re.DOTALL)
+    if not match:
+        raise ValueError(f"Rule is not in IF ... THEN ... form: {aturan}")
+    return [part.strip() for part in re.split(r'\bAND\b', match.group(1)) if part.strip()]
+
+# Kode gejala untuk satu nama gejala pada teks aturan: (kode, cocok persis)
+def match_symptom(antecedent, data_gejala, strict=True, kode_penyakit=None):
+    names = {_normalize(name): code for name, code in zip(data_gejala['gejala'], data_gejala['kode_gejala'])}
+    key = _normalize(antecedent)
+    if key in names:
+        return names[key], True
+    match = [] if strict else difflib.get_close_matches(key, list(names), n=1, cutoff=0.6)
+    if not match:
+        raise ValueError(f"Unknown symptom '{antecedent}' in rule for {kode_penyakit}.")
+    return names[match[0]], False
+
+# Nama gejala pada representasi_pengetahuan yang tidak sama persis dengan data_gejala:
+# daftar (kode penyakit, teks aturan, kode gejala hasil pencocokan terdekat)
+def approximate_matches(representasi, data_gejala):
+    matches = []
+    for kode_penyakit, antecedents in _rule_antecedents(representasi):
+        for antecedent in antecedents:
+            code, exact = match_symptom(antecedent, data_gejala, False, kode_penyakit)
+            if not exact:
+                matches.append((kode_penyakit, antecedent, code))
+    return matches
+
+def _rule_antecedents(representasi):
+    for kode_penyakit, aturan in zip(representasi['Penyakit'], representasi['Aturan']):
+        if pd.isna(kode_penyakit) or pd.isna(aturan):
+            continue
+        yield str(kode_penyakit).strip(), parse_antecedents(aturan)
+
+def _normalize(name):
+    name = name.lower().replace('&', ' dan ')
+    return re.sub(r'\s+', ' ', name).strip()
+
+# Path bawaan relatif terhadap direktori modul, bukan direktori kerja
+DEFAULT_RELASI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'relasi.xlsx')
+
+# Mesin aturan dibangun sekali dari matriks relasi (xlsx atau artefak .spkb) dan di-cache lintas sesi
+@cache_resource
+def load_rule_engine(relasi_path=DEFAULT_RELASI_PATH):
+    if str(relasi_path).endswith('.spkb'):
+        from knowledge import KnowledgeBase
+        return KnowledgeBase.load(relasi_path).rule_engine()
+    return ForwardChainingEngine.from_relasi(pd.read_excel(relasi_path))
+
+# Mesin aturan dari artefak basis pengetahuan jika KNOWLEDGE_BASE diset, selain itu dari relasi.xlsx
+def get_rule_engine():
+    return load_rule_engine(os.environ.get('KNOWLEDGE_BASE') or DEFAULT_RELASI_PATH)
+
+# Fungsi Forward Chaining; codes = kode gejala untuk setiap jawaban (tanpa codes: jawaban ke-i = gejala ke-i)
+def forward_chaining_diagnosis(answers, codes=None):
+    try:
+        engine = get_rule_engine()
+        return engine.evaluate(reorder_answers(answers, codes, engine.gejala_codes))
+    except Exception as e:
+        show_error(f"An error occurred during forward chaining: {e}")
+        return None
@@ -0,0 +1,395 @@
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+import numpy as np
+
+# Artefak basis pengetahuan terkompilasi: lima workbook xlsx (case_base, data_gejala, data_penyakit, relasi,
+# representasi_pengetahuan) divalidasi lalu dikompilasi menjadi satu file biner berversi, sehingga app dan
+# service dapat memuat katalog, model Naive Bayes, dan aturan forward chaining dalam hitungan milidetik
+# tanpa database dan tanpa membaca xlsx.
+#
+#   python knowledge.py build                           # xlsx di direktori ini -> knowledge_base.spkb
+#   python knowledge.py build --source-dir data/ --output kb.spkb
+#   python knowledge.py validate                        # hanya validasi sumber
+#   python knowledge.py info knowledge_base.spkb
+#
+#   KNOWLEDGE_BASE=knowledge_base.spkb streamlit run app.py
+#
+# Format file: MAGIC (8 byte) | versi format (uint32) | panjang header (uint32) | header JSON | array ...
+# Header memuat versi basis pengetahuan (hash sumber), kode/nama/pertanyaan gejala, kode/nama penyakit,
+# teks aturan, dan tata letak array (nama, dtype, shape, offset). Setiap array disejajarkan 64 byte
+# sehingga dapat dipetakan langsung dengan np.memmap (read-only, tanpa menyalin).
+
+MAGIC = b'SPKBART\0'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+DEFAULT_ARTIFACT_PATH = 'knowledge_base.spkb'
+SOURCES = {
+    'case_base': 'case_base.xlsx',
+    'data_gejala': 'data_gejala.xlsx',
+    'data_penyakit': 'data_penyakit.xlsx',
+    'relasi': 'relasi.xlsx',
+    'representasi_pengetahuan': 'representasi_pengetahuan.xlsx',
+}
+_PREAMBLE = struct.Struct('<8sII')
+
+class KnowledgeBase:
+    def __init__(self, header, arrays, path=None):
+        self.header = header
+        self.arrays = arrays
+        self.path = path
+        self.version = header['versi']
+        self.gejala_codes = header['gejala']['kode']
+        self.disease_codes = header['penyakit']['kode']
+
+    # Muat artefak; mmap=True memetakan array langsung dari file (halaman dibaca saat diakses)
+    @classmethod
+    def load(cls, path=DEFAULT_ARTIFACT_PATH, mmap=True):
+        header, data_offset = read_header(path)
+        if mmap:
+            buffer = np.memmap(path, dtype=np.uint8, mode='r')
+        else:
+            with open(path, 'rb') as f:
+                buffer = np.frombuffer(f.read(), dtype=np.uint8)
+
+        arrays = {}
+        for name, dtype_str, shape, offset in header['layout']:
+            count = int(np.prod(shape, dtype=np.int64))
+            view = np.frombuffer(buffer, dtype=dtype_str, count=count, offset=data_offset + offset).reshape(shape)
+            view.flags.writeable = False
+            arrays[name] = view
+        return cls(header, arrays, path)
+
+    @property
+    def catalog(self):
+        from catalog import SymptomCatalog
+        gejala = self.header['gejala']
+        return SymptomCatalog(gejala['kode'], gejala['nama'], gejala['pertanyaan'])
+
+    def data_penyakit(self):
+        import pandas as pd
+        return pd.DataFrame({'kode_penyakit': self.disease_codes, 'nama_penyakit': self.header['penyakit']['nama']})
+
+    # Model Naive Bayes dari parameter yang sudah dikompilasi (tanpa menghitung ulang)
+    def model(self):
+        from nb import NaiveBayesModel, ModelParams
+        return NaiveBayesModel.from_params(
+            self.disease_codes, self.header['penyakit']['nama'], self.gejala_codes,
+            self.arrays['class_counts'], self.arrays['symptom_counts'], self.header['total_kasus'],
+            [self.arrays[name] for name in ModelParams._fields])
+
+    # Mesin forward chaining dari matriks relasi (baris = penyakit pada relasi, kolom = gejala)
+    def rule_engine(self):
+        from fc import ForwardChainingEngine, Rule
+        rules = []
+        for kode_penyakit, present in zip(self.header['relasi'], self.arrays['relasi']):
+            present = present.astype(bool)
+            codes = [code for code, p in zip(self.gejala_codes, present) if p]
+            rules.append(Rule(kode_penyakit, sum(1 << i for i, p in enumerate(present) if p), codes))
+        return ForwardChainingEngine(self.gejala_codes, rules)
+
+    # Nilai gejala case base (kasus x gejala, 0/1) dan indeks penyakit (-1 = kode tidak dikenal)
+    def case_values(self):
+        values = np.unpackbits(self.arrays['case_bits'], axis=1, count=len(self.gejala_codes), bitorder='little')
+        return values, self.arrays['case_disease']
+
+    def packed_case_base(self):
+        from bitpack import PackedCaseBase, pack_bits
+        values, disease_idx = self.case_values()
+        return PackedCaseBase(pack_bits(values), disease_idx, self.disease_codes, self.gejala_codes)
+
+    def info(self):
+        return {
+            'path': self.path,
+            'versi': self.version,
+            'versi_format': self.header['versi_format'],
+            'dibuat': self.header['dibuat'],
+            'gejala': len(self.gejala_codes),
+            'penyakit': len(self.disease_codes),
+            'total_kasus': self.header['total_kasus'],
+            'aturan': len(self.header['relasi']),
+            'sumber': self.header['sumber'],
+            'peringatan': self.header.get('peringatan', []),
+            'array': {name: {'dtype': array.dtype.str, 'shape': list(array.shape), 'bytes': int(array.nbytes)}
+                      for name, array in self.arrays.items()}
+        }
+
+# Baca header tanpa memuat array; mengembalikan (header, offset awal data array)
+def read_header(path):
+    with open(path, 'rb') as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            raise ValueError(f"{path} is not a knowledge base artifact.")
+        magic, format_version, header_length = _PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a knowledge base artifact.")
+        if format_version != FORMAT_VERSION:
+            raise ValueError(f"{path} has artifact format version {format_version}, expected {FORMAT_VERSION}.")
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    return header, _aligned(_PREAMBLE.size + header_length)
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+# Baca kelima sumber (xlsx/csv/parquet) dari source_dir; nama kolom disamakan dengan yang dipakai nb/fc
+def read_sources(source_dir='.', paths=None):
+    from nb import _read_table_file
+    paths = {name: os.path.join(source_dir, filename) for name, filename in SOURCES.items()} | (paths or {})
+    frames = normalize_columns({name: _read_table_file(path) for name, path in paths.items()})
+    return frames, paths
+
+# Samakan nama kolom sumber (di tempat): huruf kecil, kecuali kode penyakit (P..) pada tabel katalog/relasi
+# dan kode gejala (G..) pada case base. Tabel yang tidak ada di frames dilewati.
+def normalize_columns(frames):
+    for name in ('data_gejala', 'data_penyakit', 'relasi'):
+        if name in frames:
+            frames[name].columns = [str(col).strip().lower() if not str(col).strip().startswith('P') else str(col).strip()
+                                    for col in frames[name].columns]
+    if 'case_base' in frames:
+        frames['case_base'].columns = [str(col).strip().lower() if not str(col).strip().startswith('G') else str(col).strip()
+                                       for col in frames['case_base'].columns]
+    return frames
+
+# Periksa konsistensi sumber; mengembalikan daftar masalah (kosong jika valid)
+def validate_sources(frames):
+    from catalog import SymptomCatalog
+    from fc import ForwardChainingEngine
+    problems = []
+    data_gejala = frames['data_gejala']
+    data_penyakit = frames['data_penyakit']
+    relasi = frames['relasi']
+    case_base = frames['case_base']
+    representasi = frames['representasi_pengetahuan']
+
+    for name, frame, columns in [('data_gejala', data_gejala, ['kode_gejala', 'gejala']),
+                                 ('data_penyakit', data_penyakit, ['kode_penyakit', 'nama_penyakit']),
+                                 ('relasi', relasi, ['kode_gejala']),
+                                 ('case_base', case_base, ['penyakit']),
+                                 ('representasi_pengetahuan', representasi, ['Penyakit', 'Aturan'])]:
+        missing = [col for col in columns if col not in frame.columns]
+        if missing:
+            problems.append(f"{name}: missing column(s) {', '.join(missing)}.")
+    if problems:
+        return problems
+
+    # Kode gejala: pertanyaan (katalog) = data_gejala = relasi = kolom case_base, dengan urutan yang sama
+    catalog = SymptomCatalog.from_frame(data_gejala)
+    gejala_codes = catalog.codes
+    duplicates = sorted({code for code in gejala_codes if gejala_codes.count(code) > 1})
+    if duplicates:
+        problems.append(f"data_gejala: duplicate symptom code(s) {', '.join(duplicates)}.")
+    if len(catalog) != len(data_gejala):
+        problems.append(f"data_gejala: {len(data_gejala) - len(catalog)} row(s) without kode_gejala.")
+    if 'pertanyaan' in data_gejala.columns:
+        unasked = [code for code, question in zip(data_gejala['kode_gejala'], data_gejala['pertanyaan'])
+                   if not isinstance(question, str) or not question.strip()]
+        if unasked:
+            problems.append(f"data_gejala: no question text for {', '.join(map(str, unasked))}.")
+
+    relasi_codes = [str(code).strip() for code in relasi['kode_gejala']]
+    case_codes = [col for col in case_base.columns if col.startswith('G')]
+    for name, codes in [('relasi', relasi_codes), ('case_base', case_codes)]:
+        if len(codes) != len(gejala_codes):
+            problems.append(f"{name}: {len(codes)} symptom(s), data_gejala has {len(gejala_codes)}.")
+        if codes != gejala_codes:
+            missing = [code for code in gejala_codes if code not in codes]
+            extra = [code for code in codes if code not in gejala_codes]
+            if missing:
+                problems.append(f"{name}: missing symptom code(s) {', '.join(missing)}.")
+            if extra:
+                problems.append(f"{name}: symptom code(s) not in data_gejala: {', '.join(extra)}.")
+            if not missing and not extra:
+                problems.append(f"{name}: symptom codes are not in data_gejala order.")
+
+    # Kode penyakit harus dikenal data_penyakit
+    disease_codes = [str(code).strip() for code in data_penyakit['kode_penyakit']]
+    duplicates = sorted({code for code in disease_codes if disease_codes.count(code) > 1})
+    if duplicates:
+        problems.append(f"data_penyakit: duplicate disease code(s) {', '.join(duplicates)}.")
+    known = set(disease_codes)
+    relasi_diseases = [col for col in relasi.columns if col not in ('gejala', 'kode_gejala')]
+    for name, codes in [('relasi', relasi_diseases),
+                        ('case_base', case_base['penyakit'].dropna().astype(str).str.strip().unique()),
+                        ('representasi_pengetahuan', representasi['Penyakit'].dropna().astype(str).str.strip())]:
+        unknown = sorted(set(codes) - known)
+        if unknown:
+            problems.append(f"{name}: disease code(s) not in data_penyakit: {', '.join(unknown)}.")
+    if case_base['penyakit'].isna().any():
+        problems.append(f"case_base: {int(case_base['penyakit'].isna().sum())} case(s) without penyakit.")
+
+    # Nilai gejala case base dan relasi hanya 0/1
+    for name, values in [('case_base', case_base[[col for col in case_codes if col in gejala_codes]]),
+                         ('relasi', relasi[relasi_diseases])]:
+        invalid = ~values.isin([0, 1])
+        if invalid.to_numpy().any():
+            problems.append(f"{name}: {int(invalid.to_numpy().sum())} symptom value(s) other than 0/1.")
+    if 'd_case' in case_base.columns and case_base['d_case'].duplicated().any():
+        problems.append(f"case_base: duplicate d_case {', '.join(map(str, case_base['d_case'][case_base['d_case'].duplicated()].unique()[:5]))}.")
+
+    # Aturan IF ... THEN harus dapat dicocokkan ke data_gejala (setidaknya dengan pencocokan terdekat)
+    try:
+        ForwardChainingEngine.from_representasi(representasi, data_gejala, strict=False)
+    except ValueError as e:
+        problems.append(f"representasi_pengetahuan: {e}")
+    return problems
+
+# Perbedaan antara kedua sumber aturan: nama gejala yang hanya cocok secara terdekat dan gejala per penyakit
+# yang berbeda antara relasi (dipakai mesin aturan) dan representasi_pengetahuan. Dipanggil setelah
+# validate_sources lolos; hasilnya peringatan (atau masalah dengan strict).
+def rule_source_differences(frames):
+    from fc import ForwardChainingEngine, approximate_matches
+    data_gejala = frames['data_gejala']
+    representasi = frames['representasi_pengetahuan']
+    names = dict(zip(data_gejala['kode_gejala'], data_gejala['gejala']))
+    differences = [f"representasi_pengetahuan: '{antecedent}' ({kode_penyakit}) is not an exact symptom name; "
+                   f"closest is {code} '{names[code]}'."
+                   for kode_penyakit, antecedent, code in approximate_matches(representasi, data_gejala)]
+
+    relasi = {rule.kode_penyakit: set(rule.gejala) for rule in ForwardChainingEngine.from_relasi(frames['relasi']).rules}
+    text = {rule.kode_penyakit: set(rule.gejala)
+            for rule in ForwardChainingEngine.from_representasi(representasi, data_gejala, strict=False).rules}
+    for kode_penyakit in sorted(set(relasi) | set(text)):
+        only_relasi = sorted(relasi.get(kode_penyakit, set()) - text.get(kode_penyakit, set()))
+        only_text = sorted(text.get(kode_penyakit, set()) - relasi.get(kode_penyakit, set()))
+        if kode_penyakit not in relasi or kode_penyakit not in text:
+            source = 'relasi' if kode_penyakit not in relasi else 'representasi_pengetahuan'
+            differences.append(f"{kode_penyakit}: no rule in {source}.")
+        elif only_relasi or only_text:
+            differences.append(f"{kode_penyakit}: relasi and representasi_pengetahuan disagree "
+                               f"(only in relasi: {', '.join(only_relasi) or '-'}; "
+                               f"only in representasi_pengetahuan: {', '.join(only_text) or '-'}).")
+    return differences
+
+# Validasi dan kompilasi sumber menjadi artefak; mengembalikan KnowledgeBase hasil muat ulang
+# Perbedaan sumber aturan dicatat di header ('peringatan'); strict=True menjadikannya masalah.
+def build_artifact(output=DEFAULT_ARTIFACT_PATH, source_dir='.', paths=None, strict=False):
+    from nb import NaiveBayesModel, ModelParams
+    from catalog import SymptomCatalog
+    frames, paths = read_sources(source_dir, paths)
+    problems = validate_sources(frames)
+    warnings = rule_source_differences(frames) if not problems else []
+    if strict:
+        problems += warnings
+    if problems:
+        raise ValueError("Invalid knowledge base sources:\n" + '\n'.join(f"- {problem}" for problem in problems))
+
+    catalog = SymptomCatalog.from_frame(frames['data_gejala'])
+    data_penyakit = frames['data_penyakit']
+    case_base = frames['case_base']
+    relasi = frames['relasi']
+    representasi = frames['representasi_pengetahuan'].dropna(subset=['Penyakit', 'Aturan'])
+    disease_codes = [str(code).strip() for code in data_penyakit['kode_penyakit']]
+    relasi_diseases = [col for col in relasi.columns if col not in ('gejala', 'kode_gejala')]
+
+    model = NaiveBayesModel.from_frames(data_penyakit, case_base)
+    index = {code: i for i, code in enumerate(disease_codes)}
+    values = case_base[catalog.codes].to_numpy(dtype=np.uint8)
+    arrays = {
+        'class_counts': model.class_counts,
+        'symptom_counts': model.symptom_counts,
+        **{name: getattr(model.params, name) for name in ModelParams._fields},
+        'relasi': relasi[relasi_diseases].fillna(0).to_numpy(dtype=np.uint8).T,
+        'case_bits': np.packbits(values, axis=1, bitorder='little'),
+        'case_disease': case_base['penyakit'].astype(str).str.strip().map(index).fillna(-1).to_numpy(dtype=np.int32),
+    }
+
+    layout = []
+    offset = 0
+    for name, array in arrays.items():
+        array = arrays[name] = np.ascontiguousarray(array)
+        offset = _aligned(offset)
+        layout.append((name, array.dtype.str, list(array.shape), offset))
+        offset += array.nbytes
+
+    sources = {name: {'file': os.path.basename(path), 'sha256': _sha256(path)} for name, path in paths.items()}
+    header = {
+        'versi_format': FORMAT_VERSION,
+        'versi': hashlib.sha256(''.join(source['sha256'] for source in sources.values()).encode()).hexdigest()[:16],
+        'dibuat': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'sumber': sources,
+        'gejala': {'kode': catalog.codes, 'nama': catalog.names, 'pertanyaan': catalog.questions},
+        'penyakit': {'kode': disease_codes, 'nama': [str(name) for name in data_penyakit['nama_penyakit']]},
+        'total_kasus': model.total_cases,
+        'relasi': relasi_diseases,
+        'aturan': [{'penyakit': str(code).strip(), 'aturan': str(aturan)}
+                   for code, aturan in zip(representasi['Penyakit'], representasi['Aturan'])],
+        'peringatan': warnings,
+        'layout': layout,
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    data_offset = _aligned(_PREAMBLE.size + len(header_bytes))
+
+    # Tulis ke file sementara lalu ganti secara atomik, sehingga pembaca tidak pernah melihat artefak setengah jadi
+    tmp_path = f'{output}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, dtype_str, shape, start in layout:
+            f.write(b'\0' * (data_offset + start - f.tell()))
+            f.write(arrays[name].tobytes())
+    os.replace(tmp_path, output)
+    return KnowledgeBase.load(output)
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validasi dan kompilasi basis pengetahuan xlsx menjadi artefak biner")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="Validasi sumber lalu tulis artefak")
+    build.add_argument('--source-dir', default='.', help="Direktori kelima file sumber")
+    build.add_argument('--output', default=DEFAULT_ARTIFACT_PATH, help="File artefak (.spkb)")
+    validate = commands.add_parser('validate', help="Hanya validasi sumber")
+    validate.add_argument('--source-dir', default='.', help="Direktori kelima file sumber")
+    info = commands.add_parser('info', help="Tampilkan isi header artefak")
+    info.add_argument('path', nargs='?', default=DEFAULT_ARTIFACT_PATH)
+    for command in (build, validate):
+        command.add_argument('--strict', action='store_true',
+                             help="Perbedaan antara relasi dan representasi_pengetahuan dianggap masalah")
+        for name, filename in SOURCES.items():
+            command.add_argument(f"--{name.replace('_', '-')}", dest=name, help=f"File {name} (default: {filename})")
+    args = parser.parse_args(argv)
+
+    if args.command == 'info':
+        start = time.perf_counter()
+        kb = KnowledgeBase.load(args.path)
+        report = kb.info()
+        report['waktu_muat_ms'] = (time.perf_counter() - start) * 1000
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return 0
+
+    paths = {name: getattr(args, name) for name in SOURCES if getattr(args, name)}
+    if args.command == 'validate':
+        frames = read_sources(args.source_dir, paths)[0]
+        problems = validate_sources(frames)
+        warnings = rule_source_differences(frames) if not problems else []
+        if args.strict:
+            problems, warnings = problems + warnings, []
+        for problem in problems:
+            print(f"- {problem}", file=sys.stderr)
+        for warning in warnings:
+            print(f"- peringatan: {warning}", file=sys.stderr)
+        print("Sumber valid." if not problems else f"{len(problems)} masalah ditemukan.", file=sys.stderr)
+        return 1 if problems else 0
+
+    try:
+        kb = build_artifact(args.output, args.source_dir, paths, args.strict)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    for warning in kb.header.get('peringatan', []):
+        print(f"- peringatan: {warning}", file=sys.stderr)
+    print(f"Artefak {args.output} versi {kb.version}: {len(kb.gejala_codes)} gejala, {len(kb.disease_codes)} penyakit, "
+          f"{kb.header['total_kasus']} kasus, {os.path.getsize(args.output)} byte", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+# Uji beban lokal untuk service.py: sejumlah klien keep-alive mengirim request diagnosis
+# secara bersamaan, lalu melaporkan latensi p50/p99 dan request per detik.
+
+ANSWER_CHOICES = ['Ya', 'Tidak', 'Tidak Diketahui']
+
+def random_answers(n_gejala=21):
+    return [random.choice(ANSWER_CHOICES) for _ in range(n_gejala)]
+
+def build_request(host, path, payload):
+    body = json.dumps(payload).encode('utf-8')
+    head = (f"POST {path} HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+async def client(host, port, path, requests, latencies, errors, batch_size):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(requests):
+            if batch_size:
+                payload = {'answers': [random_answers() for _ in range(batch_size)]}
+            else:
+                payload = {'answers': random_answers()}
+            request = build_request(host, path, payload)
+
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+async def run(args):
+    latencies = []
+    errors = []
+    path = '/diagnosis/batch' if args.batch_size else '/diagnosis'
+    per_client = max(1, args.requests // args.concurrency)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client(args.host, args.port, path, per_client, latencies, errors, args.batch_size)
+        for _ in range(args.concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'path': path,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'concurrency': args.concurrency,
+        'elapsed_s': elapsed,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Uji beban lokal untuk layanan diagnosis (service.py)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--requests', type=int, default=10_000, help="Jumlah total request")
+    parser.add_argument('--concurrency', type=int, default=32, help="Jumlah klien bersamaan")
+    parser.add_argument('--batch-size', type=int, default=0, help="Jika > 0, kirim /diagnosis/batch dengan N kuesioner per request")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    print(f"{report['requests']} requests ({report['errors']} errors) ke {report['path']} "
+          f"dengan {report['concurrency']} klien dalam {report['elapsed_s']:.2f} s")
+    print(f"  {report['rps']:.0f} req/s, p50 {report['p50_ms']:.2f} ms, p99 {report['p99_ms']:.2f} ms")
+    return report
+
+if __name__ == '__main__':
+    main()
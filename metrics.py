@@ -0,0 +1,221 @@
+import bisect
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Instrumentasi ringan tanpa dependensi: histogram latensi per fase diagnosis dan per query database,
+# ditampilkan di panel sidebar (app.py), di GET /metrics (service.py), atau ditulis ke file
+# dalam format teks Prometheus (METRICS_FILE).
+
+# Batas bucket histogram (detik), seperti default klien Prometheus tetapi dimulai dari 10 µs
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RECENT_QUERIES = 50
+METRICS_PREFIX = 'sistem_pakar'
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # bucket terakhir = +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    # Perkiraan kuantil dari bucket (interpolasi linear di dalam bucket)
+    def quantile(self, q):
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= target and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (target - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}  # (nama, label) -> Histogram
+        self._counters = {}    # (nama, label) -> nilai
+        self._help = {}
+        self.recent_queries = deque(maxlen=RECENT_QUERIES)
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    # Catat beberapa fase sekaligus dari titik waktu perf_counter berurutan (marks[i] -> marks[i + 1]
+    # adalah fase phases[i]); satu kali lock, untuk jalur panas seperti diagnosis
+    def observe_phases(self, name, phases, marks):
+        with self._lock:
+            for phase, start, end in zip(phases, marks, marks[1:]):
+                key = (name, (('phase', phase),))
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(self.buckets)
+                histogram.observe(end - start)
+
+    # Catat durasi blok with ke histogram name
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    # Satu query database: latensi (execute + fetch), jumlah baris dan perkiraan ukuran data
+    def record_query(self, sql, rows, nbytes, seconds):
+        query = normalize_sql(sql)
+        self.observe('query_seconds', seconds, query=query)
+        self.inc('query_rows_total', rows, query=query)
+        self.inc('query_bytes_total', nbytes, query=query)
+        self.recent_queries.append({
+            'waktu': time.strftime('%H:%M:%S'),
+            'query': query,
+            'baris': rows,
+            'bytes': nbytes,
+            'ms': seconds * 1000
+        })
+
+    # Ringkasan histogram (untuk tabel di panel diagnostik)
+    def summary(self, name):
+        with self._lock:
+            items = [(dict(labels), histogram) for (metric, labels), histogram in self._histograms.items() if metric == name]
+            rows = []
+            for labels, histogram in items:
+                rows.append({
+                    **labels,
+                    'jumlah': histogram.count,
+                    'rata2_ms': histogram.sum / histogram.count * 1000 if histogram.count else 0.0,
+                    'p50_ms': histogram.quantile(0.5) * 1000,
+                    'p95_ms': histogram.quantile(0.95) * 1000,
+                    'p99_ms': histogram.quantile(0.99) * 1000,
+                    'total_ms': histogram.sum * 1000
+                })
+        return sorted(rows, key=lambda row: -row['total_ms'])
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    # Format eksposisi teks Prometheus (version 0.0.4)
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        described = set()
+        for (name, labels), histogram in histograms:
+            metric = f'{METRICS_PREFIX}_{name}'
+            if name not in described:
+                described.add(name)
+                if name in self._help:
+                    lines.append(f'# HELP {metric} {self._help[name]}')
+                lines.append(f'# TYPE {metric} histogram')
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), histogram.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{metric}_bucket{_labels(labels + (("le", le),))} {cumulative}')
+            lines.append(f'{metric}_sum{_labels(labels)} {histogram.sum!r}')
+            lines.append(f'{metric}_count{_labels(labels)} {histogram.count}')
+
+        for (name, labels), value in counters:
+            metric = f'{METRICS_PREFIX}_{name}'
+            if name not in described:
+                described.add(name)
+                if name in self._help:
+                    lines.append(f'# HELP {metric} {self._help[name]}')
+                lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric}{_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    # Tulis ke file secara atomik (mis. untuk textfile collector node_exporter)
+    def write_prometheus(self, path):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self.recent_queries.clear()
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+# Teks SQL sebagai label: spasi dirapikan dan dipotong agar kardinalitas label tetap kecil
+def normalize_sql(sql, limit=120):
+    if isinstance(sql, (bytes, bytearray)):
+        sql = sql.decode('utf-8', 'replace')
+    sql = re.sub(r'\s+', ' ', str(sql)).strip()
+    return sql if len(sql) <= limit else sql[:limit - 3] + '...'
+
+# Perkiraan ukuran data hasil query: panjang teks/biner, 8 byte untuk nilai lain
+def row_bytes(rows):
+    total = 0
+    for row in rows:
+        for value in (row.values() if isinstance(row, dict) else row):
+            total += len(value) if isinstance(value, (str, bytes, bytearray)) else 8
+    return total
+
+# Registry bersama untuk satu proses
+metrics = MetricsRegistry()
+metrics.describe('diagnosis_phase_seconds', 'Duration of each naive_bayes_diagnosis phase.')
+metrics.describe('model_build_phase_seconds', 'Duration of each Naive Bayes model compilation phase.')
+metrics.describe('model_reload_seconds', 'Duration of a background model rebuild after the case base changed.')
+metrics.describe('model_watch_changes_total', 'External table changes detected by the model watcher.')
+metrics.describe('diagnosis_cache_total', 'Diagnosis result cache lookups by result (hit/miss).')
+metrics.describe('diagnosis_cache_evictions_total', 'Diagnosis cache entries evicted by the LRU bound.')
+metrics.describe('diagnosis_cache_invalidations_total', 'Diagnosis cache entries dropped after the model changed.')
+metrics.describe('case_writer_dead_letter_total', 'Queued cases that could not be written and went to the dead-letter file.')
+metrics.describe('query_seconds', 'Database query latency including fetch.')
+metrics.describe('query_rows_total', 'Rows returned or written by database queries.')
+metrics.describe('query_bytes_total', 'Approximate bytes fetched by database queries.')
+metrics.describe('page_render_seconds', 'Streamlit page render duration.')
+metrics.describe('http_request_seconds', 'HTTP request duration in the diagnosis service.')
+
+# Ekspor berkala ke file (dijalankan di thread latar)
+def start_file_exporter(path, interval=15.0, registry=metrics):
+    def run():
+        while True:
+            try:
+                registry.write_prometheus(path)
+            except OSError:
+                pass
+            time.sleep(interval)
+    thread = threading.Thread(target=run, name='metrics-file-exporter', daemon=True)
+    thread.start()
+    return thread
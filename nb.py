@@ -1,125 +1,575 @@
-import streamlit as st
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+import numpy as np
 import pandas as pd
-from db_funcs import init_connection, get_table_data
+from bitpack import PackedCaseBase, unpack_bits
+from catalog import reorder_answers
+from metrics import metrics
+from db_funcs import (get_connection, get_table_data, get_case_base_counts, get_case_base_version,
+                      add_case_listener, case_writes_paused)
+from st_compat import cache_resource, show_error
 
-# Fungsi Naive Bayes
-def naive_bayes_diagnosis(answers):
-    cnx = init_connection()
-    if cnx is None:
-        st.error("Could not connect to database for diagnosis.")
-        return None
+# Fungsi untuk mengubah jawaban kuesioner menjadi vektor gejala (nilai 0/1 dan mask jawaban yang diketahui)
+def encode_answers(answers):
+    values = np.zeros(len(answers), dtype=np.int8)
+    known = np.zeros(len(answers), dtype=bool)
+    for i, answer in enumerate(answers):
+        if answer == 'Ya':
+            values[i] = 1
+            known[i] = True
+        elif answer == 'Tidak':
+            known[i] = True
+        # 'Tidak Diketahui' answers are not used in likelihood calculation
+    return values, known
 
-    try:
-        # 1. Fetch data_penyakit_table
-        data_penyakit = get_table_data(cnx, 'data_penyakit_table')
-        if data_penyakit.empty:
-            st.error("Could not fetch 'data_penyakit_table' from database.")
+# Versi batch dari encode_answers untuk matriks jawaban (N x gejala).
+# Menerima 'Ya'/'Tidak' atau 1/0; nilai lain (kosong, 'Tidak Diketahui') dianggap tidak diketahui.
+def encode_answer_matrix(answers):
+    frame = pd.DataFrame(answers)
+    yes = frame.isin(['Ya', 1, '1', True]).to_numpy()
+    no = frame.isin(['Tidak', 0, '0', False]).to_numpy()
+    return yes.astype(np.int8), yes | no
+
+# Parameter hasil kompilasi; diganti sebagai satu objek sehingga pembaca tidak pernah melihat model setengah jadi
+ModelParams = namedtuple('ModelParams', ['log_prior', 'log_yes', 'log_no', 'log_ratio'])
+
+# Model Naive Bayes yang sudah dikompilasi: prior dan likelihood (dalam log) disimpan sebagai array NumPy
+class NaiveBayesModel:
+    def __init__(self, disease_codes, disease_names, gejala_codes, class_counts, symptom_counts, total_cases=None):
+        self.disease_codes = list(disease_codes)
+        self.disease_names = list(disease_names)
+        self.gejala_codes = list(gejala_codes)
+        self.class_counts = np.asarray(class_counts, dtype=np.int64)      # (penyakit,)
+        self.symptom_counts = np.asarray(symptom_counts, dtype=np.int64)  # (penyakit, gejala)
+        # Prior dihitung terhadap seluruh baris case base (termasuk kode penyakit yang tidak dikenal)
+        self.total_cases = int(self.class_counts.sum() if total_cases is None else total_cases)
+        self._lock = threading.Lock()
+        self.compile()
+
+    # Bangun model dari parameter yang sudah dikompilasi (mis. array di shared memory) tanpa menyalin atau menghitung ulang
+    @classmethod
+    def from_params(cls, disease_codes, disease_names, gejala_codes, class_counts, symptom_counts, total_cases, params):
+        model = cls.__new__(cls)
+        model.disease_codes = list(disease_codes)
+        model.disease_names = list(disease_names)
+        model.gejala_codes = list(gejala_codes)
+        model.class_counts = class_counts
+        model.symptom_counts = symptom_counts
+        model.total_cases = int(total_cases)
+        model._lock = threading.Lock()
+        model.params = ModelParams(*params)
+        return model
+
+    # Bangun model dari data_penyakit_table dan case_base_table dalam bentuk DataFrame
+    @classmethod
+    def from_frames(cls, data_penyakit, case_base):
+        gejala_cols = [col for col in case_base.columns if col.startswith('G')]
+        disease_codes = list(data_penyakit['kode_penyakit'])
+        grouped = case_base.groupby('penyakit')
+        class_counts = grouped.size().reindex(disease_codes, fill_value=0).to_numpy()
+        symptom_counts = grouped[gejala_cols].sum().reindex(disease_codes, fill_value=0).to_numpy()
+        return cls(disease_codes, data_penyakit['nama_penyakit'], gejala_cols,
+                   class_counts, symptom_counts, total_cases=len(case_base))
+
+    # Bangun model dari case base yang dipadatkan (bitpack.PackedCaseBase); jumlah dihitung dengan AND + popcount
+    @classmethod
+    def from_packed(cls, data_penyakit, packed):
+        disease_codes = list(data_penyakit['kode_penyakit'])
+        class_counts, symptom_counts = packed.counts()
+        position = {code: i for i, code in enumerate(packed.disease_codes)}
+        rows = [position.get(code) for code in disease_codes]
+        aligned_class = np.array([class_counts[i] if i is not None else 0 for i in rows], dtype=np.int64)
+        aligned_symptom = np.array([symptom_counts[i] if i is not None else np.zeros(len(packed.gejala_codes), dtype=np.int64)
+                                    for i in rows], dtype=np.int64).reshape(len(rows), len(packed.gejala_codes))
+        return cls(disease_codes, data_penyakit['nama_penyakit'], packed.gejala_codes,
+                   aligned_class, aligned_symptom, total_cases=len(packed))
+
+    # Bangun model dari statistik agregat per penyakit (hasil get_case_base_counts)
+    @classmethod
+    def from_counts(cls, data_penyakit, counts):
+        gejala_cols = [col for col in counts.columns if col.startswith('G')]
+        disease_codes = list(data_penyakit['kode_penyakit'])
+        counts = counts.set_index('penyakit')
+        aligned = counts.reindex(disease_codes, fill_value=0)
+        return cls(disease_codes, data_penyakit['nama_penyakit'], gejala_cols,
+                   aligned['jumlah_kasus'].to_numpy(), aligned[gejala_cols].to_numpy(),
+                   total_cases=int(counts['jumlah_kasus'].sum()))
+
+    # Hitung ulang log prior dan log likelihood (Laplace smoothing) dari jumlah kasus
+    def compile(self):
+        with metrics.timer('model_build_phase_seconds', phase='likelihood'):
+            log_yes, log_no = self._log_likelihood(self.class_counts, self.symptom_counts)
+        with metrics.timer('model_build_phase_seconds', phase='prior'):
+            log_prior = self._log_prior()
+        self.params = ModelParams(log_prior, log_yes, log_no, log_yes - log_no)
+
+    def _log_prior(self):
+        if self.total_cases > 0:
+            prior = self.class_counts / self.total_cases
+        else:
+            prior = np.zeros(len(self.disease_codes))
+        prior = np.where(prior > 0, prior, 1e-6) # Use a small value if prior is 0 for robustness
+        return np.log(prior)
+
+    @staticmethod
+    def _log_likelihood(class_counts, symptom_counts):
+        n = np.asarray(class_counts)[..., None].astype(float)
+        log_yes = np.log((symptom_counts + 1) / (n + 2))
+        log_no = np.log((n - symptom_counts + 1) / (n + 2))
+        return log_yes, log_no
+
+    # Tambahkan satu kasus baru tanpa membangun ulang model: hanya baris penyakit tersebut
+    # yang dihitung ulang (O(gejala)), ditambah vektor prior (O(penyakit))
+    def add_case(self, kode_penyakit, symptom_values):
+        values = np.zeros(len(self.gejala_codes), dtype=np.int64)
+        symptom_values = np.asarray(symptom_values, dtype=np.int64)[:len(self.gejala_codes)]
+        values[:len(symptom_values)] = symptom_values
+
+        with self._lock:
+            self.total_cases += 1
+            if kode_penyakit not in self.disease_codes:
+                # Kode penyakit tidak dikenal hanya memengaruhi prior
+                self.params = self.params._replace(log_prior=self._log_prior())
+                return
+
+            d = self.disease_codes.index(kode_penyakit)
+            class_counts = self.class_counts.copy()
+            symptom_counts = self.symptom_counts.copy()
+            class_counts[d] += 1
+            symptom_counts[d] += values
+            self.class_counts, self.symptom_counts = class_counts, symptom_counts
+
+            row_yes, row_no = self._log_likelihood(class_counts[d], symptom_counts[d])
+            log_yes, log_no = self.params.log_yes.copy(), self.params.log_no.copy()
+            log_yes[d], log_no[d] = row_yes, row_no
+            self.params = ModelParams(self._log_prior(), log_yes, log_no, log_yes - log_no)
+
+    @property
+    def log_prior(self):
+        return self.params.log_prior
+
+    @property
+    def log_yes(self):
+        return self.params.log_yes
+
+    @property
+    def log_no(self):
+        return self.params.log_no
+
+    @property
+    def log_ratio(self):
+        return self.params.log_ratio
+
+    # Samakan panjang jawaban dengan jumlah gejala pada model (jawaban ke-i -> gejala ke-i)
+    def _align(self, values, known):
+        n_gejala = len(self.gejala_codes)
+        width = values.shape[-1]
+        if width > n_gejala:
+            return values[..., :n_gejala], known[..., :n_gejala]
+        if width < n_gejala:
+            pad = [(0, 0)] * (values.ndim - 1) + [(0, n_gejala - width)]
+            return np.pad(values, pad), np.pad(known, pad)
+        return values, known
+
+    # Skor log (prior + likelihood) untuk satu vektor (gejala,) atau banyak vektor (N, gejala)
+    def log_scores(self, values, known):
+        params = self.params
+        return params.log_prior + self.log_likelihood(values, known, params)
+
+    # Jumlah log likelihood gejala yang diketahui untuk setiap penyakit (tanpa prior)
+    def log_likelihood(self, values, known, params=None):
+        params = self.params if params is None else params
+        values, known = self._align(np.asarray(values), np.asarray(known, dtype=bool))
+        observed_yes = (values.astype(bool) & known).astype(float)
+        return known.astype(float) @ params.log_no.T + observed_yes @ params.log_ratio.T
+
+    # Probabilitas posterior ternormalisasi untuk setiap penyakit
+    def posterior(self, answers):
+        values, known = encode_answers(answers)
+        return normalize_log_scores(self.log_scores(values, known))
+
+    # Probabilitas posterior untuk banyak vektor sekaligus: hasil (N, penyakit)
+    def posterior_batch(self, values, known=None):
+        values = np.atleast_2d(np.asarray(values))
+        if known is None:
+            known = np.ones(values.shape, dtype=bool)
+        return normalize_log_scores(self.log_scores(values, known))
+
+    # Posterior untuk jawaban dalam format padat: bit 'Ya' dan bit 'diketahui' per baris (lihat bitpack.pack_bits)
+    def posterior_packed(self, yes_bits, known_bits):
+        width = len(self.gejala_codes)
+        return self.posterior_batch(unpack_bits(yes_bits, width), unpack_bits(known_bits, width).astype(bool))
+
+    # Diagnosis batch untuk DataFrame jawaban; kolom G-code dipakai jika ada, selain itu urutan kolom
+    def diagnose_frame(self, answers):
+        gejala_cols = [col for col in answers.columns if col in self.gejala_codes]
+        if gejala_cols:
+            answers = answers.reindex(columns=self.gejala_codes)
+        values, known = encode_answer_matrix(answers)
+        probabilities = self.posterior_batch(values, known)
+
+        result = pd.DataFrame(probabilities, columns=self.disease_codes, index=answers.index)
+        if self.disease_codes:
+            best = probabilities.argmax(axis=1)
+            result['kode_penyakit'] = np.asarray(self.disease_codes)[best]
+            result['nama_penyakit'] = np.asarray(self.disease_names)[best]
+            result['confidence'] = probabilities[np.arange(len(best)), best]
+        result['gejala_terdeteksi'] = (values.astype(bool) & known).sum(axis=1)
+        return result
+
+    # Expected information gain (penurunan entropi posterior) untuk setiap gejala jika ditanyakan berikutnya
+    def information_gain(self, probabilities):
+        p_yes_given = np.exp(self.params.log_yes)                 # (penyakit, gejala)
+        joint_yes = probabilities[:, None] * p_yes_given
+        joint_no = probabilities[:, None] * (1 - p_yes_given)
+        p_yes = joint_yes.sum(axis=0)
+        p_no = joint_no.sum(axis=0)
+        expected = p_yes * _entropy(joint_yes / p_yes) + p_no * _entropy(joint_no / p_no)
+        return _entropy(probabilities[:, None])[0] - expected
+
+    # Apakah penyakit teratas tetap teratas apa pun jawaban pertanyaan yang tersisa
+    def ranking_settled(self, scores, remaining):
+        params = self.params
+        top = int(np.argmax(scores))
+        worst = np.minimum(params.log_yes[top] - params.log_yes, params.log_no[top] - params.log_no)
+        margin = scores[top] - scores + (worst * remaining).sum(axis=1)
+        margin[top] = np.inf
+        return bool((margin > 0).all())
+
+    # Pilih indeks pertanyaan berikutnya yang paling informatif (jawaban None = belum ditanyakan).
+    # Mengembalikan None jika kuesioner bisa dihentikan: posterior teratas >= threshold,
+    # tidak ada pertanyaan tersisa, atau tidak ada jawaban tersisa yang bisa mengubah peringkat.
+    def next_question(self, answers, threshold=0.95):
+        values, known = encode_answers(answers)
+        values, known = self._align(values, known)
+        remaining = np.array([i < len(answers) and answers[i] is None for i in range(len(self.gejala_codes))])
+        if not remaining.any() or not self.disease_codes:
             return None
-        # Ensure consistent column names (lowercase) if not already
-        data_penyakit.columns = [col.lower() for col in data_penyakit.columns]
 
-        # 2. Fetch case_base_table
-        case_base = get_table_data(cnx, 'case_base_table')
-        if case_base.empty:
-            st.error("Could not fetch 'case_base_table' from database.")
+        scores = self.log_scores(values, known)
+        probabilities = normalize_log_scores(scores)
+        if probabilities.max() >= threshold or self.ranking_settled(scores, remaining):
             return None
-        # Ensure consistent column names (lowercase) if not already
-        case_base.columns = [col.lower() if not col.startswith('G') else col for col in case_base.columns]
-
-        # Map user answers to G-codes (0 or 1)
-        input_gejala = {}
-        gejala_codes = [f'G{i:02d}' for i in range(1, len(answers) + 1)] # Using len(answers) to match available questions
-        for i, answer in enumerate(answers):
-            if answer == 'Ya':
-                input_gejala[gejala_codes[i]] = 1
-            elif answer == 'Tidak':
-                input_gejala[gejala_codes[i]] = 0
-            # 'Tidak Diketahui' answers are not used in direct likelihood calculation for now
-
-        # 3. Calculate Prior Probabilities
-        prior = case_base['penyakit'].value_counts(normalize=True)
-
-        # 4. Calculate Likelihoods with Laplace Smoothing
-        likelihood = {}
-        gejala_cols_in_case_base = [col for col in case_base.columns if col.startswith('G')]
-
-        for penyakit_code in data_penyakit['kode_penyakit']:
-            subset = case_base[case_base['penyakit'] == penyakit_code]
-            total_cases_for_disease = len(subset)
-
-            likelihood[penyakit_code] = {}
-
-            for g_code in gejala_cols_in_case_base:
-                if g_code in input_gejala: # Only calculate likelihood for symptoms in input_gejala
-                    count_yes = subset[g_code].sum()
-
-                    # Laplace smoothing
-                    prob_yes = (count_yes + 1) / (total_cases_for_disease + 2)
-                    prob_no = (total_cases_for_disease - count_yes + 1) / (total_cases_for_disease + 2)
-
-                    likelihood[penyakit_code][g_code] = {
-                        '1': prob_yes,
-                        '0': prob_no
-                    }
-                # If g_code is not in input_gejala, it means the user marked it as 'Tidak Diketahui'
-                # or it wasn't asked. We don't factor it into the likelihood product for that specific symptom.
-
-        # 5. Implement Naive Bayes Algorithm
-        disease_probabilities = {}
-        total_probability_sum = 0
-
-        for penyakit_code in data_penyakit['kode_penyakit']:
-            prior_p = prior.get(penyakit_code, 1e-6) # Use a small value if prior is 0 for robustness
-            probability_for_disease = prior_p
-
-            # Multiply by likelihoods of the observed symptoms
-            for g_code, val in input_gejala.items():
-                if g_code in likelihood[penyakit_code]:
-                    prob_g_given_d = likelihood[penyakit_code][g_code][str(val)]
-                    probability_for_disease *= prob_g_given_d
-                else:
-                    # If a G-code from input_gejala is not found in likelihood (shouldn't happen if setup is correct),
-                    # assign a neutral probability or handle as error.
-                    # For now, we assume all relevant G-codes are in likelihood.
-                    pass
-
-            disease_probabilities[penyakit_code] = probability_for_disease
-            total_probability_sum += probability_for_disease
-
-        # 6. Normalize Probabilities
-        normalized_probabilities = {}
-        if total_probability_sum > 0:
-            for pk_code, prob in disease_probabilities.items():
-                normalized_probabilities[pk_code] = prob / total_probability_sum
-        else:
-            # If total_probability_sum is 0, assign equal probability (or handle as no diagnosis)
-            num_diseases = len(data_penyakit['kode_penyakit'])
-            for pk_code in data_penyakit['kode_penyakit']:
-                normalized_probabilities[pk_code] = 1.0 / num_diseases if num_diseases > 0 else 0
 
-        # 7. Determine the disease with the highest probability
-        if not normalized_probabilities:
+        gain = np.where(remaining, self.information_gain(probabilities), -np.inf)
+        return int(np.argmax(gain))
+
+    def diagnose(self, answers):
+        if not self.disease_codes:
+            return self.result(answers, None)
+        return self.result(answers, self.posterior(answers))
+
+    # Susun hasil diagnosis dari probabilitas posterior (None jika tidak ada penyakit)
+    def result(self, answers, probabilities):
+        gejala_terdeteksi = sum(1 for ans in answers if ans == 'Ya')
+        if probabilities is None or not self.disease_codes:
             return {
                 'kode_penyakit': 'Unknown',
                 'nama_penyakit': 'Tidak Dapat Didiagnosis',
                 'confidence': 0.0,
-                'gejala_terdeteksi': sum(1 for ans in answers if ans == 'Ya'),
+                'gejala_terdeteksi': gejala_terdeteksi,
                 'total_gejala': len(answers)
             }
 
-        most_likely_disease_code = max(normalized_probabilities, key=normalized_probabilities.get)
-        confidence = normalized_probabilities[most_likely_disease_code]
-
-        disease_name = data_penyakit.loc[data_penyakit['kode_penyakit'] == most_likely_disease_code, 'nama_penyakit'].values[0]
-
-        # Return the result dictionary
+        best = int(np.argmax(probabilities))
         return {
-            'kode_penyakit': most_likely_disease_code,
-            'nama_penyakit': disease_name,
-            'confidence': confidence,
-            'gejala_terdeteksi': sum(1 for ans in answers if ans == 'Ya'),
+            'kode_penyakit': self.disease_codes[best],
+            'nama_penyakit': self.disease_names[best],
+            'confidence': float(probabilities[best]),
+            'gejala_terdeteksi': gejala_terdeteksi,
             'total_gejala': len(answers)
         }
+
+# Bentuk padat vektor jawaban untuk kunci cache: (bitmask 'Ya', bitmask jawaban yang diketahui)
+def answer_key(answers):
+    yes = known = 0
+    for i, answer in enumerate(answers):
+        if answer == 'Ya':
+            yes |= 1 << i
+            known |= 1 << i
+        elif answer == 'Tidak':
+            known |= 1 << i
+    return yes, known
+
+# Cache LRU posterior lintas sesi untuk pola jawaban yang berulang (kunci: answer_key).
+# Versi model = objek ModelParams yang sedang berlaku: add_case dan model baru (case base berubah)
+# selalu mengganti ModelParams, sehingga isi cache dibuang otomatis pada akses berikutnya.
+DIAGNOSIS_CACHE_SIZE = 4096
+
+class DiagnosisCache:
+    def __init__(self, maxsize=DIAGNOSIS_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # answer_key -> posterior (read-only)
+        self._params = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, params, key):
+        with self._lock:
+            if params is not self._params:
+                self._reset(params)
+            probabilities = self._entries.get(key)
+            if probabilities is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        metrics.inc('diagnosis_cache_total', result='miss' if probabilities is None else 'hit')
+        return probabilities
+
+    def put(self, params, key, probabilities):
+        probabilities.setflags(write=False)
+        evicted = 0
+        with self._lock:
+            # Model berubah selama posterior dihitung: hasil untuk versi lama tidak disimpan
+            if params is not self._params:
+                return
+            self._entries[key] = probabilities
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                evicted += 1
+            self.evictions += evicted
+        if evicted:
+            metrics.inc('diagnosis_cache_evictions_total', evicted)
+
+    def _reset(self, params):
+        if self._entries:
+            self.invalidations += len(self._entries)
+            metrics.inc('diagnosis_cache_invalidations_total', len(self._entries))
+            self._entries.clear()
+        self._params = params
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._params = None
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'size': len(self._entries),
+                'maxsize': self.maxsize
+            }
+
+diagnosis_cache = DiagnosisCache()
+
+# Posterior untuk jawaban yang sudah berurutan sesuai gejala model; pola yang pernah dihitung
+# untuk versi model yang sama diambil dari diagnosis_cache tanpa perhitungan ulang.
+# marks (opsional): daftar perf_counter yang ditambah titik akhir fase encode, likelihood, scoring dan
+# normalization (lihat DIAGNOSIS_PHASES); cache hit hanya menambah titik akhir encode.
+def cached_posterior(model, answers, marks=None):
+    marks = [] if marks is None else marks
+    params = model.params
+    key = answer_key(answers)
+    probabilities = diagnosis_cache.get(params, key)
+    if probabilities is not None:
+        marks.append(time.perf_counter())
+        return probabilities
+    values, known = encode_answers(answers)
+    marks.append(time.perf_counter())
+    likelihood = model.log_likelihood(values, known, params)
+    marks.append(time.perf_counter())
+    scores = params.log_prior + likelihood
+    marks.append(time.perf_counter())
+    probabilities = normalize_log_scores(scores)
+    marks.append(time.perf_counter())
+    diagnosis_cache.put(params, key, probabilities)
+    return probabilities
+
+# Normalisasi skor log menjadi probabilitas (log-sum-exp agar tidak underflow)
+def normalize_log_scores(scores):
+    scores = np.asarray(scores, dtype=float)
+    if scores.shape[-1] == 0:
+        return scores
+    shifted = np.exp(scores - scores.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+# Entropi (nat) per kolom dari matriks probabilitas (penyakit x kolom)
+def _entropy(probabilities):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = np.where(probabilities > 0, probabilities * np.log(probabilities), 0.0)
+    return -terms.sum(axis=0)
+
+# Model dibangun sekali dan di-cache lintas sesi; dibangun ulang hanya jika versi case base berubah
+# Penulisan kasus ditahan selama model dibaca dan dipasang, supaya setiap kasus masuk ke model tepat sekali
+# (lewat data yang dibaca atau lewat apply_written_cases)
+@cache_resource(max_entries=1)
+def load_model(case_base_version):
+    with get_connection() as cnx:
+        if cnx is None:
+            raise ConnectionError("Could not connect to database for diagnosis.")
+        with case_writes_paused():
+            model = load_model_from_db(cnx)
+            swap_model(model, case_base_version)
+            return model
+
+# Bangun model dari database memakai koneksi yang sudah dipinjam
+def load_model_from_db(cnx):
+    # 1. Fetch data_penyakit_table
+    data_penyakit = get_table_data(cnx, 'data_penyakit_table')
+    if data_penyakit.empty:
+        raise ValueError("Could not fetch 'data_penyakit_table' from database.")
+    # Ensure consistent column names (lowercase) if not already
+    data_penyakit.columns = [col.lower() for col in data_penyakit.columns]
+
+    # 2. Fetch per-disease counts of case_base_table (GROUP BY penyakit)
+    counts = get_case_base_counts(cnx)
+    if counts.empty:
+        raise ValueError("Could not fetch 'case_base_table' from database.")
+    # Ensure consistent column names (lowercase) if not already
+    counts.columns = [col.lower() if not col.startswith('G') else col for col in counts.columns]
+
+    return NaiveBayesModel.from_counts(data_penyakit, counts)
+
+# Bangun model dari file (xlsx/csv), tanpa database.
+# Artefak basis pengetahuan (.spkb, lihat knowledge.py) sudah memuat data penyakit, sehingga data_penyakit_path diabaikan.
+def load_model_from_files(data_penyakit_path='data_penyakit.xlsx', case_base_path='case_base.xlsx'):
+    if str(case_base_path).endswith('.spkb'):
+        from knowledge import KnowledgeBase
+        return KnowledgeBase.load(case_base_path).model()
+    data_penyakit = _read_table_file(data_penyakit_path)
+    data_penyakit.columns = [col.lower() for col in data_penyakit.columns]
+    if str(case_base_path).endswith('.npz'):
+        return NaiveBayesModel.from_packed(data_penyakit, PackedCaseBase.load(case_base_path))
+    case_base = _read_table_file(case_base_path)
+    case_base.columns = [col.lower() if not col.startswith('G') else col for col in case_base.columns]
+    return NaiveBayesModel.from_frames(data_penyakit, case_base)
+
+def _read_table_file(path):
+    if str(path).endswith('.csv'):
+        return pd.read_csv(path)
+    if str(path).endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_excel(path)
+
+# Model dari artefak basis pengetahuan: dipetakan dari file (mmap) sekali dan di-cache lintas sesi
+@cache_resource
+def load_model_from_artifact(path):
+    from knowledge import KnowledgeBase
+    return KnowledgeBase.load(path).model()
+
+# Model yang sedang dipakai get_model: (versi case base, model). Diganti sebagai satu referensi,
+# sehingga diagnosis yang sedang berjalan tetap memakai model lama sampai selesai.
+_current_model = None
+
+# Ambil model Naive Bayes untuk versi case base saat ini.
+# Jika KNOWLEDGE_BASE diset (path artefak .spkb), model dibaca dari artefak tanpa database.
+def get_model():
+    global _current_model
+    if os.environ.get('KNOWLEDGE_BASE'):
+        return load_model_from_artifact(os.environ['KNOWLEDGE_BASE'])
+    version = get_case_base_version()
+    current = _current_model
+    if current is None or current[0] != version:
+        current = _current_model = (version, load_model(version))
+    return current[1]
+
+# Pasang model yang sudah selesai dibangun (mis. oleh watcher.ModelWatcher) untuk request berikutnya.
+# version = versi case base saat pembangunan dimulai; jika versi sudah berubah, get_model memuat ulang.
+def swap_model(model, version):
+    global _current_model
+    _current_model = (version, model)
+
+# Kasus baru (insert_new_case_to_db -> antrian tulis) ditambahkan ke model yang di-cache secara inkremental
+# hanya setelah write_cases commit, sehingga model tidak pernah memuat kasus yang gagal ditulis.
+# Model yang dibangun untuk versi case base lain dibiarkan (dimuat ulang dari database oleh get_model).
+def apply_written_cases(gejala_cols, cases):
+    current = _current_model
+    if current is None or current[0] != get_case_base_version():
+        return
+    model = current[1]
+    for kode_penyakit, symptom_values in cases:
+        values = dict(zip(gejala_cols, symptom_values))
+        model.add_case(kode_penyakit, [values.get(code, 0) for code in model.gejala_codes])
+
+add_case_listener(apply_written_cases)
+
+# Indeks pertanyaan berikutnya (posisi pada answers) untuk mode adaptif; None berarti kuesioner boleh dihentikan.
+# Gejala model yang tidak ada di katalog tidak pernah ditanyakan.
+# Jika model tidak tersedia, kembali ke urutan biasa (pertanyaan pertama yang belum dijawab).
+def next_question_index(answers, threshold=0.95, codes=None):
+    try:
+        model = get_model()
+        index = model.next_question(reorder_answers(answers, codes, model.gejala_codes, missing='Tidak Diketahui'), threshold)
+        if index is None or codes is None:
+            return index
+        return list(codes).index(model.gejala_codes[index])
+    except (ConnectionError, ValueError) as e:
+        show_error(str(e))
+        return next((i for i, ans in enumerate(answers) if ans is None), None)
+
+DIAGNOSIS_PHASES = ('fetch', 'encode', 'likelihood', 'scoring', 'normalization')
+
+# Fungsi Naive Bayes; durasi tiap fase dicatat ke histogram diagnosis_phase_seconds.
+# Prior dan likelihood per gejala sudah dikompilasi saat model dibangun (model_build_phase_seconds),
+# sehingga fase di sini: ambil model, encode jawaban, likelihood, skor (prior + likelihood), normalisasi.
+# Pola jawaban yang sudah ada di diagnosis_cache hanya melewati fase ambil model dan encode.
+# codes = kode gejala untuk setiap jawaban (katalog); tanpa codes, jawaban ke-i dianggap gejala ke-i model.
+def naive_bayes_diagnosis(answers, codes=None):
+    try:
+        marks = [time.perf_counter()]
+        model = get_model()
+        marks.append(time.perf_counter())
+        if not model.disease_codes:
+            return model.result(answers, None)
+        probabilities = cached_posterior(model, reorder_answers(answers, codes, model.gejala_codes), marks)
+        metrics.observe_phases('diagnosis_phase_seconds', DIAGNOSIS_PHASES, marks)
+        return model.result(answers, probabilities)
+    except (ConnectionError, ValueError) as e:
+        show_error(str(e))
+        return None
     except Exception as e:
-        st.error(f"An error occurred during diagnosis: {e}")
+        show_error(f"An error occurred during diagnosis: {e}")
         return None
+
+# Diagnosis batch: matriks jawaban (N x gejala) dengan mask jawaban yang diketahui.
+# Tidak memakai Streamlit untuk pelaporan error; kesalahan dilempar sebagai exception.
+def naive_bayes_batch(values, known=None, model=None):
+    if model is None:
+        model = get_model()
+    return model.posterior_batch(values, known)
+
+# Mode command-line: skor file CSV jawaban per chunk sehingga memori tetap datar
+def score_csv(model, input_path, output_path, chunksize=100_000):
+    total = 0
+    for i, chunk in enumerate(pd.read_csv(input_path, chunksize=chunksize, dtype=str, keep_default_na=False)):
+        gejala_cols = [col for col in chunk.columns if col in model.gejala_codes]
+        extra_cols = [col for col in chunk.columns if col not in gejala_cols]
+        answers = chunk[gejala_cols] if gejala_cols else chunk
+        result = model.diagnose_frame(answers)
+        if gejala_cols:
+            result = pd.concat([chunk[extra_cols], result], axis=1)
+        result.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        total += len(chunk)
+    return total
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diagnosis Naive Bayes batch dari file CSV jawaban")
+    parser.add_argument('input', help="CSV jawaban: kolom G01..G21 (Ya/Tidak/1/0, kosong = tidak diketahui)")
+    parser.add_argument('output', help="CSV hasil: probabilitas tiap penyakit dan diagnosis teratas")
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--penyakit', default='data_penyakit.xlsx', help="File data penyakit (xlsx/csv)")
+    parser.add_argument('--case-base', default='case_base.xlsx', help="File case base (xlsx/csv/parquet, .npz format padat, atau artefak .spkb)")
+    parser.add_argument('--db', action='store_true', help="Bangun model dari database, bukan dari file")
+    args = parser.parse_args(argv)
+
+    model = load_model(get_case_base_version()) if args.db else load_model_from_files(args.penyakit, args.case_base)
+    total = score_csv(model, args.input, args.output, chunksize=args.chunksize)
+    print(f"{total} baris didiagnosis -> {args.output}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,336 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import signal
+import sys
+import time
+from http import HTTPStatus
+from urllib.parse import unquote
+import numpy as np
+import pandas as pd
+
+from nb import cached_posterior, encode_answer_matrix, load_model_from_db, load_model_from_files
+from fc import ForwardChainingEngine
+from db_funcs import DB_ERRORS, open_connection, fetch_disease_details
+from shared_model import attach_model, publish_model
+from knowledge import KnowledgeBase
+from metrics import metrics
+from catalog import reorder_answers
+from watcher import ModelWatcher, watch_interval
+
+# Layanan HTTP diagnosis tanpa Streamlit (asyncio, hanya pustaka standar).
+#
+#   GET  /health                 status layanan dan ukuran model
+#   POST /diagnosis              {"answers": ["Ya", "Tidak", "Tidak Diketahui", ...]} (urutan gejala model)
+#                                atau {"answers": {"G01": "Ya", "G08": "Tidak", ...}} (per kode gejala)
+#   POST /diagnosis/batch        {"answers": [[...], ...]} atau {"values": [[0, 1, ...]], "known": [[true, ...]]}
+#   GET  /penyakit/<kode>        detail penyakit dari disease_details_table
+#   GET  /metrics                histogram latensi dalam format teks Prometheus (per proses worker)
+#
+# Model disimpan di memori; akses database dijalankan di thread pool agar event loop tidak terblokir.
+# Database yang tidak dapat dihubungi atau gagal menjawab menghasilkan 503 (bukan 404/500).
+# Model dari database dipantau watcher (--watch-interval): perubahan case base dari luar membangun model
+# baru di thread latar yang lalu menggantikan model lama; setiap request memakai satu model dari awal sampai akhir.
+# Dengan --workers N, proses induk membangun model sekali dan membagikannya lewat shared memory
+# ke N proses worker yang mendengarkan port yang sama (SO_REUSEPORT).
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_SIZE = 10 * 1024 * 1024
+MAX_BATCH_ROWS = 100_000
+ROUTES = ('/health', '/diagnosis', '/diagnosis/batch', '/metrics')
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class DiagnosisService:
+    def __init__(self, model, rule_engine=None):
+        self.model = model
+        self.rule_engine = rule_engine
+        self._details = {}
+
+    # Ganti model (dari thread watcher); request yang sedang berjalan tetap memakai model lama
+    def swap_model(self, model, version=None):
+        self.model = model
+
+    def clear_details(self):
+        self._details = {}
+
+    def diagnose(self, payload):
+        model = self.model
+        answers = payload.get('answers') if isinstance(payload, dict) else None
+        if isinstance(answers, dict):
+            answers = [answers.get(code) for code in model.gejala_codes]
+        if not isinstance(answers, list):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be {\"answers\": [...]} or {\"answers\": {\"G01\": ...}}")
+
+        probabilities = cached_posterior(model, answers)
+        result = model.result(answers, probabilities)
+        result['probabilitas'] = {code: float(p) for code, p in zip(model.disease_codes, probabilities)}
+        if self.rule_engine is not None:
+            result.update(self.rule_engine.evaluate(
+                reorder_answers(answers, model.gejala_codes, self.rule_engine.gejala_codes)))
+        return result
+
+    def diagnose_batch(self, payload):
+        if not isinstance(payload, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+
+        model = self.model
+        width = len(model.gejala_codes)
+        if 'answers' in payload:
+            if not isinstance(payload['answers'], list) or not payload['answers']:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "'answers' must be a non-empty list of answer rows")
+            values, known = encode_answer_matrix(payload['answers'])
+        elif 'values' in payload:
+            values = _matrix(payload, 'values', np.int8)
+            known = _matrix(payload, 'known', bool) if payload.get('known') is not None else None
+            if known is not None and known.shape != values.shape:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"'known' has shape {list(known.shape)}, 'values' has {list(values.shape)}")
+        else:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must contain 'answers' or 'values'")
+        if values.ndim != 2 or len(values) > MAX_BATCH_ROWS:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Expected a 2-D answer matrix with at most {MAX_BATCH_ROWS} rows")
+        if values.shape[1] != width:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Expected {width} answers per row, got {values.shape[1]}")
+
+        probabilities = model.posterior_batch(values, known)
+        best = probabilities.argmax(axis=1)
+        codes = np.asarray(model.disease_codes)
+        return {
+            'kode_penyakit': codes[best].tolist(),
+            'confidence': probabilities[np.arange(len(best)), best].tolist(),
+            'probabilitas': probabilities.tolist(),
+            'penyakit': model.disease_codes
+        }
+
+    # Detail penyakit di-cache di memori; query database dijalankan di thread terpisah
+    async def disease_details(self, kode_penyakit):
+        cache = self._details
+        if kode_penyakit not in cache:
+            details = await asyncio.to_thread(_fetch_disease_details, kode_penyakit)
+            if details is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown disease code: {kode_penyakit}")
+            cache[kode_penyakit] = details
+        return cache[kode_penyakit]
+
+    def health(self):
+        model = self.model
+        return {
+            'status': 'ok',
+            'penyakit': len(model.disease_codes),
+            'gejala': len(model.gejala_codes),
+            'total_kasus': model.total_cases
+        }
+
+    async def route(self, method, path, body):
+        if path == '/health' and method == 'GET':
+            return self.health()
+        if path == '/diagnosis' and method == 'POST':
+            return self.diagnose(_parse_json(body))
+        if path == '/diagnosis/batch' and method == 'POST':
+            return self.diagnose_batch(_parse_json(body))
+        if path.startswith('/penyakit/') and method == 'GET':
+            return await self.disease_details(unquote(path[len('/penyakit/'):]))
+        if path == '/metrics' and method == 'GET':
+            return metrics.render_prometheus()
+        if path in ROUTES or path.startswith('/penyakit/'):
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {path}")
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {path}")
+
+    # Satu koneksi HTTP/1.1 (keep-alive didukung)
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await _send(writer, HTTPStatus.BAD_REQUEST, {'error': 'Malformed request line'}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = _content_length(headers)
+                if length is None:
+                    await _send(writer, HTTPStatus.BAD_REQUEST, {'error': 'Invalid Content-Length'}, False)
+                    break
+                if length > MAX_BODY_SIZE:
+                    await _send(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': 'Body too large'}, False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+
+                path = target.split('?', 1)[0]
+                start = time.perf_counter()
+                try:
+                    status, payload = HTTPStatus.OK, await self.route(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': e.message}
+                except Exception as e:
+                    logger.exception("Error handling %s %s", method, target)
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+                route = '/penyakit/<kode>' if path.startswith('/penyakit/') else path if path in ROUTES else 'lainnya'
+                metrics.observe('http_request_seconds', time.perf_counter() - start, route=route, status=status.value)
+
+                await _send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+# Matriks persegi dari payload[name]; baris dengan panjang berbeda atau nilai non-numerik ditolak (400)
+def _matrix(payload, name, dtype):
+    rows = payload[name]
+    if not isinstance(rows, list) or not rows or not all(isinstance(row, list) for row in rows):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"'{name}' must be a non-empty list of rows")
+    lengths = {len(row) for row in rows}
+    if len(lengths) > 1:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"All '{name}' rows must have the same length, got lengths {sorted(lengths)}")
+    try:
+        return np.asarray(rows, dtype=dtype).reshape(len(rows), lengths.pop())
+    except (TypeError, ValueError) as e:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid '{name}' matrix: {e}")
+
+# Content-Length sebagai bilangan bulat >= 0 (0 jika tidak ada); None jika tidak valid
+def _content_length(headers):
+    value = headers.get('content-length', '').strip()
+    if not value:
+        return 0
+    if not (value.isascii() and value.isdigit()):
+        return None
+    return int(value)
+
+def _parse_json(body):
+    try:
+        return json.loads(body or b'null')
+    except json.JSONDecodeError as e:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {e}")
+
+# Payload str dikirim apa adanya sebagai teks (format Prometheus), selain itu sebagai JSON
+async def _send(writer, status, payload, keep_alive):
+    if isinstance(payload, str):
+        body, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8'
+    else:
+        body, content_type = json.dumps(payload, default=str).encode('utf-8'), 'application/json'
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode('latin-1') + body)
+    await writer.drain()
+
+def _fetch_disease_details(kode_penyakit):
+    try:
+        with open_connection() as cnx:
+            return fetch_disease_details(cnx, kode_penyakit)
+    except (*DB_ERRORS, ImportError) as e:
+        logger.warning("Could not fetch disease details for %s: %s", kode_penyakit, e)
+        raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Database is not available")
+
+def _load_model_from_database():
+    with open_connection() as cnx:
+        return load_model_from_db(cnx)
+
+# Bangun model (dari artefak basis pengetahuan, database, atau file xlsx) dan mesin aturan sebelum server menerima request
+def build_service(args):
+    if args.knowledge_base:
+        kb = KnowledgeBase.load(args.knowledge_base)
+        return DiagnosisService(kb.model(), kb.rule_engine() if args.relasi else None)
+    model = load_model_from_files(args.penyakit, args.case_base) if args.files else _load_model_from_database()
+    rule_engine = ForwardChainingEngine.from_relasi(pd.read_excel(args.relasi)) if args.relasi else None
+    return DiagnosisService(model, rule_engine)
+
+async def serve(service, host, port, reuse_port=False):
+    server = await asyncio.start_server(service.handle, host, port, reuse_port=reuse_port or None)
+    logger.info("Serving diagnosis API on http://%s:%d", host, port)
+    async with server:
+        await server.serve_forever()
+
+# Proses worker: petakan model dari shared memory (tanpa menyalin) lalu layani request
+def worker_main(spec, rule_engine, host, port):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s [%(process)d] %(message)s')
+    shm, model = attach_model(spec)
+    try:
+        asyncio.run(serve(DiagnosisService(model, rule_engine), host, port, reuse_port=True))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        del model
+        shm.close()
+
+def serve_workers(service, host, port, workers):
+    shm, spec = publish_model(service.model)
+    ctx = multiprocessing.get_context('spawn')
+    processes = [ctx.Process(target=worker_main, args=(spec, service.rule_engine, host, port), daemon=True)
+                 for _ in range(workers)]
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for process in processes:
+            process.start()
+        logger.info("Started %d workers sharing model block %s (%d bytes)", workers, spec['name'], shm.size)
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Sinyal berikutnya diabaikan agar blok shared memory pasti di-unlink
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        shm.close()
+        shm.unlink()
+
+def add_model_arguments(parser):
+    parser.add_argument('--files', action='store_true', help="Bangun model dari file xlsx, bukan dari database")
+    parser.add_argument('--penyakit', default='data_penyakit.xlsx', help="File data penyakit (xlsx/csv)")
+    parser.add_argument('--case-base', default='case_base.xlsx', help="File case base (xlsx/csv)")
+    parser.add_argument('--relasi', default='relasi.xlsx', help="File relasi untuk aturan forward chaining ('' untuk menonaktifkan)")
+    parser.add_argument('--knowledge-base', help="Artefak basis pengetahuan .spkb (model dan aturan, tanpa database/xlsx)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Layanan HTTP diagnosis penyakit lambung (Naive Bayes + Forward Chaining)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=1, help="Jumlah proses worker (>1: model dibagi lewat shared memory)")
+    parser.add_argument('--watch-interval', type=float, default=watch_interval(),
+                        help="Interval (detik) pemeriksaan perubahan case base di database; 0 = mati")
+    add_model_arguments(parser)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    service = build_service(args)
+    from_database = not (args.files or args.knowledge_base)
+    if from_database and args.watch_interval > 0:
+        if args.workers > 1:
+            logger.warning("Model watcher is not available with --workers > 1; the shared model is not reloaded")
+        else:
+            ModelWatcher(args.watch_interval, on_model=service.swap_model, on_details=service.clear_details).start()
+    if args.workers > 1:
+        serve_workers(service, args.host, args.port, args.workers)
+        return
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
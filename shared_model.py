@@ -0,0 +1,69 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+from nb import NaiveBayesModel, ModelParams
+
+# Publikasi model Naive Bayes ke shared memory: proses induk menyalin array model sekali ke satu blok
+# shared memory, lalu setiap proses worker memetakan blok itu sebagai array NumPy tanpa menyalin.
+# Array di worker bersifat read-only; add_case pada model worker membuat salinan lokal.
+
+# Urutan array di dalam blok: (nama, atribut model / parameter, dtype)
+_ARRAYS = [
+    ('class_counts', np.int64),
+    ('symptom_counts', np.int64),
+] + [(name, np.float64) for name in ModelParams._fields]
+
+# Salin array model ke shared memory; mengembalikan blok (harus ditutup dan di-unlink oleh pemilik)
+# dan spesifikasi kecil yang bisa di-pickle untuk dikirim ke worker
+def publish_model(model):
+    arrays = {name: np.ascontiguousarray(_model_array(model, name), dtype=dtype) for name, dtype in _ARRAYS}
+    layout = []
+    offset = 0
+    for name, dtype in _ARRAYS:
+        array = arrays[name]
+        layout.append((name, np.dtype(dtype).str, array.shape, offset))
+        offset += array.nbytes
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for name, dtype_str, shape, start in layout:
+        view = np.ndarray(shape, dtype=dtype_str, buffer=shm.buf, offset=start)
+        view[...] = arrays[name]
+
+    spec = {
+        'name': shm.name,
+        'layout': layout,
+        'disease_codes': model.disease_codes,
+        'disease_names': model.disease_names,
+        'gejala_codes': model.gejala_codes,
+        'total_cases': model.total_cases
+    }
+    return shm, spec
+
+# Petakan model dari shared memory (zero-copy); blok harus tetap hidup selama model dipakai
+def attach_model(spec):
+    shm = _attach(spec['name'])
+    views = {}
+    for name, dtype_str, shape, start in spec['layout']:
+        view = np.ndarray(tuple(shape), dtype=dtype_str, buffer=shm.buf, offset=start)
+        view.flags.writeable = False
+        views[name] = view
+
+    model = NaiveBayesModel.from_params(
+        spec['disease_codes'], spec['disease_names'], spec['gejala_codes'],
+        views['class_counts'], views['symptom_counts'], spec['total_cases'],
+        [views[name] for name in ModelParams._fields])
+    return shm, model
+
+def _model_array(model, name):
+    if name in ModelParams._fields:
+        return getattr(model.params, name)
+    return getattr(model, name)
+
+# Worker hanya meminjam blok; yang melakukan unlink adalah proses induk.
+# Sebelum Python 3.13 worker multiprocessing berbagi resource tracker dengan induknya,
+# sehingga pendaftaran ulang saat attach tidak menyebabkan blok di-unlink saat worker berhenti.
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
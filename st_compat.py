@@ -0,0 +1,79 @@
+import functools
+import logging
+import sys
+import threading
+from collections import OrderedDict
+
+# Pengganti st.cache_resource dan st.error untuk modul yang dipakai bersama oleh aplikasi Streamlit dan
+# layanan tanpa Streamlit (service.py, benchmark, CLI). Streamlit tidak pernah diimpor di sini: jika aplikasi
+# Streamlit sudah memuatnya, fungsi di-cache dengan st.cache_resource dan error ditampilkan dengan st.error;
+# selain itu dipakai cache sederhana per proses dan logging.
+
+logger = logging.getLogger(__name__)
+
+def _streamlit():
+    return sys.modules.get('streamlit')
+
+# Cache hasil per argumen untuk seluruh proses (exception tidak di-cache), dengan batas entri LRU opsional
+class _ProcessCache:
+    def __init__(self, func, max_entries=None):
+        self._func = func
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __call__(self, *args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            value = self._func(*args, **kwargs)
+            self._entries[key] = value
+            if self._max_entries is not None and len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Cache dipilih saat pemanggilan pertama, bukan saat modul diimpor
+class _LazyResource:
+    def __init__(self, func, options):
+        functools.update_wrapper(self, func)
+        self._func = func
+        self._options = options
+        self._cache = None
+        self._lock = threading.Lock()
+
+    def _resolve(self):
+        if self._cache is None:
+            with self._lock:
+                if self._cache is None:
+                    st = _streamlit()
+                    if st is not None:
+                        self._cache = st.cache_resource(**self._options)(self._func)
+                    else:
+                        self._cache = _ProcessCache(self._func, self._options.get('max_entries'))
+        return self._cache
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def clear(self):
+        if self._cache is not None:
+            self._cache.clear()
+
+# Dipakai seperti st.cache_resource: @cache_resource atau @cache_resource(max_entries=1)
+def cache_resource(func=None, **options):
+    if func is None:
+        return lambda f: _LazyResource(f, options)
+    return _LazyResource(func, options)
+
+def show_error(message):
+    st = _streamlit()
+    if st is None:
+        logger.error(message)
+    else:
+        st.error(message)
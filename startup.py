@@ -0,0 +1,184 @@
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+# Profil cold start app.py: waktu impor per modul dan waktu sampai pertanyaan pertama tampil,
+# masing-masing diukur di proses Python baru (belum ada modul yang ter-cache).
+#
+#   python startup.py
+#   python startup.py --budget-ms 1500 --json startup.json    # exit code 1 jika melebihi budget
+#
+# Waktu impor memakai `python -X importtime` untuk setiap impor tingkat atas app.py (berurutan, jadi
+# modul yang sudah diimpor modul sebelumnya tidak dihitung dua kali). Render pertama dijalankan lewat
+# streamlit AppTest dua kali, masing-masing di proses baru: sekali tanpa profiler untuk waktu (budget) dan
+# sekali dengan cProfile untuk waktu inisialisasi per modul = waktu kumulatif fungsi modul repo yang paling
+# mahal selama render tersebut (termasuk impor yang ditunda ke dalam fungsi).
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUDGET_MS = 1500
+# Modul yang seharusnya tidak dimuat sebelum pertanyaan pertama tampil
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'openpyxl', 'mysql.connector', 'nb', 'fc', 'db_funcs')
+MARKER = '@@startup '
+
+# Modul yang diimpor di tingkat atas app.py (urutan sesuai file)
+def app_imports(app_path):
+    with open(app_path) as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        modules.extend(name for name in names if name not in modules)
+    return modules
+
+# Waktu impor (ms) per modul dalam urutan modules, beserta modul berat yang ikut dimuat
+def import_times(modules, python=sys.executable):
+    code = ['import sys']
+    for module in modules:
+        code.append(f'sys.stderr.write({MARKER + module!r} + chr(10))')
+        code.append(f'import {module}')
+    result = subprocess.run([python, '-X', 'importtime', '-c', '\n'.join(code)], cwd=BASE_DIR,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'import gagal')
+
+    rows = []
+    current = None
+    for line in result.stderr.splitlines():
+        if line.startswith(MARKER):
+            current = {'modul': line[len(MARKER):], 'ms': 0.0, 'termasuk': {}}
+            rows.append(current)
+            continue
+        parts = line.split('|')
+        if current is None or len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        field = parts[2]
+        name = field.strip()
+        cumulative_ms = int(parts[1]) / 1000
+        if len(field) - len(field.lstrip()) == 1:  # impor langsung (kedalaman 0)
+            current['ms'] += cumulative_ms
+        if name in HEAVY_MODULES and name != current['modul']:
+            current['termasuk'][name] = cumulative_ms
+    return rows
+
+_FIRST_RENDER = r'''
+import cProfile, json, os, pstats, sys, threading, time
+start = time.perf_counter()
+sys.path.insert(0, {base!r})
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=120)
+if {menu!r}:
+    at.session_state['menu_select'] = {menu!r}
+# app.py dieksekusi di thread ScriptRunner milik AppTest; cProfile diaktifkan di thread tersebut
+profiler = cProfile.Profile()
+def enable_in_script_thread(frame, event, arg):
+    sys.setprofile(None)
+    if threading.current_thread().name.startswith('ScriptRunner'):
+        profiler.enable()
+if {profile!r}:
+    threading.setprofile(enable_in_script_thread)
+at.run()
+end = time.perf_counter()
+
+init = {{}}
+stats = pstats.Stats(profiler).stats if {profile!r} else {{}}
+for (path, line, function), (_, _, _, cumulative, _) in stats.items():
+    if not path.endswith('.py'):
+        continue
+    path = os.path.abspath(path)
+    if os.path.dirname(path) != {base!r}:
+        continue
+    module = os.path.splitext(os.path.basename(path))[0]
+    if cumulative * 1000 > init.get(module, (0, ''))[0]:
+        init[module] = (cumulative * 1000, function)
+
+print(json.dumps({{
+    'streamlit_import_ms': (imported - start) * 1000,
+    'render_ms': (end - imported) * 1000,
+    'pertanyaan': [m.value[4:] for m in at.markdown if m.value.startswith('### ')][:1],
+    'error': [str(e.value) for e in at.exception],
+    'modul_berat': [m for m in {heavy!r} if m in sys.modules],
+    'inisialisasi': [{{'modul': module, 'fungsi': function, 'ms': ms}}
+                     for module, (ms, function) in sorted(init.items(), key=lambda item: -item[1][0])],
+}}))
+'''
+
+# Render pertama app.py di proses baru (tanpa pemanasan latar dan watcher); menu = pilihan sidebar awal
+def first_render(app_path, menu='Sistem Pakar', profile=False, python=sys.executable):
+    code = _FIRST_RENDER.format(base=BASE_DIR, app=os.path.abspath(app_path), menu=menu, heavy=HEAVY_MODULES,
+                                profile=profile)
+    env = dict(os.environ, WARMUP='0', MODEL_WATCH_INTERVAL='0')
+    result = subprocess.run([python, '-c', code], cwd=BASE_DIR, capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'render gagal')
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report['total_ms'] = report['streamlit_import_ms'] + report['render_ms']
+    return report
+
+def profile(app_path=os.path.join(BASE_DIR, 'app.py'), menu='Sistem Pakar'):
+    render = first_render(app_path, menu)
+    render['inisialisasi'] = first_render(app_path, menu, profile=True)['inisialisasi']
+    return {
+        'impor': import_times(app_imports(app_path)),
+        'render_pertama': render
+    }
+
+def format_report(report, budget_ms=None):
+    lines = ["Waktu impor tingkat atas app.py (proses baru):"]
+    for row in report['impor']:
+        included = ', '.join(f"{name} {ms:.0f} ms" for name, ms in row['termasuk'].items())
+        lines.append(f"  {row['modul']:<20} {row['ms']:8.1f} ms" + (f"  (termasuk {included})" if included else ''))
+    lines.append(f"  {'total':<20} {sum(row['ms'] for row in report['impor']):8.1f} ms")
+
+    render = report['render_pertama']
+    lines.append("")
+    lines.append("Render pertama:")
+    lines.append(f"  impor streamlit      {render['streamlit_import_ms']:8.1f} ms")
+    lines.append(f"  eksekusi app.py      {render['render_ms']:8.1f} ms")
+    lines.append(f"  total                {render['total_ms']:8.1f} ms")
+    lines.append(f"  pertanyaan pertama   {render['pertanyaan'][0] if render['pertanyaan'] else '-'}")
+    lines.append(f"  modul berat dimuat   {', '.join(render['modul_berat']) or '-'}")
+    for error in render['error']:
+        lines.append(f"  error                {error}")
+    if render['inisialisasi']:
+        lines.append("")
+        lines.append("Inisialisasi per modul selama render pertama (cProfile, kumulatif, termasuk impor tertunda):")
+        for row in render['inisialisasi']:
+            lines.append(f"  {row['modul']:<20} {row['ms']:8.1f} ms  {row['fungsi']}")
+    if budget_ms is not None:
+        status = 'OK' if within_budget(report, budget_ms) else 'MELEBIHI BUDGET'
+        lines.append("")
+        lines.append(f"Budget sampai pertanyaan pertama: {budget_ms:.0f} ms -> {status}")
+    return '\n'.join(lines)
+
+def within_budget(report, budget_ms):
+    render = report['render_pertama']
+    return bool(render['pertanyaan']) and not render['error'] and render['total_ms'] <= budget_ms
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profil cold start app.py: waktu impor dan inisialisasi per modul")
+    parser.add_argument('--app', default=os.path.join(BASE_DIR, 'app.py'), help="Path app Streamlit")
+    parser.add_argument('--menu', default='Sistem Pakar', help="Menu sidebar saat render pertama")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help="Batas waktu sampai pertanyaan pertama tampil (ms); exit code 1 jika dilampaui")
+    parser.add_argument('--json', help="Simpan hasil sebagai JSON")
+    args = parser.parse_args(argv)
+
+    report = profile(args.app, args.menu)
+    report['budget_ms'] = args.budget_ms
+    print(format_report(report, args.budget_ms))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0 if within_budget(report, args.budget_ms) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,343 @@
+import argparse
+import functools
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import zlib
+try:
+    import mysql.connector
+    import mysql.connector.pooling
+except ImportError:  # backend SQLite tidak membutuhkan mysql-connector-python
+    mysql = None
+
+# Backend penyimpanan untuk db_funcs. Helper di db_funcs (get_tables, get_table_data, get_row_count,
+# get_disease_details_by_code, insert_new_case_to_db, ...) tetap menerima koneksi dari get_connection();
+# backend menyediakan pool koneksi dan bagian SQL yang berbeda antar database (daftar tabel, INSERT IGNORE,
+# upsert, pemesanan ID kasus). SQL di helper memakai placeholder %s untuk kedua backend.
+#
+#   DB_BACKEND=mysql (default)                  server MySQL dari DB_CONFIG di db_funcs
+#   DB_BACKEND=sqlite SQLITE_PATH=pakar.db      file SQLite lokal, tanpa jaringan
+#
+#   python storage.py seed pakar.db             # isi SQLite dari xlsx bawaan (dengan indeks)
+#   python storage.py seed pakar.db --source-dir data/ --replace
+
+DEFAULT_SQLITE_PATH = 'sistem_pakar.db'
+CHECKOUT_TIMEOUT = 10    # detik menunggu koneksi kosong sebelum menyerah
+PING_ATTEMPTS = 2        # percobaan reconnect jika koneksi yang dipinjam sudah putus
+
+# Error database dari backend mana pun (dipakai di blok except pada helper db_funcs)
+DB_ERRORS = (sqlite3.Error,) + ((mysql.connector.Error,) if mysql is not None else ())
+
+# Kolom disease_details_table (tidak ada sumber xlsx; diisi terpisah)
+DISEASE_DETAILS_COLUMNS = ['kode_penyakit', 'nama_penyakit', 'deskripsi', 'gejala_umum', 'rekomendasi',
+                           'tindakan_segera', 'konsultasi_medis']
+
+# Pool koneksi MySQL dengan ukuran terbatas. Setiap request meminjam satu koneksi dan
+# mengembalikannya setelah selesai, sehingga sesi yang berbeda tidak berbagi satu socket.
+class ConnectionPool:
+    def __init__(self, size, backend=None, **config):
+        self.size = size
+        self.backend = backend
+        self._pool = mysql.connector.pooling.MySQLConnectionPool(
+            pool_name='sistem_pakar', pool_size=size, pool_reset_session=True, **config)
+        self._slots = threading.BoundedSemaphore(size)
+
+    # Pinjam koneksi; cek apakah masih hidup (ping) dan sambungkan ulang otomatis jika putus
+    def checkout(self, timeout=CHECKOUT_TIMEOUT):
+        if not self._slots.acquire(timeout=timeout):
+            raise mysql.connector.errors.PoolError(f"No free database connection after {timeout} seconds.")
+        try:
+            cnx = self._pool.get_connection()
+        except Exception:
+            self._slots.release()
+            raise
+        try:
+            cnx.ping(reconnect=True, attempts=PING_ATTEMPTS, delay=1)
+            return cnx
+        except Exception:
+            self.checkin(cnx)
+            raise
+
+    # Kembalikan koneksi ke pool (close() pada koneksi pool tidak menutup socket)
+    def checkin(self, cnx):
+        try:
+            cnx.close()
+        finally:
+            self._slots.release()
+
+class MySQLBackend:
+    name = 'mysql'
+    label = 'MySQL'
+    list_tables_sql = "SHOW TABLES"
+    insert_ignore = "INSERT IGNORE"
+    unsigned_type = 'UNSIGNED'
+
+    def __init__(self, config):
+        self.config = config
+
+    def create_pool(self, size):
+        if mysql is None:
+            raise ImportError("The MySQL backend requires mysql-connector-python (or set DB_BACKEND=sqlite).")
+        return ConnectionPool(size, backend=self, **self.config)
+
+    def describe(self):
+        return {'Backend': self.label, 'Host': self.config.get('host'), 'Port': self.config.get('port'),
+                'Database': self.config.get('database'), 'User': self.config.get('user')}
+
+    # INSERT yang menambahkan nilai ke baris yang sudah ada (kunci key) alih-alih gagal
+    def upsert_increment_sql(self, table, columns, key):
+        updates = ', '.join(f"{col} = {col} + VALUES({col})" for col in columns if col != key)
+        return f"""
+    INSERT INTO {table} ({', '.join(columns)})
+    VALUES ({', '.join(['%s'] * len(columns))})
+    ON DUPLICATE KEY UPDATE {updates}
+    """
+
+    # Checksum isi satu baris (untuk mendeteksi perubahan tabel dengan SUM per tabel)
+    def row_checksum_sql(self, columns):
+        return f"CRC32(CONCAT_WS('|', {', '.join(columns)}))"
+
+    # Naikkan sequence sebesar n secara atomik; mengembalikan nilai baru
+    def increment_sequence(self, cursor, table, n):
+        cursor.execute(f"UPDATE {table} SET next_id = LAST_INSERT_ID(next_id + %s) WHERE id = 1", (n,))
+        cursor.execute("SELECT LAST_INSERT_ID()")
+        return cursor.fetchone()[0]
+
+class SQLiteBackend:
+    name = 'sqlite'
+    label = 'SQLite'
+    list_tables_sql = "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    insert_ignore = "INSERT OR IGNORE"
+    unsigned_type = 'INTEGER'
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH):
+        self.path = path
+
+    def create_pool(self, size):
+        return SQLitePool(self, size)
+
+    def describe(self):
+        return {'Backend': self.label, 'File': os.path.abspath(self.path)}
+
+    def upsert_increment_sql(self, table, columns, key):
+        updates = ', '.join(f"{col} = {col} + excluded.{col}" for col in columns if col != key)
+        return f"""
+    INSERT INTO {table} ({', '.join(columns)})
+    VALUES ({', '.join(['%s'] * len(columns))})
+    ON CONFLICT({key}) DO UPDATE SET {updates}
+    """
+
+    # SQLite tidak memiliki CRC32/CONCAT_WS; crc32 didaftarkan sebagai fungsi di setiap koneksi
+    def row_checksum_sql(self, columns):
+        row = " || '|' || ".join(f"COALESCE({col}, '')" for col in columns)
+        return f"crc32({row})"
+
+    def increment_sequence(self, cursor, table, n):
+        cursor.execute(f"UPDATE {table} SET next_id = next_id + %s WHERE id = 1 RETURNING next_id", (n,))
+        return cursor.fetchone()[0]
+
+# Koneksi SQLite dengan antarmuka yang dipakai db_funcs (cursor(dictionary=True), is_connected, ping)
+class SQLiteConnection:
+    def __init__(self, backend):
+        self.backend = backend
+        self._connection = sqlite3.connect(backend.path, check_same_thread=False, timeout=30)
+        # WAL: pembaca tidak diblokir oleh penulis (mis. antrian tulis kasus di thread latar)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        self._connection.create_function('crc32', 1, _crc32, deterministic=True)
+
+    def cursor(self, dictionary=False, **kwargs):
+        return SQLiteCursor(self._connection.cursor(), dictionary)
+
+    def is_connected(self):
+        return True
+
+    def ping(self, **kwargs):
+        pass
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    @property
+    def in_transaction(self):
+        return self._connection.in_transaction
+
+    # Koneksi dimiliki pool; close() hanya dipanggil saat pool ditutup
+    def close(self):
+        self._connection.close()
+
+def _crc32(value):
+    return None if value is None else zlib.crc32(str(value).encode('utf-8'))
+
+# Placeholder %s (format mysql-connector) menjadi ? untuk sqlite3, dan %% menjadi %. Isi string literal
+# dan identifier bertanda kutip tidak diubah, sehingga '%s' di dalam literal tetap teks biasa.
+_PLACEHOLDER_TOKENS = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|%s|%%")
+
+@functools.lru_cache(maxsize=512)
+def qmark_sql(operation):
+    return _PLACEHOLDER_TOKENS.sub(lambda m: {'%s': '?', '%%': '%'}.get(m.group(), m.group()), operation)
+
+class SQLiteCursor:
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    def execute(self, operation, params=None):
+        if params:
+            self._cursor.execute(qmark_sql(operation), tuple(params))
+        else:
+            self._cursor.execute(operation)
+
+    def executemany(self, operation, seq_params):
+        self._cursor.executemany(qmark_sql(operation), (tuple(params) for params in seq_params))
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip([desc[0] for desc in self._cursor.description], row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+# Pool koneksi SQLite (checkout/checkin seperti ConnectionPool); koneksi dibuat saat pertama dibutuhkan
+class SQLitePool:
+    def __init__(self, backend, size):
+        self.backend = backend
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def checkout(self, timeout=CHECKOUT_TIMEOUT):
+        if not self._slots.acquire(timeout=timeout):
+            raise sqlite3.OperationalError(f"No free database connection after {timeout} seconds.")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                return SQLiteConnection(self.backend)
+            except Exception:
+                self._slots.release()
+                raise
+
+    # Transaksi yang belum di-commit dibatalkan sebelum koneksi dipakai request lain
+    def checkin(self, cnx):
+        try:
+            if cnx.in_transaction:
+                cnx.rollback()
+            self._idle.put(cnx)
+        finally:
+            self._slots.release()
+
+# Backend sesuai environment: DB_BACKEND=sqlite (file SQLITE_PATH) atau mysql (mysql_config)
+def backend_from_env(mysql_config):
+    name = os.environ.get('DB_BACKEND', 'mysql').lower()
+    if name == 'sqlite':
+        return SQLiteBackend(os.environ.get('SQLITE_PATH') or DEFAULT_SQLITE_PATH)
+    if name != 'mysql':
+        raise ValueError(f"Unknown DB_BACKEND '{name}', expected 'mysql' or 'sqlite'.")
+    return MySQLBackend(mysql_config)
+
+# Indeks untuk query yang dipakai app: baris per penyakit (GROUP BY penyakit), detail per kode_penyakit,
+# dan halaman tabel (ORDER BY kolom pertama)
+SQLITE_INDEXES = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_case_base_d_case ON case_base_table (d_case)",
+    "CREATE INDEX IF NOT EXISTS idx_case_base_penyakit ON case_base_table (penyakit)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_data_penyakit_kode ON data_penyakit_table (kode_penyakit)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_disease_details_kode ON disease_details_table (kode_penyakit)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_data_gejala_kode ON data_gejala_table (kode_gejala)",
+]
+
+# Isi file SQLite dari DataFrame per tabel (nama tabel -> DataFrame) dalam satu transaksi, lalu buat indeks.
+# Case base besar ditulis per chunk. disease_details_table selalu dibuat (kosong jika tidak diberikan).
+def seed_sqlite(path, tables, replace=False, chunk_size=100_000):
+    import pandas as pd
+    tables = dict(tables)
+    tables.setdefault('disease_details_table', pd.DataFrame(columns=DISEASE_DETAILS_COLUMNS))
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute("PRAGMA journal_mode = WAL")
+        existing = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conflicts = sorted(existing & set(tables))
+        if conflicts and not replace:
+            raise ValueError(f"{path} already has table(s) {', '.join(conflicts)}; pass replace (--replace) to overwrite them.")
+        for table in conflicts:
+            connection.execute(f"DROP TABLE {table}")
+        # Tabel turunan dibangun ulang oleh db_funcs dari case_base_table
+        for table in ('case_base_counts_table', 'case_id_sequence'):
+            connection.execute(f"DROP TABLE IF EXISTS {table}")
+
+        for table, frame in tables.items():
+            for start in range(0, max(len(frame), 1), chunk_size):
+                frame.iloc[start:start + chunk_size].to_sql(table, connection, index=False, if_exists='append')
+        for statement in SQLITE_INDEXES:
+            table = statement.split(' ON ')[1].split()[0]
+            if table in tables:
+                connection.execute(statement)
+        connection.execute("ANALYZE")
+        connection.commit()
+    finally:
+        connection.close()
+    return {table: len(frame) for table, frame in tables.items()}
+
+# Baca dan validasi kelima sumber xlsx (lihat knowledge.py), lalu isi SQLite:
+# case_base_table, data_penyakit_table, data_gejala_table, relasi_table, representasi_pengetahuan_table
+# dan disease_details_table (dari disease_details_path jika ada)
+def seed_sqlite_from_sources(path, source_dir='.', disease_details_path=None, replace=False):
+    from knowledge import read_sources, validate_sources
+    frames, _ = read_sources(source_dir)
+    problems = validate_sources(frames)
+    if problems:
+        raise ValueError("Invalid knowledge base sources:\n" + '\n'.join(f"- {problem}" for problem in problems))
+    tables = {f'{name}_table': frame for name, frame in frames.items()}
+    if disease_details_path:
+        from nb import _read_table_file
+        details = _read_table_file(disease_details_path)
+        details.columns = [str(col).strip().lower() for col in details.columns]
+        tables['disease_details_table'] = details
+    return seed_sqlite(path, tables, replace)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backend penyimpanan: isi database SQLite lokal dari file xlsx")
+    commands = parser.add_subparsers(dest='command', required=True)
+    seed = commands.add_parser('seed', help="Buat/isi file SQLite dari sumber xlsx bawaan")
+    seed.add_argument('path', nargs='?', default=DEFAULT_SQLITE_PATH, help="File SQLite")
+    seed.add_argument('--source-dir', default='.', help="Direktori file sumber xlsx")
+    seed.add_argument('--disease-details', help="File detail penyakit (xlsx/csv) untuk disease_details_table")
+    seed.add_argument('--replace', action='store_true', help="Timpa tabel yang sudah ada")
+    args = parser.parse_args(argv)
+
+    try:
+        counts = seed_sqlite_from_sources(args.path, args.source_dir, args.disease_details, args.replace)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    for table, rows in counts.items():
+        print(f"{table}: {rows} baris", file=sys.stderr)
+    print(f"Database SQLite siap: {args.path} (DB_BACKEND=sqlite SQLITE_PATH={args.path})", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
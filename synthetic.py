@@ -0,0 +1,248 @@
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Generator case base sintetis untuk uji skala dan stress test.
+#
+#   python synthetic.py kasus.csv --rows 1000000
+#   python synthetic.py kasus.parquet --rows 5000000 --diseases 40 --symptoms 60 --catalog-dir katalog/
+#   python synthetic.py kasus.npz --rows 10000000          # format padat (bitpack.PackedCaseBase)
+#   python synthetic.py --db --rows 100000                 # bulk insert ke case_base_table
+#
+# Frekuensi 'Ya' per (penyakit, gejala) dipelajari dari case_base.xlsx dengan prior dari relasi.xlsx
+# (gejala pada aturan penyakit cenderung 'Ya', gejala lain mengikuti tingkat kemunculan di luar aturan).
+# Kasus dibuat per chunk sehingga memori tetap datar berapa pun jumlah barisnya.
+
+DEFAULT_CHUNK_SIZE = 100_000
+PRIOR_STRENGTH = 2.0  # bobot prior dari relasi.xlsx, dalam satuan "kasus semu"
+
+class CaseProfile:
+    def __init__(self, disease_codes, disease_names, gejala_codes, gejala_names, priors, frequencies, rules):
+        self.disease_codes = list(disease_codes)
+        self.disease_names = list(disease_names)
+        self.gejala_codes = list(gejala_codes)
+        self.gejala_names = list(gejala_names)
+        self.priors = np.asarray(priors, dtype=float)            # (penyakit,)
+        self.frequencies = np.asarray(frequencies, dtype=float)  # (penyakit, gejala) peluang 'Ya'
+        self.rules = np.asarray(rules, dtype=bool)               # (penyakit, gejala) gejala pada aturan
+
+    # Pelajari profil dari case base dan matriks relasi (keduanya DataFrame)
+    @classmethod
+    def learn(cls, case_base, relasi, data_penyakit=None, strength=PRIOR_STRENGTH):
+        gejala_codes = list(relasi['kode_gejala'])
+        disease_codes = [col for col in relasi.columns if col not in ('gejala', 'kode_gejala')]
+        rules = (relasi[disease_codes].fillna(0).astype(float).to_numpy() > 0).T
+
+        grouped = case_base.groupby('penyakit')
+        n = grouped.size().reindex(disease_codes, fill_value=0).to_numpy().astype(float)
+        yes = grouped[gejala_codes].sum().reindex(disease_codes, fill_value=0).to_numpy().astype(float)
+
+        # Rata-rata frekuensi di dalam dan di luar aturan dipakai sebagai mean prior Beta
+        observed = n[:, None] > 0
+        rate = np.divide(yes, n[:, None], out=np.zeros_like(yes), where=observed)
+        core_rate = rate[rules & observed].mean() if (rules & observed).any() else 0.95
+        background_rate = rate[~rules & observed].mean() if (~rules & observed).any() else 0.05
+        prior_mean = np.where(rules, core_rate, background_rate)
+        frequencies = (yes + strength * prior_mean) / (n[:, None] + strength)
+
+        priors = (n + 1) / (n.sum() + len(disease_codes))
+        if data_penyakit is not None:
+            names = data_penyakit.set_index('kode_penyakit')['nama_penyakit'].reindex(disease_codes)
+            disease_names = names.fillna(pd.Series(disease_codes, index=disease_codes)).tolist()
+        else:
+            disease_names = disease_codes
+        return cls(disease_codes, disease_names, gejala_codes, relasi['gejala'], priors, frequencies, rules)
+
+    @classmethod
+    def from_files(cls, case_base_path='case_base.xlsx', relasi_path='relasi.xlsx', data_penyakit_path='data_penyakit.xlsx'):
+        from nb import _read_table_file
+        from knowledge import normalize_columns
+        paths = {'case_base': case_base_path, 'relasi': relasi_path, 'data_penyakit': data_penyakit_path}
+        frames = normalize_columns({name: _read_table_file(path) for name, path in paths.items() if path})
+        return cls.learn(frames['case_base'], frames['relasi'], frames.get('data_penyakit'))
+
+    # Profil dengan jumlah penyakit/gejala lain. Penyakit dan gejala asli dipertahankan (sejauh muat);
+    # penyakit tambahan mendapat aturan acak dengan ukuran dan frekuensi yang diambil dari profil asli.
+    def resized(self, n_diseases=None, n_symptoms=None, seed=0):
+        rng = np.random.default_rng(seed)
+        n_diseases = n_diseases or len(self.disease_codes)
+        n_symptoms = n_symptoms or len(self.gejala_codes)
+        keep_d = min(n_diseases, len(self.disease_codes))
+        keep_g = min(n_symptoms, len(self.gejala_codes))
+
+        core = self.frequencies[self.rules]
+        background = self.frequencies[~self.rules]
+        rule_sizes = np.maximum(self.rules.sum(axis=1), 1)
+
+        # Gejala tambahan tidak masuk aturan penyakit asli, jadi untuk penyakit asli hanya muncul sebagai noise latar
+        rules = np.zeros((n_diseases, n_symptoms), dtype=bool)
+        rules[:keep_d, :keep_g] = self.rules[:keep_d, :keep_g]
+        for d in range(keep_d, n_diseases):
+            size = min(n_symptoms, int(rng.choice(rule_sizes)))
+            rules[d, rng.choice(n_symptoms, size=size, replace=False)] = True
+
+        frequencies = np.where(rules, rng.choice(core, size=rules.shape), rng.choice(background, size=rules.shape))
+        frequencies[:keep_d, :keep_g] = self.frequencies[:keep_d, :keep_g]
+        priors = np.concatenate([self.priors[:keep_d], rng.choice(self.priors, size=n_diseases - keep_d)])
+
+        disease_codes = self.disease_codes[:keep_d] + _codes('P', range(keep_d + 1, n_diseases + 1), n_diseases)
+        disease_names = self.disease_names[:keep_d] + [f'Penyakit {code}' for code in disease_codes[keep_d:]]
+        gejala_codes = self.gejala_codes[:keep_g] + _codes('G', range(keep_g + 1, n_symptoms + 1), n_symptoms)
+        gejala_names = self.gejala_names[:keep_g] + [f'Gejala {code}' for code in gejala_codes[keep_g:]]
+        return CaseProfile(disease_codes, disease_names, gejala_codes, gejala_names,
+                           priors / priors.sum(), frequencies, rules)
+
+    # Katalog pendamping dalam format file asli, agar nb/fc/evaluate bisa memakai profil yang diperbesar
+    def data_penyakit(self):
+        return pd.DataFrame({'kode_penyakit': self.disease_codes, 'nama_penyakit': self.disease_names})
+
+    def data_gejala(self):
+        return pd.DataFrame({'kode_gejala': self.gejala_codes, 'gejala': self.gejala_names})
+
+    def relasi(self):
+        relasi = pd.DataFrame(self.rules.T.astype(int), columns=self.disease_codes)
+        relasi.insert(0, 'kode_gejala', self.gejala_codes)
+        relasi.insert(0, 'gejala', self.gejala_names)
+        return relasi
+
+    # Hasilkan n kasus per chunk (DataFrame d_case, penyakit, G..); first_id = nomor d_case pertama
+    def generate(self, n, chunk_size=DEFAULT_CHUNK_SIZE, seed=0, first_id=1):
+        rng = np.random.default_rng(seed)
+        codes = np.asarray(self.disease_codes, dtype=object)
+        for start in range(0, n, chunk_size):
+            size = min(chunk_size, n - start)
+            disease = rng.choice(len(self.disease_codes), size=size, p=self.priors)
+            values = (rng.random((size, len(self.gejala_codes)), dtype=np.float32) < self.frequencies[disease]).astype(np.int8)
+            chunk = pd.DataFrame(values, columns=self.gejala_codes)
+            chunk.insert(0, 'penyakit', codes[disease])
+            chunk.insert(0, 'd_case', [f'C{i:03d}' for i in range(first_id + start, first_id + start + size)])
+            yield chunk
+
+def _codes(prefix, numbers, total):
+    width = max(2, len(str(total)))
+    return [f'{prefix}{i:0{width}d}' for i in numbers]
+
+# ---------------------------------------------------------------------------
+# Penulis output (semuanya menerima iterator chunk)
+# ---------------------------------------------------------------------------
+
+def write_csv(chunks, path):
+    total = 0
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        total += len(chunk)
+    return total
+
+def write_parquet(chunks, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet output requires pyarrow (pip install pyarrow).")
+    writer = None
+    total = 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            total += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return total
+
+# Format padat .npz (bitpack.PackedCaseBase): hanya ~6 byte per kasus yang ditahan di memori
+def write_packed(chunks, path, disease_codes):
+    from bitpack import PackedCaseBase
+    packed = PackedCaseBase.from_chunks((chunk.drop(columns='d_case') for chunk in chunks), disease_codes)
+    packed.save(path)
+    return len(packed)
+
+# Bulk insert ke case_base_table: satu executemany dan satu commit per chunk. Nomor d_case dipesan
+# dari tabel sequence dan tabel ringkasan dibangun ulang di akhir, sehingga model di aplikasi tetap konsisten.
+def write_database(profile, n, chunk_size=DEFAULT_CHUNK_SIZE, seed=0):
+    from db_funcs import (get_connection, get_gejala_columns, ensure_case_base_counts, ensure_case_id_sequence,
+                          reserve_case_ids, rebuild_case_base_counts, invalidate_tables, bump_case_base_version)
+    with get_connection() as cnx:
+        if cnx is None:
+            raise ConnectionError("Could not connect to database for case generation.")
+        # Profil yang diperbesar (--symptoms) bisa memiliki gejala yang tidak ada di tabel: gagal sebelum menulis
+        table_columns = set(get_gejala_columns(cnx))
+        missing = [code for code in profile.gejala_codes if code not in table_columns]
+        if missing:
+            raise ValueError(f"case_base_table has no columns for symptoms {', '.join(missing)}; "
+                             f"generate at most {len(table_columns)} symptoms or add the columns first.")
+        ensure_case_base_counts(cnx)
+        ensure_case_id_sequence(cnx)
+        first_id = reserve_case_ids(cnx, n)
+
+        columns = ['d_case', 'penyakit'] + profile.gejala_codes
+        query = f"INSERT INTO case_base_table ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+        cursor = cnx.cursor()
+        total = 0
+        try:
+            for chunk in profile.generate(n, chunk_size, seed, first_id):
+                rows = list(zip(*(chunk[col].tolist() for col in columns)))
+                cursor.executemany(query, rows)
+                cnx.commit()
+                total += len(rows)
+        finally:
+            cursor.close()
+        rebuild_case_base_counts(cnx)
+    invalidate_tables('case_base_table')
+    bump_case_base_version()
+    return total
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generator case base sintetis (CSV, Parquet, .npz, atau database)")
+    parser.add_argument('output', nargs='?', help="File output: .csv, .parquet, atau .npz")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Jumlah kasus")
+    parser.add_argument('--diseases', type=int, help="Jumlah penyakit (default: sesuai relasi.xlsx)")
+    parser.add_argument('--symptoms', type=int, help="Jumlah gejala (default: sesuai relasi.xlsx)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--case-base', default='case_base.xlsx', help="Case base sumber frekuensi gejala")
+    parser.add_argument('--relasi', default='relasi.xlsx', help="Matriks relasi sumber aturan")
+    parser.add_argument('--penyakit', default='data_penyakit.xlsx', help="Data penyakit (nama penyakit)")
+    parser.add_argument('--catalog-dir', help="Tulis data_penyakit.csv, data_gejala.csv, relasi.csv untuk profil ini")
+    parser.add_argument('--db', action='store_true', help="Bulk insert ke case_base_table di database")
+    args = parser.parse_args(argv)
+    if not args.db and not args.output:
+        parser.error("output file is required unless --db is given")
+
+    profile = CaseProfile.from_files(args.case_base, args.relasi, args.penyakit)
+    if args.diseases or args.symptoms:
+        profile = profile.resized(args.diseases, args.symptoms, args.seed)
+
+    if args.catalog_dir:
+        os.makedirs(args.catalog_dir, exist_ok=True)
+        profile.data_penyakit().to_csv(os.path.join(args.catalog_dir, 'data_penyakit.csv'), index=False)
+        profile.data_gejala().to_csv(os.path.join(args.catalog_dir, 'data_gejala.csv'), index=False)
+        profile.relasi().to_csv(os.path.join(args.catalog_dir, 'relasi.csv'), index=False)
+
+    if args.db:
+        try:
+            total = write_database(profile, args.rows, args.chunk_size, args.seed)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        target = 'case_base_table'
+    else:
+        chunks = profile.generate(args.rows, args.chunk_size, args.seed)
+        if args.output.endswith('.parquet'):
+            total = write_parquet(chunks, args.output)
+        elif args.output.endswith('.npz'):
+            total = write_packed(chunks, args.output, profile.disease_codes)
+        else:
+            total = write_csv(chunks, args.output)
+        target = args.output
+    print(f"{total} kasus sintetis ({len(profile.disease_codes)} penyakit x {len(profile.gejala_codes)} gejala) -> {target}",
+          file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
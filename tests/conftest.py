@@ -0,0 +1,64 @@
+import os
+import sqlite3
+import sys
+import pytest
+
+# Modul aplikasi berada di root repo (flat), bukan paket
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DB_BACKEND', 'sqlite')
+os.environ.setdefault('WARMUP', '0')
+os.environ.setdefault('MODEL_WATCH_INTERVAL', '0')
+
+DETAILS = {'kode_penyakit': 'P01', 'nama_penyakit': 'Dispepsia', 'deskripsi': 'Deskripsi P01',
+           'gejala_umum': '-', 'rekomendasi': '-', 'tindakan_segera': '-', 'konsultasi_medis': '-'}
+
+GEJALA = [f'G{i:02d}' for i in range(1, 22)]
+
+# Tambah kasus langsung ke file SQLite, seperti perubahan dari luar aplikasi (semua gejala 'Ya')
+def add_external_rows(path, penyakit, n, start=900):
+    cnx = sqlite3.connect(path)
+    cnx.executemany(f"INSERT INTO case_base_table (d_case, penyakit, {', '.join(GEJALA)}) VALUES ({', '.join(['?'] * 23)})",
+                    [(f'C{start + i}', penyakit, *([1] * 21)) for i in range(n)])
+    cnx.commit()
+    cnx.close()
+
+# Sumber xlsx bawaan dibaca sekali per sesi test
+@pytest.fixture(scope='session')
+def sources():
+    from knowledge import read_sources
+    frames, _ = read_sources(BASE_DIR)
+    return frames
+
+# Reset state tingkat proses yang terikat ke database sebelumnya
+def reset_process_state():
+    import db_funcs
+    import nb
+    db_funcs._case_base_counts_ready = False
+    db_funcs._case_id_sequence_ready = False
+    db_funcs.query_cache.clear()
+    db_funcs.bump_case_base_version()
+    nb._current_model = None
+    nb.diagnosis_cache.clear()
+
+# Database SQLite baru per test (case base bawaan, satu baris detail penyakit) yang dipakai db_funcs lewat get_connection
+@pytest.fixture
+def database(tmp_path, monkeypatch, sources):
+    import pandas as pd
+    import db_funcs
+    from storage import SQLiteBackend, seed_sqlite
+    path = str(tmp_path / 'pakar.db')
+    tables = {f'{name}_table': frame for name, frame in sources.items()}
+    tables['disease_details_table'] = pd.DataFrame([DETAILS])
+    seed_sqlite(path, tables)
+    pool = SQLiteBackend(path).create_pool(db_funcs.POOL_SIZE)
+    monkeypatch.setattr(db_funcs, 'init_pool', lambda: pool)
+    reset_process_state()
+    yield path
+    reset_process_state()
+
+@pytest.fixture
+def connection(database):
+    import db_funcs
+    with db_funcs.get_connection() as cnx:
+        yield cnx
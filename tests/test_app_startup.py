@@ -0,0 +1,53 @@
+import os
+import sys
+import threading
+import time
+import pytest
+from streamlit.testing.v1 import AppTest
+from conftest import BASE_DIR
+
+# AppTest menjalankan app.py sebagai __main__ dan tidak memulihkannya; tanpa ini proses spawn
+# pada test berikutnya (test_shared_model) menjalankan ulang app.py dan membuka database bawaan
+@pytest.fixture(autouse=True)
+def restore_main_module(monkeypatch):
+    monkeypatch.setitem(sys.modules, '__main__', sys.modules['__main__'])
+
+def wait_for_thread(name, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if any(thread.name == name for thread in threading.enumerate()):
+            return True
+        time.sleep(0.05)
+    return False
+
+# Watcher tidak bergantung pada WARMUP: dengan pemanasan mati, watcher tetap berjalan
+def test_watcher_starts_without_warmup(database, monkeypatch):
+    import watcher
+    monkeypatch.setenv('WARMUP', '0')
+    monkeypatch.setenv('MODEL_WATCH_INTERVAL', '60')
+    watcher.start_model_watcher.clear()
+    try:
+        AppTest.from_file(os.path.join(BASE_DIR, 'app.py'), default_timeout=60).run()
+        assert wait_for_thread('model-watcher')
+        assert not any(thread.name == 'warmup' for thread in threading.enumerate())
+    finally:
+        running = watcher.start_model_watcher()
+        if running is not None:
+            running.stop()
+        watcher.start_model_watcher.clear()
+
+def answer_ya(at, times):
+    for _ in range(times):
+        next(button for button in at.button if 'Ya' in button.label).click().run()
+
+# Riwayat pertanyaan hanya dicatat pada mode adaptif (dipakai tombol kembali)
+def test_asked_history_only_in_adaptive_mode(database):
+    at = AppTest.from_file(os.path.join(BASE_DIR, 'app.py'), default_timeout=60).run()
+    at.selectbox(key='menu_select').set_value('Sistem Pakar').run()
+    answer_ya(at, 3)
+    assert at.session_state.current_step == 3
+    assert at.session_state.asked == []
+
+    at.toggle(key='adaptive_mode').set_value(True).run()
+    answer_ya(at, 2)
+    assert len(at.session_state.asked) == 2
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from bitpack import PackedCaseBase, pack_bits, unpack_bits, popcount
+
+@pytest.mark.parametrize('width', [1, 21, 32, 40, 64])
+def test_pack_roundtrip(width):
+    matrix = np.random.default_rng(width).integers(0, 2, size=(257, width))
+    packed = pack_bits(matrix)
+    assert packed.dtype == (np.uint32 if width <= 32 else np.uint64)
+    np.testing.assert_array_equal(unpack_bits(packed, width), matrix)
+
+def test_pack_rejects_wide_matrix():
+    with pytest.raises(ValueError):
+        pack_bits(np.zeros((1, 65)))
+
+def test_popcount_table_fallback(monkeypatch):
+    words = np.random.default_rng(0).integers(0, 2**63, size=100, dtype=np.uint64)
+    expected = np.array([bin(int(word)).count('1') for word in words])
+    np.testing.assert_array_equal(popcount(words), expected)
+    monkeypatch.delattr(np, 'bitwise_count', raising=False)
+    np.testing.assert_array_equal(popcount(words), expected)
+
+def test_counts_match_groupby(sources, tmp_path):
+    case_base = sources['case_base']
+    gejala_cols = [col for col in case_base.columns if col.startswith('G')]
+    disease_codes = ['P01', 'P02', 'P03', 'P04', 'P05']   # P05 tanpa kasus
+    packed = PackedCaseBase.from_chunks((case_base[i:i + 30] for i in range(0, len(case_base), 30)), disease_codes)
+    class_counts, symptom_counts = packed.counts()
+
+    grouped = case_base.groupby('penyakit')
+    np.testing.assert_array_equal(class_counts, grouped.size().reindex(disease_codes, fill_value=0))
+    np.testing.assert_array_equal(symptom_counts, grouped[gejala_cols].sum().reindex(disease_codes, fill_value=0))
+
+    path = str(tmp_path / 'case_base.npz')
+    packed.save(path)
+    loaded = PackedCaseBase.load(path)
+    np.testing.assert_array_equal(loaded.rows, packed.rows)
+    assert loaded.disease_codes == disease_codes and loaded.gejala_codes == gejala_cols
@@ -0,0 +1,27 @@
+import db_funcs
+from conftest import reset_process_state, add_external_rows
+
+def test_counts_built_from_case_base(connection):
+    counts = db_funcs.get_case_base_counts(connection).set_index('penyakit')
+    assert counts['jumlah_kasus'].to_dict() == {'P01': 25, 'P02': 25, 'P03': 25, 'P04': 25}
+    assert db_funcs.case_base_counts_match(connection, full=True)
+
+def test_counts_rebuilt_after_rows_added_while_stopped(database):
+    with db_funcs.get_connection() as cnx:
+        db_funcs.get_case_base_counts(cnx)
+    add_external_rows(database, 'P01', 50)
+
+    # Proses baru: tabel ringkasan tidak kosong tetapi usang
+    reset_process_state()
+    with db_funcs.get_connection() as cnx:
+        counts = db_funcs.get_case_base_counts(cnx).set_index('penyakit')
+        assert counts.loc['P01', 'jumlah_kasus'] == 75
+        assert counts['jumlah_kasus'].sum() == 150
+        assert db_funcs.case_base_counts_match(cnx, full=True)
+
+def test_write_cases_keeps_counts_in_sync(connection):
+    db_funcs.write_cases(connection, [('P02', {'G01': 1, 'G05': 1}), ('P02', [0] * 21)])
+    counts = db_funcs.get_case_base_counts(connection).set_index('penyakit')
+    assert counts.loc['P02', 'jumlah_kasus'] == 27
+    assert db_funcs.get_row_count(connection, 'case_base_table') == 102
+    assert db_funcs.case_base_counts_match(connection, full=True)
@@ -0,0 +1,88 @@
+import json
+import db_funcs
+from conftest import add_external_rows, reset_process_state
+from metrics import metrics
+
+def case_ids(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT d_case FROM case_base_table")
+    ids = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return ids
+
+def test_sequence_reconciled_with_external_rows(database, connection):
+    assert db_funcs.write_cases(connection, [('P01', [0] * 21)]) == ['C101']
+    # Nomor berikutnya (C102-C104) dipakai dari luar aplikasi setelah sequence dibuat
+    add_external_rows(database, 'P02', 3, start=102)
+    assert db_funcs.write_cases(connection, [('P01', [0] * 21), ('P03', [1] * 21)]) == ['C105', 'C106']
+    ids = case_ids(connection)
+    assert len(ids) == len(set(ids)) == 106
+
+# Proses baru: sequence yang sudah ada disamakan lagi walaupun nomor berikutnya (C102) masih kosong
+def test_sequence_reconciled_on_start(database, connection):
+    db_funcs.write_cases(connection, [('P01', [0] * 21)])
+    add_external_rows(database, 'P02', 2, start=500)
+    reset_process_state()
+    assert db_funcs.write_cases(connection, [('P01', [0] * 21)]) == ['C502']
+
+def test_failed_case_is_isolated_and_dead_lettered(database, tmp_path):
+    dead_letter = tmp_path / 'dead.jsonl'
+    before = metrics.counter('case_writer_dead_letter_total')
+    writer = db_funcs.CaseWriter(batch_size=10, flush_interval=0.05, retry_delay=0,
+                                 dead_letter_path=str(dead_letter)).start()
+    # Jumlah nilai gejala salah: batch gagal setiap kali sampai kasus ini dipisahkan
+    writer.submit('P01', [1] * 21)
+    writer.submit('P02', [1] * 5)
+    writer.submit('P03', [0] * 21)
+    assert writer.flush(timeout=10)
+    writer.close()
+
+    assert writer.failed_flushes == writer.max_retries
+    assert writer.written == 2
+    assert writer.dead_lettered == 1
+    records = [json.loads(line) for line in dead_letter.read_text().splitlines()]
+    assert [(r['penyakit'], r['gejala']) for r in records] == [('P02', [1] * 5)]
+    assert metrics.counter('case_writer_dead_letter_total') == before + 1
+    with db_funcs.get_connection() as cnx:
+        assert db_funcs.get_row_count(cnx, 'case_base_table') == 102
+
+def test_unreachable_database_dead_letters_queue(database, tmp_path, monkeypatch):
+    dead_letter = tmp_path / 'dead.jsonl'
+    def unavailable():
+        raise db_funcs.DB_ERRORS[0]("database is unavailable")
+    monkeypatch.setattr(db_funcs, 'init_pool', unavailable)
+    # Thread latar tidak boleh memanggil st.error; kegagalan hanya dicatat di log
+    errors = []
+    monkeypatch.setattr(db_funcs, 'show_error', errors.append)
+    writer = db_funcs.CaseWriter(batch_size=10, flush_interval=0.05, retry_delay=0,
+                                 dead_letter_path=str(dead_letter)).start()
+    for _ in range(3):
+        writer.submit('P01', [1] * 21)
+    assert writer.flush(timeout=10)
+    writer.close()
+    assert writer.written == 0
+    assert writer.dead_lettered == 3
+    assert errors == []
+    records = [json.loads(line) for line in dead_letter.read_text().splitlines()]
+    assert len(records) == 3
+    assert all('database is unavailable' in record['error'] for record in records)
+
+# Model di memori hanya menerima kasus yang sudah di-commit; kasus dead-letter tidak pernah masuk model
+def test_model_updated_only_after_commit(database, tmp_path):
+    import nb
+    model = nb.get_model()
+    p01 = model.disease_codes.index('P01')
+    writer = db_funcs.CaseWriter(batch_size=10, flush_interval=0.05, retry_delay=0,
+                                 dead_letter_path=str(tmp_path / 'dead.jsonl')).start()
+    writer.submit('P01', {'G01': 1, 'G03': 1})
+    writer.submit('P02', [1] * 5)
+    assert writer.flush(timeout=10)
+    writer.close()
+
+    assert writer.dead_lettered == 1
+    assert nb.get_model() is model
+    assert model.total_cases == 101
+    assert model.class_counts[p01] == 26
+    with db_funcs.get_connection() as cnx:
+        rebuilt = nb.load_model_from_db(cnx)
+    assert (rebuilt.symptom_counts == model.symptom_counts).all()
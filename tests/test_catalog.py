@@ -0,0 +1,32 @@
+import os
+import shutil
+import catalog
+from conftest import BASE_DIR
+
+def test_xlsx_catalog_cached(tmp_path, monkeypatch):
+    monkeypatch.setenv('CATALOG_CACHE_DIR', str(tmp_path / 'cache'))
+    path = tmp_path / 'data_gejala.xlsx'
+    shutil.copy(os.path.join(BASE_DIR, 'data_gejala.xlsx'), path)
+    parsed = catalog.read_catalog(str(path))
+    assert os.listdir(tmp_path / 'cache')
+
+    # Pembacaan berikutnya memakai cache, openpyxl tidak dipanggil
+    calls = []
+    read_xlsx = catalog.read_xlsx_catalog
+    monkeypatch.setattr(catalog, 'read_xlsx_catalog', lambda p: calls.append(p) or read_xlsx(p))
+    cached = catalog.read_catalog(str(path))
+    assert calls == []
+    assert (cached.codes, cached.names, cached.questions) == (parsed.codes, parsed.names, parsed.questions)
+
+    # File sumber berubah: cache lama tidak dipakai
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    catalog.read_catalog(str(path))
+    assert calls == [str(path)]
+
+def test_catalog_cache_unwritable(tmp_path, monkeypatch):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    monkeypatch.setenv('CATALOG_CACHE_DIR', str(blocker / 'cache'))
+    parsed = catalog.read_catalog(os.path.join(BASE_DIR, 'data_gejala.xlsx'))
+    assert len(parsed) == 21
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+import evaluate
+from nb import NaiveBayesModel
+
+@pytest.fixture
+def encoded(sources):
+    values, labels, gejala_codes = evaluate.encode_case_base(sources['data_penyakit'], sources['case_base'])
+    return values, labels, len(sources['data_penyakit'])
+
+# Leave-one-out acuan: model dibangun ulang dari DataFrame tanpa kasus ke-i; mengembalikan skor log per penyakit
+def brute_force_loo(data_penyakit, case_base):
+    gejala_codes = [col for col in case_base.columns if col.startswith('G')]
+    scores = []
+    for i in range(len(case_base)):
+        model = NaiveBayesModel.from_frames(data_penyakit, case_base.drop(index=case_base.index[i]))
+        values = case_base.iloc[i][gejala_codes].to_numpy(dtype=float)
+        scores.append(model.log_scores(values, np.ones(len(values), dtype=bool)))
+    return np.array(scores)
+
+def test_leave_one_out_scores_match_refit(sources, encoded):
+    values, labels, n_disease = encoded
+    evaluate._init_worker(values, labels, n_disease)
+    y, scores = evaluate._loo_scores(0, len(labels))
+    expected = brute_force_loo(sources['data_penyakit'], sources['case_base'])
+    np.testing.assert_array_equal(y, labels)
+    np.testing.assert_allclose(scores, expected, rtol=1e-12)
+
+@pytest.mark.parametrize('chunk_size', [evaluate.LOO_CHUNK_SIZE, 7])
+def test_leave_one_out_matches_refit(sources, encoded, chunk_size):
+    values, labels, n_disease = encoded
+    y_true, y_pred = evaluate.leave_one_out(values, labels, n_disease, chunk_size=chunk_size)
+    np.testing.assert_array_equal(y_true, labels)
+    np.testing.assert_array_equal(y_pred, brute_force_loo(sources['data_penyakit'], sources['case_base']).argmax(axis=1))
+
+def test_stratified_folds_keep_class_balance(encoded):
+    values, labels, n_disease = encoded
+    # Case base bawaan seimbang; buang sebagian kasus agar jumlah per penyakit tidak habis dibagi k
+    labels = labels[np.r_[0:len(labels):3, 1:len(labels):5]]
+    k = 10
+    folds = evaluate.stratified_folds(labels, k, seed=3)
+    assert set(folds) == set(range(k))
+
+    per_fold = np.array([np.bincount(labels[folds == f], minlength=n_disease) for f in range(k)])
+    np.testing.assert_array_equal(per_fold.sum(axis=0), np.bincount(labels, minlength=n_disease))
+    assert (per_fold.max(axis=0) - per_fold.min(axis=0) <= 1).all()
+    sizes = per_fold.sum(axis=1)
+    assert sizes.max() - sizes.min() <= 1
+
+def test_folds_are_reproducible(encoded):
+    labels = encoded[1]
+    np.testing.assert_array_equal(evaluate.stratified_folds(labels, 5, seed=1), evaluate.stratified_folds(labels, 5, seed=1))
+    assert not np.array_equal(evaluate.stratified_folds(labels, 5, seed=1), evaluate.stratified_folds(labels, 5, seed=2))
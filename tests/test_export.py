@@ -0,0 +1,35 @@
+import io
+import json
+import pandas as pd
+import db_funcs
+
+# Ekspor per chunk harus sama dengan ekspor DataFrame penuh (termasuk JSON ber-indent 2)
+def test_chunked_exports_match_full_dataframe(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT * FROM case_base_table")
+    columns = [desc[0] for desc in cursor.description]
+    frame = pd.DataFrame(cursor.fetchall(), columns=columns)
+    cursor.close()
+
+    out = io.BytesIO()
+    assert db_funcs.export_table(connection, 'case_base_table', 'json', out, chunk_size=7) == len(frame)
+    assert out.getvalue().decode('utf-8') == frame.to_json(orient='records', indent=2)
+
+    out = io.BytesIO()
+    db_funcs.export_table(connection, 'case_base_table', 'csv', out, chunk_size=7)
+    assert out.getvalue().decode('utf-8') == frame.to_csv(index=False)
+
+# Spool kecil memaksa file ekspor pindah ke disk selama dibangun
+def test_export_table_bytes_spills_to_disk(database, monkeypatch):
+    monkeypatch.setattr(db_funcs, 'EXPORT_SPOOL_SIZE', 1024)
+    data = db_funcs.export_table_bytes('case_base_table', 'json')
+    assert len(json.loads(data)) == 100
+
+def test_empty_table_export(connection):
+    cursor = connection.cursor()
+    cursor.execute("DELETE FROM disease_details_table")
+    connection.commit()
+    cursor.close()
+    out = io.BytesIO()
+    db_funcs.export_table(connection, 'disease_details_table', 'json', out)
+    assert json.loads(out.getvalue()) == []
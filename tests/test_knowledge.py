@@ -0,0 +1,88 @@
+import os
+import shutil
+import numpy as np
+import pytest
+import knowledge
+from conftest import BASE_DIR
+from knowledge import KnowledgeBase, build_artifact, read_sources, validate_sources
+from nb import NaiveBayesModel
+
+ANSWERS = ['Ya', 'Tidak', 'Tidak Diketahui', 'Ya', 'Ya'] + ['Tidak'] * 8 + ['Tidak Diketahui'] * 8
+
+@pytest.fixture(scope='module')
+def artifact(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('artifact') / 'knowledge_base.spkb')
+    build_artifact(path, BASE_DIR)
+    return path
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_artifact_round_trip(artifact, sources, mmap):
+    kb = KnowledgeBase.load(artifact, mmap=mmap)
+    expected = NaiveBayesModel.from_frames(sources['data_penyakit'], sources['case_base'])
+    model = kb.model()
+    assert model.disease_codes == expected.disease_codes
+    assert model.gejala_codes == expected.gejala_codes
+    assert model.total_cases == expected.total_cases
+    np.testing.assert_array_equal(model.class_counts, expected.class_counts)
+    np.testing.assert_array_equal(model.symptom_counts, expected.symptom_counts)
+    np.testing.assert_allclose(model.posterior(ANSWERS), expected.posterior(ANSWERS))
+
+    values, disease_idx = kb.case_values()
+    np.testing.assert_array_equal(values, sources['case_base'][kb.gejala_codes].to_numpy())
+    assert kb.catalog.codes == list(sources['data_gejala']['kode_gejala'])
+    assert set(kb.header['sumber']) == set(knowledge.SOURCES)
+
+def test_artifact_version_follows_source_checksums(artifact, tmp_path):
+    source_dir = tmp_path / 'sumber'
+    source_dir.mkdir()
+    for filename in knowledge.SOURCES.values():
+        shutil.copy(os.path.join(BASE_DIR, filename), source_dir / filename)
+    same = build_artifact(str(tmp_path / 'same.spkb'), str(source_dir))
+    assert same.version == KnowledgeBase.load(artifact).version
+
+    with open(source_dir / 'data_penyakit.xlsx', 'ab') as f:
+        f.write(b'\0')
+    changed = build_artifact(str(tmp_path / 'changed.spkb'), str(source_dir))
+    assert changed.version != same.version
+    assert changed.header['sumber']['data_penyakit']['sha256'] != same.header['sumber']['data_penyakit']['sha256']
+
+def test_load_rejects_foreign_and_other_format_versions(artifact, tmp_path):
+    with open(artifact, 'rb') as f:
+        data = f.read()
+
+    foreign = tmp_path / 'foreign.spkb'
+    foreign.write_bytes(b'NOTSPKB\0' + data[8:])
+    with pytest.raises(ValueError, match="not a knowledge base artifact"):
+        KnowledgeBase.load(str(foreign))
+
+    short = tmp_path / 'short.spkb'
+    short.write_bytes(data[:4])
+    with pytest.raises(ValueError, match="not a knowledge base artifact"):
+        KnowledgeBase.load(str(short))
+
+    newer = tmp_path / 'newer.spkb'
+    preamble = knowledge._PREAMBLE.unpack(data[:knowledge._PREAMBLE.size])
+    newer.write_bytes(knowledge._PREAMBLE.pack(preamble[0], knowledge.FORMAT_VERSION + 1, preamble[2])
+                      + data[knowledge._PREAMBLE.size:])
+    with pytest.raises(ValueError, match=f"format version {knowledge.FORMAT_VERSION + 1}"):
+        KnowledgeBase.load(str(newer))
+
+def test_strict_build_rejects_rule_source_mismatch(tmp_path):
+    kb = build_artifact(str(tmp_path / 'lenient.spkb'), BASE_DIR)
+    assert any(w.startswith('P03: relasi and representasi_pengetahuan disagree') for w in kb.header['peringatan'])
+
+    output = tmp_path / 'strict.spkb'
+    with pytest.raises(ValueError, match="P03: relasi and representasi_pengetahuan disagree"):
+        build_artifact(str(output), BASE_DIR, strict=True)
+    assert not output.exists()
+
+def test_relasi_missing_symptom_is_reported(tmp_path):
+    frames, _ = read_sources(BASE_DIR)
+    relasi = frames['relasi']
+    relasi[relasi['kode_gejala'] != 'G07'].to_csv(tmp_path / 'relasi.csv', index=False)
+    frames, _ = read_sources(BASE_DIR, {'relasi': str(tmp_path / 'relasi.csv')})
+    problems = validate_sources(frames)
+    assert "relasi: missing symptom code(s) G07." in problems
+
+    with pytest.raises(ValueError, match="relasi: missing symptom code"):
+        build_artifact(str(tmp_path / 'invalid.spkb'), BASE_DIR, {'relasi': str(tmp_path / 'relasi.csv')})
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import pytest
+import nb
+from nb import NaiveBayesModel, cached_posterior, diagnosis_cache
+
+@pytest.fixture
+def frames(sources):
+    data_penyakit = sources['data_penyakit'].rename(columns=str.lower)
+    return data_penyakit, sources['case_base']
+
+# Posterior acuan: perkalian probabilitas langsung (Laplace smoothing), tanpa ruang log
+def reference_posterior(data_penyakit, case_base, answers):
+    gejala_cols = [col for col in case_base.columns if col.startswith('G')]
+    scores = []
+    for kode in data_penyakit['kode_penyakit']:
+        rows = case_base[case_base['penyakit'] == kode]
+        score = len(rows) / len(case_base)
+        for col, answer in zip(gejala_cols, answers):
+            p_yes = (rows[col].sum() + 1) / (len(rows) + 2)
+            if answer == 'Ya':
+                score *= p_yes
+            elif answer == 'Tidak':
+                score *= 1 - p_yes
+        scores.append(score)
+    scores = np.array(scores)
+    return scores / scores.sum()
+
+ANSWERS = ['Ya', 'Tidak', 'Tidak Diketahui', 'Ya', 'Ya'] + ['Tidak'] * 8 + ['Tidak Diketahui'] * 8
+
+def test_posterior_matches_reference(frames):
+    data_penyakit, case_base = frames
+    model = NaiveBayesModel.from_frames(data_penyakit, case_base)
+    expected = reference_posterior(data_penyakit, case_base, ANSWERS)
+    np.testing.assert_allclose(model.posterior(ANSWERS), expected)
+    values, known = nb.encode_answer_matrix([ANSWERS, ['Tidak'] * 21])
+    np.testing.assert_allclose(model.posterior_batch(values, known)[0], expected)
+
+def test_model_from_sqlite_counts_matches_files(frames, connection):
+    data_penyakit, case_base = frames
+    from_db = nb.load_model_from_db(connection)
+    from_files = NaiveBayesModel.from_frames(data_penyakit, case_base)
+    assert from_db.disease_codes == from_files.disease_codes
+    assert from_db.total_cases == from_files.total_cases == len(case_base)
+    np.testing.assert_array_equal(from_db.symptom_counts, from_files.symptom_counts)
+    np.testing.assert_allclose(from_db.posterior(ANSWERS), from_files.posterior(ANSWERS))
+
+def test_add_case_matches_rebuilt_model(frames):
+    data_penyakit, case_base = frames
+    model = NaiveBayesModel.from_frames(data_penyakit, case_base)
+    new_case = [1, 0, 1] + [0] * 18
+    model.add_case('P03', new_case)
+    model.add_case('P99', [1] * 21)   # kode tidak dikenal: hanya prior yang berubah
+
+    extra = pd.DataFrame([['X1', 'P03'] + new_case, ['X2', 'P99'] + [1] * 21], columns=case_base.columns)
+    rebuilt = NaiveBayesModel.from_frames(data_penyakit, pd.concat([case_base, extra], ignore_index=True))
+    assert model.total_cases == rebuilt.total_cases == len(case_base) + 2
+    for name in ('log_prior', 'log_yes', 'log_no'):
+        np.testing.assert_allclose(getattr(model, name), getattr(rebuilt, name))
+
+def test_cached_posterior_is_invalidated_by_add_case(frames):
+    data_penyakit, case_base = frames
+    model = NaiveBayesModel.from_frames(data_penyakit, case_base)
+    diagnosis_cache.clear()
+    first = cached_posterior(model, ANSWERS)
+    hits = diagnosis_cache.stats()['hits']
+    assert cached_posterior(model, ANSWERS) is first
+    assert diagnosis_cache.stats()['hits'] == hits + 1
+
+    model.add_case('P01', [1] * 21)
+    updated = cached_posterior(model, ANSWERS)
+    np.testing.assert_allclose(updated, model.posterior(ANSWERS))
+    assert not np.allclose(updated, first)
+
+def test_diagnosis_through_get_model(frames, database):
+    data_penyakit, case_base = frames
+    result = nb.naive_bayes_diagnosis(ANSWERS)
+    expected = reference_posterior(data_penyakit, case_base, ANSWERS)
+    assert result['kode_penyakit'] == data_penyakit['kode_penyakit'][expected.argmax()]
+    assert result['confidence'] == pytest.approx(expected.max())
+    assert nb.get_model() is nb.get_model()
+
+# naive_bayes_diagnosis dan cached_posterior berbagi satu cache
+def test_diagnosis_shares_cached_posterior(database):
+    model = nb.get_model()
+    diagnosis_cache.clear()
+    probabilities = cached_posterior(model, ANSWERS)
+    hits = diagnosis_cache.stats()['hits']
+    result = nb.naive_bayes_diagnosis(ANSWERS)
+    assert diagnosis_cache.stats()['hits'] == hits + 1
+    assert result['confidence'] == pytest.approx(probabilities.max())
+
+# Model kecil buatan tangan: G1 membedakan A/B sepenuhnya, G2 tidak informatif, G3 sedikit informatif
+@pytest.fixture
+def small_model():
+    return NaiveBayesModel(['A', 'B'], ['Penyakit A', 'Penyakit B'], ['G1', 'G2', 'G3'],
+                           np.array([10, 10]), np.array([[10, 5, 7], [0, 5, 3]]), 20)
+
+def test_information_gain_orders_questions(small_model):
+    gain = small_model.information_gain(np.array([0.5, 0.5]))
+    assert gain[0] > gain[2] > 0
+    assert gain[1] == pytest.approx(0)
+    assert small_model.next_question([None, None, None]) == 0
+    # G1 dilewati ('Tidak Diketahui'): berikutnya G3, bukan G2 yang tidak informatif
+    assert small_model.next_question(['Tidak Diketahui', None, None]) == 2
+
+def test_next_question_stops_when_threshold_reached(small_model):
+    answers = [None, None, 'Ya']        # posterior A = 2/3, G1 masih bisa membalik peringkat
+    assert small_model.next_question(answers, threshold=0.95) == 0
+    assert small_model.next_question(answers, threshold=0.6) is None
+    assert small_model.next_question(['Ya', 'Tidak', 'Ya']) is None
+
+def test_next_question_stops_when_ranking_settled(small_model):
+    answers = ['Ya', None, None]
+    values, known = nb.encode_answers(answers)
+    scores = small_model.log_scores(values, known)
+    assert nb.normalize_log_scores(scores).max() < 0.95
+    # Jawaban G2/G3 apa pun tidak bisa membuat B melampaui A
+    assert small_model.ranking_settled(scores, np.array([False, True, True]))
+    assert small_model.next_question(answers) is None
+
+    values, known = nb.encode_answers([None, None, 'Ya'])
+    scores = small_model.log_scores(values, known)
+    assert not small_model.ranking_settled(scores, np.array([True, True, False]))
@@ -0,0 +1,30 @@
+import sqlite3
+import db_funcs
+from storage import SQLiteBackend
+
+real_init_pool = db_funcs.init_pool
+
+# Backend yang gagal membuat pool pada percobaan pertama (database sedang tidak dapat dihubungi)
+class FlakyBackend(SQLiteBackend):
+    failures = 1
+
+    def create_pool(self, size):
+        if FlakyBackend.failures:
+            FlakyBackend.failures -= 1
+            raise sqlite3.OperationalError("database is unavailable")
+        return super().create_pool(size)
+
+def test_pool_is_retried_after_failed_connect(database, monkeypatch):
+    monkeypatch.setattr(db_funcs, 'init_pool', real_init_pool)
+    monkeypatch.setattr(db_funcs, 'get_backend', lambda: FlakyBackend(database))
+    db_funcs.reset_pool()
+    try:
+        with db_funcs.get_connection() as cnx:
+            assert cnx is None
+        with db_funcs.get_connection() as cnx:
+            assert cnx is not None and cnx.is_connected()
+            cursor = cnx.cursor()
+            cursor.execute("SELECT COUNT(*) FROM case_base_table")
+            assert cursor.fetchone()[0] == 100
+    finally:
+        db_funcs.reset_pool()
@@ -0,0 +1,64 @@
+import pytest
+import db_funcs
+from db_funcs import QueryCache, _MISSING
+from conftest import add_external_rows
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def test_entries_expire_after_ttl(clock):
+    cache = QueryCache(clock=clock)
+    cache.put('key', 'value', ttl=10, tables=['t'])
+    clock.now += 9.9
+    assert cache.get('key') == 'value'
+    clock.now += 0.1
+    assert cache.get('key') is _MISSING
+    assert cache.stats()['size'] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = QueryCache(maxsize=2, clock=clock)
+    cache.put('a', 1, ttl=60, tables=['t'])
+    cache.put('b', 2, ttl=60, tables=['t'])
+    assert cache.get('a') == 1          # 'b' sekarang yang paling lama tidak dipakai
+    cache.put('c', 3, ttl=60, tables=['t'])
+    assert cache.get('b') is _MISSING
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.evictions == 1
+
+def test_invalidate_only_touches_dependent_entries(clock):
+    cache = QueryCache(clock=clock)
+    cache.put('cases', 1, ttl=60, tables=['case_base_table'])
+    cache.put('joined', 2, ttl=60, tables=['case_base_table', 'data_penyakit_table'])
+    cache.put('diseases', 3, ttl=60, tables=['data_penyakit_table'])
+    cache.invalidate('case_base_table')
+    assert cache.get('cases') is _MISSING
+    assert cache.get('joined') is _MISSING
+    assert cache.get('diseases') == 3
+    assert cache.invalidations == 2
+
+def test_cached_query_ttl_and_write_invalidation(connection, database, clock, monkeypatch):
+    monkeypatch.setattr(db_funcs.query_cache, 'clock', clock)
+    assert db_funcs.get_row_count(connection, 'case_base_table') == 100
+    penyakit = db_funcs.get_table_data(connection, 'data_penyakit_table')
+
+    # Perubahan dari luar aplikasi baru terlihat setelah TTL (30 detik) habis
+    add_external_rows(database, 'P01', 1)
+    assert db_funcs.get_row_count(connection, 'case_base_table') == 100
+    clock.now += 30
+    assert db_funcs.get_row_count(connection, 'case_base_table') == 101
+
+    # write_cases langsung membuang hasil untuk case_base_table, tabel lain tetap di-cache
+    hits = db_funcs.query_cache.hits
+    db_funcs.write_cases(connection, [('P02', [0] * 21)])
+    assert db_funcs.get_row_count(connection, 'case_base_table') == 102
+    assert db_funcs.get_table_data(connection, 'data_penyakit_table').equals(penyakit)
+    assert db_funcs.query_cache.hits == hits + 1
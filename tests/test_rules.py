@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+from fc import ForwardChainingEngine, approximate_matches
+from knowledge import rule_source_differences, validate_sources
+
+def test_representasi_requires_exact_symptom_names(sources):
+    with pytest.raises(ValueError, match="Rasa pahit di lidah"):
+        ForwardChainingEngine.from_representasi(sources['representasi_pengetahuan'], sources['data_gejala'])
+
+def test_approximate_matches_are_listed(sources):
+    matches = approximate_matches(sources['representasi_pengetahuan'], sources['data_gejala'])
+    assert ('P01', 'Rasa pahit di lidah', 'G06') in matches
+    assert ('P03', 'Kekurangan sel darah merah', 'G15') in matches
+
+def test_exact_names_compile_to_the_same_rules_as_relasi(sources):
+    data_gejala = sources['data_gejala']
+    relasi = ForwardChainingEngine.from_relasi(sources['relasi'])
+    names = dict(zip(data_gejala['kode_gejala'], data_gejala['gejala']))
+    representasi = pd.DataFrame({
+        'Penyakit': [rule.kode_penyakit for rule in relasi.rules],
+        'Aturan': [f"IF {' AND '.join(names[code] for code in rule.gejala)} THEN {rule.kode_penyakit}" for rule in relasi.rules]
+    })
+    text = ForwardChainingEngine.from_representasi(representasi, data_gejala)
+    assert text.masks == relasi.masks
+
+def test_validation_reports_rule_source_disagreement(sources):
+    assert validate_sources(sources) == []
+    differences = rule_source_differences(sources)
+    assert any(d.startswith('P03: relasi and representasi_pengetahuan disagree') and 'G11' in d for d in differences)
+    assert not any(d.startswith(('P01:', 'P02:', 'P04:')) for d in differences)
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import os
+import sqlite3
+import pytest
+import db_funcs
+from conftest import BASE_DIR, DETAILS
+from nb import load_model_from_files
+from service import DiagnosisService, HTTPError
+
+@pytest.fixture(scope='module')
+def model():
+    return load_model_from_files(os.path.join(BASE_DIR, 'data_penyakit.xlsx'), os.path.join(BASE_DIR, 'case_base.xlsx'))
+
+@pytest.fixture
+def service(model):
+    return DiagnosisService(model)
+
+def request(service, method, path, payload=None):
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    return asyncio.run(service.route(method, path, body))
+
+def status_of(service, method, path, payload=None):
+    with pytest.raises(HTTPError) as info:
+        request(service, method, path, payload)
+    return info.value.status
+
+def test_health_and_single_diagnosis(service, model):
+    assert request(service, 'GET', '/health')['total_kasus'] == model.total_cases
+    result = request(service, 'POST', '/diagnosis', {'answers': {'G01': 'Ya', 'G02': 'Ya'}})
+    assert result['kode_penyakit'] in model.disease_codes
+    assert abs(sum(result['probabilitas'].values()) - 1) < 1e-9
+
+def test_batch_matches_single_diagnosis(service, model):
+    rows = [[1] * len(model.gejala_codes), [0] * len(model.gejala_codes)]
+    result = request(service, 'POST', '/diagnosis/batch', {'values': rows})
+    assert len(result['kode_penyakit']) == 2
+    single = request(service, 'POST', '/diagnosis', {'answers': ['Ya'] * len(model.gejala_codes)})
+    assert result['kode_penyakit'][0] == single['kode_penyakit']
+
+@pytest.mark.parametrize('payload', [
+    {'values': [[0, 1], [0, 1, 1]]},                      # baris tidak sama panjang
+    {'values': [[0, 1, 1]]},                              # jumlah gejala salah
+    {'values': [['Ya'] * 21]},                            # bukan angka
+    {'values': [[1] * 21], 'known': [[True] * 20]},       # bentuk known berbeda
+    {'values': []},
+    {'answers': []},
+    {'answers': 'Ya'},
+])
+def test_invalid_batch_is_rejected(service, payload):
+    assert status_of(service, 'POST', '/diagnosis/batch', payload) == 400
+
+def test_disease_details(database, service):
+    assert request(service, 'GET', '/penyakit/P01') == DETAILS
+    assert status_of(service, 'GET', '/penyakit/P99') == 404
+
+def test_database_errors_are_503(database, service, monkeypatch):
+    cnx = sqlite3.connect(database)
+    cnx.execute("DROP TABLE disease_details_table")
+    cnx.close()
+    assert status_of(service, 'GET', '/penyakit/P01') == 503
+
+    def unavailable():
+        raise sqlite3.OperationalError("database is unavailable")
+    monkeypatch.setattr(db_funcs, 'init_pool', unavailable)
+    assert status_of(service, 'GET', '/penyakit/P02') == 503
+
+# Layanan tidak bergantung pada Streamlit (diperiksa di proses baru karena test lain mengimpornya)
+def test_service_does_not_import_streamlit():
+    import subprocess
+    import sys
+    code = "import sys, service; sys.exit('streamlit' in sys.modules)"
+    assert subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR).returncode == 0
+
+# Kirim request HTTP mentah ke service.handle lewat socket lokal; hasil: (status, body JSON)
+def raw_request(service, data):
+    async def run():
+        server = await asyncio.start_server(service.handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(data)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        return response
+    head, _, body = asyncio.run(run()).partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+@pytest.mark.parametrize('length', [b'abc', b'-5', b'1.5'])
+def test_invalid_content_length_is_400(service, length):
+    status, body = raw_request(service, b'POST /diagnosis HTTP/1.1\r\nContent-Length: ' + length + b'\r\n\r\n')
+    assert status == 400
+    assert 'Content-Length' in body['error']
+
+def test_disease_code_is_percent_decoded(database, service):
+    cnx = sqlite3.connect(database)
+    cnx.execute("INSERT INTO disease_details_table (kode_penyakit, nama_penyakit) VALUES ('P 05', 'Uji')")
+    cnx.commit()
+    cnx.close()
+    status, body = raw_request(service, b'GET /penyakit/P%2005 HTTP/1.1\r\nConnection: close\r\n\r\n')
+    assert status == 200
+    assert body['nama_penyakit'] == 'Uji'
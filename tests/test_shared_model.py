@@ -0,0 +1,44 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+import pytest
+from nb import NaiveBayesModel
+from shared_model import attach_model, publish_model
+
+ANSWERS = [['Ya', 'Tidak', 'Tidak Diketahui', 'Ya', 'Ya'] + ['Tidak'] * 8 + ['Tidak Diketahui'] * 8,
+           ['Tidak'] * 21,
+           ['Ya'] * 21]
+
+# Dijalankan di proses worker: petakan model dari shared memory dan hitung posterior
+def worker_posteriors(spec):
+    shm, model = attach_model(spec)
+    try:
+        posteriors = [model.posterior(answers) for answers in ANSWERS]
+        model.add_case('P01', [1] * 21)   # salinan lokal, blok bersama tidak berubah
+        return posteriors
+    finally:
+        del model
+        shm.close()
+
+def test_attached_model_matches_published(sources):
+    model = NaiveBayesModel.from_frames(sources['data_penyakit'], sources['case_base'])
+    shm, spec = publish_model(model)
+    try:
+        with multiprocessing.get_context('spawn').Pool(1) as pool:
+            posteriors = pool.apply(worker_posteriors, (spec,))
+        for answers, posterior in zip(ANSWERS, posteriors):
+            np.testing.assert_allclose(posterior, model.posterior(answers))
+
+        # Worker lain (dan proses ini) tetap melihat model asli setelah add_case di worker
+        attached_shm, attached = attach_model(spec)
+        assert not attached.symptom_counts.flags.writeable
+        np.testing.assert_array_equal(attached.symptom_counts, model.symptom_counts)
+        assert attached.total_cases == model.total_cases
+        del attached
+        attached_shm.close()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=spec['name'])
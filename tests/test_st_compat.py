@@ -0,0 +1,26 @@
+import pytest
+import st_compat
+
+def test_process_cache_without_streamlit(monkeypatch):
+    monkeypatch.setattr(st_compat, '_streamlit', lambda: None)
+    calls = []
+
+    @st_compat.cache_resource(max_entries=2)
+    def build(key):
+        calls.append(key)
+        if key == 'bad':
+            raise ValueError(key)
+        return object()
+
+    first = build('a')
+    assert build('a') is first
+    build('b')
+    build('c')                      # 'a' dibuang (LRU, maksimum 2 entri)
+    assert build('a') is not first
+    with pytest.raises(ValueError):
+        build('bad')
+    with pytest.raises(ValueError):
+        build('bad')                # exception tidak di-cache
+    build.clear()
+    build('c')
+    assert calls == ['a', 'b', 'c', 'a', 'bad', 'bad', 'c']
@@ -0,0 +1,64 @@
+import sqlite3
+import pandas as pd
+import pytest
+from storage import SQLITE_INDEXES, SQLiteBackend, qmark_sql, seed_sqlite
+
+def index_names(path):
+    cnx = sqlite3.connect(path)
+    try:
+        return {row[0]: row[1] for row in cnx.execute("SELECT name, tbl_name FROM sqlite_master WHERE type = 'index' "
+                                                      "AND name NOT LIKE 'sqlite_%'")}
+    finally:
+        cnx.close()
+
+def test_seed_creates_tables_and_indexes(database, sources):
+    cnx = sqlite3.connect(database)
+    try:
+        tables = {row[0] for row in cnx.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert {f'{name}_table' for name in sources} | {'disease_details_table'} <= tables
+        for name, frame in sources.items():
+            assert cnx.execute(f"SELECT COUNT(*) FROM {name}_table").fetchone()[0] == len(frame)
+        columns = [row[1] for row in cnx.execute("PRAGMA table_info(case_base_table)")]
+        assert columns == list(sources['case_base'].columns)
+        plan = ' '.join(row[3] for row in cnx.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM case_base_table WHERE penyakit = 'P01'"))
+        assert 'idx_case_base_penyakit' in plan
+    finally:
+        cnx.close()
+    expected = {statement.split(' EXISTS ')[1].split()[0] for statement in SQLITE_INDEXES}
+    assert set(index_names(database)) == expected
+
+def test_seed_refuses_existing_tables_without_replace(tmp_path):
+    path = str(tmp_path / 'seed.db')
+    frame = pd.DataFrame({'kode_penyakit': ['P01'], 'nama_penyakit': ['A']})
+    assert seed_sqlite(path, {'data_penyakit_table': frame}) == {'data_penyakit_table': 1, 'disease_details_table': 0}
+    with pytest.raises(ValueError, match="data_penyakit_table"):
+        seed_sqlite(path, {'data_penyakit_table': frame})
+    seed_sqlite(path, {'data_penyakit_table': pd.concat([frame, frame.assign(kode_penyakit='P02')])}, replace=True)
+    cnx = sqlite3.connect(path)
+    assert cnx.execute("SELECT COUNT(*) FROM data_penyakit_table").fetchone()[0] == 2
+    cnx.close()
+    assert index_names(path) == {'idx_data_penyakit_kode': 'data_penyakit_table',
+                                 'idx_disease_details_kode': 'disease_details_table'}
+
+@pytest.mark.parametrize('sql, expected', [
+    ("SELECT * FROM t WHERE a = %s AND b = %s", "SELECT * FROM t WHERE a = ? AND b = ?"),
+    ("SELECT * FROM t WHERE a = '%s' AND b = %s", "SELECT * FROM t WHERE a = '%s' AND b = ?"),
+    ("SELECT 'it''s %s', %s", "SELECT 'it''s %s', ?"),
+    ('SELECT "col %s" FROM t WHERE a = %s', 'SELECT "col %s" FROM t WHERE a = ?'),
+    ("SELECT * FROM t WHERE a LIKE %s || '%%'", "SELECT * FROM t WHERE a LIKE ? || '%%'"),
+    ("SELECT 100 %% 7, %s", "SELECT 100 % 7, ?"),
+])
+def test_placeholders_rewritten_outside_literals(sql, expected):
+    assert qmark_sql(sql) == expected
+
+def test_cursor_keeps_percent_s_literal(tmp_path):
+    connection = SQLiteBackend(str(tmp_path / 'cursor.db')).create_pool(1).checkout()
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute("SELECT '%s' AS literal, %s AS value", ('P01',))
+    assert cursor.fetchone() == {'literal': '%s', 'value': 'P01'}
+    cursor.execute("CREATE TABLE t (a TEXT)")
+    cursor.executemany("INSERT INTO t (a) VALUES (%s || '%s')", [('x',), ('y',)])
+    cursor.execute("SELECT a FROM t ORDER BY a")
+    assert cursor.fetchall() == [{'a': 'x%s'}, {'a': 'y%s'}]
+    connection.close()
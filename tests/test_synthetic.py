@@ -0,0 +1,35 @@
+import os
+import pandas as pd
+import pytest
+import db_funcs
+from conftest import BASE_DIR
+from synthetic import CaseProfile, write_database
+
+@pytest.fixture(scope='module')
+def profile():
+    return CaseProfile.from_files(*(os.path.join(BASE_DIR, name) for name in ('case_base.xlsx', 'relasi.xlsx', 'data_penyakit.xlsx')))
+
+# Nama kolom sumber dinormalisasi seperti knowledge.read_sources (spasi dan huruf besar)
+def test_from_files_normalizes_columns(sources, tmp_path, profile):
+    renamed = {}
+    for name, frame in (('case_base', sources['case_base']), ('relasi', sources['relasi']),
+                        ('data_penyakit', sources['data_penyakit'])):
+        frame = frame.rename(columns=lambda col: f' {col.upper() if not col.startswith(("G", "P")) else col} ')
+        renamed[name] = str(tmp_path / f'{name}.csv')
+        frame.to_csv(renamed[name], index=False)
+    loaded = CaseProfile.from_files(renamed['case_base'], renamed['relasi'], renamed['data_penyakit'])
+    assert loaded.disease_codes == profile.disease_codes
+    assert loaded.disease_names == profile.disease_names
+    assert (loaded.frequencies == profile.frequencies).all()
+
+def test_write_database(database, profile):
+    assert write_database(profile, 50, chunk_size=20) == 50
+    with db_funcs.get_connection() as cnx:
+        assert db_funcs.get_row_count(cnx, 'case_base_table') == 150
+        assert db_funcs.case_base_counts_match(cnx, full=True)
+
+def test_write_database_rejects_unknown_symptoms(database, profile):
+    with pytest.raises(ValueError, match='G22'):
+        write_database(profile.resized(n_symptoms=23), 10)
+    with db_funcs.get_connection() as cnx:
+        assert db_funcs.get_row_count(cnx, 'case_base_table') == 100
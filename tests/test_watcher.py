@@ -0,0 +1,81 @@
+import sqlite3
+import pytest
+import db_funcs
+from conftest import add_external_rows
+from watcher import ModelWatcher, CASE_BASE_TABLE, DETAILS_TABLE
+
+def execute(path, sql):
+    cnx = sqlite3.connect(path)
+    cnx.execute(sql)
+    cnx.commit()
+    cnx.close()
+
+@pytest.fixture(params=[1, 5], ids=['checksum', 'cheap'])
+def watcher(request, connection):
+    # Model dan tabel ringkasan dibuat seperti saat aplikasi berjalan, lalu sidik awal dicatat
+    db_funcs.get_case_base_counts(connection)
+    models = []
+    watcher = ModelWatcher(checksum_every=request.param, on_model=lambda model, version: models.append(model))
+    watcher.models = models
+    assert watcher.poll() == []
+    return watcher
+
+def test_own_writes_do_not_reload(watcher, connection):
+    db_funcs.write_cases(connection, [('P01', [1] * 21), ('P02', [0] * 21)])
+    assert watcher.poll() == []
+    db_funcs.write_cases(connection, [('P03', {'G02': 1})])
+    assert watcher.poll() == []
+    assert watcher.reloads == 0
+
+def test_external_insert_reloads(watcher, database, connection):
+    db_funcs.write_cases(connection, [('P01', [1] * 21)])
+    add_external_rows(database, 'P04', 2)
+    assert watcher.poll() == [CASE_BASE_TABLE]
+    assert watcher.reloads == 1
+    assert watcher.models[-1].total_cases == 103
+    assert watcher.poll() == []
+
+def test_external_update_reloads(watcher, database):
+    execute(database, "UPDATE case_base_table SET G01 = 1 - G01 WHERE penyakit = 'P02'")
+    # Perubahan nilai tanpa perubahan jumlah baris hanya terlihat pada putaran checksum
+    for _ in range(watcher.checksum_every):
+        if watcher.poll() == [CASE_BASE_TABLE]:
+            break
+    assert watcher.reloads == 1
+    with db_funcs.get_connection() as cnx:
+        assert db_funcs.case_base_counts_match(cnx, full=True)
+
+def test_details_change_is_detected(database, connection):
+    cleared = []
+    watcher = ModelWatcher(on_model=lambda model, version: None, on_details=lambda: cleared.append(True))
+    watcher.poll()
+    execute(database, "INSERT INTO disease_details_table (kode_penyakit, nama_penyakit) VALUES ('P02', 'Gastritis')")
+    assert watcher.poll() == [DETAILS_TABLE]
+    assert cleared == [True]
+
+# Case base diubah setelah tabel ringkasan dibuat (jumlah baris sama): putaran pertama membangun ulang model
+def test_first_poll_reconciles_stale_counts(database, connection):
+    db_funcs.get_case_base_counts(connection)
+    execute(database, "UPDATE case_base_table SET G05 = 1 - G05")
+    assert not db_funcs.case_base_counts_match(connection, full=True)
+    models = []
+    watcher = ModelWatcher(on_model=lambda model, version: models.append(model))
+    assert watcher.poll() == [CASE_BASE_TABLE]
+    assert len(models) == 1
+    assert db_funcs.case_base_counts_match(connection, full=True)
+    assert watcher.poll() == []
+
+# Kasus yang ditulis setelah watcher membangun ulang model tetap masuk ke model baru
+def test_own_write_after_reload_reaches_new_model(database, connection):
+    import nb
+    nb.get_model()
+    watcher = ModelWatcher(on_model=nb.swap_model)
+    watcher.poll()
+    add_external_rows(database, 'P04', 2)
+    assert watcher.poll() == [CASE_BASE_TABLE]
+    db_funcs.write_cases(connection, [('P01', [1] * 21)])
+    assert watcher.poll() == []
+    model = nb.get_model()
+    assert model.total_cases == 103
+    rebuilt = nb.load_model_from_db(connection)
+    assert (rebuilt.symptom_counts == model.symptom_counts).all()
@@ -0,0 +1,150 @@
+import logging
+import os
+import threading
+import time
+from metrics import metrics
+from db_funcs import (open_connection, get_table_fingerprint, get_rows_checksum, get_case_base_version,
+                      ensure_case_base_counts, rebuild_case_base_counts, case_base_counts_match, invalidate_tables,
+                      own_case_writes)
+from nb import load_model_from_db, swap_model
+from st_compat import cache_resource
+
+logger = logging.getLogger(__name__)
+
+# Watcher perubahan case_base_table dan disease_details_table dari luar aplikasi (mis. klinisi mengedit tabel
+# langsung). Setiap interval, sidik tabel (jumlah baris, d_case/kode terbesar) dibandingkan dengan putaran
+# sebelumnya; setiap CHECKSUM_EVERY putaran sidik juga memuat checksum seluruh baris, sehingga UPDATE yang
+# tidak mengubah jumlah baris tetap terdeteksi.
+# Kasus yang ditulis aplikasi ini sendiri (db_funcs.write_cases, sudah dimuat model lewat listener nb) ditambahkan
+# ke sidik acuan sebelum dibandingkan, sehingga hanya perubahan yang tidak dapat dijelaskan memicu pembangunan ulang.
+# Putaran pertama mencatat sidik awal dan mencocokkan tabel ringkasan dengan case_base_table (termasuk jumlah
+# 'Ya' per gejala): perubahan sejak tabel ringkasan terakhir diperbarui (mis. saat aplikasi mati, atau antara
+# model dimuat dan watcher mulai) ikut membangun ulang model.
+# Jika case base berubah, tabel ringkasan dan model dibangun ulang di thread watcher dengan koneksinya sendiri,
+# lalu dipasang dengan satu penggantian referensi (nb.swap_model): request tidak pernah menunggu pembangunan
+# ulang dan diagnosis yang sedang berjalan tetap memakai model lama sampai selesai.
+# Jika detail penyakit berubah, detail yang di-cache dibuang.
+#
+#   MODEL_WATCH_INTERVAL=30    interval pemeriksaan (detik); 0 = watcher mati
+
+WATCH_INTERVAL = 30.0
+CHECKSUM_EVERY = 10
+CASE_BASE_TABLE = 'case_base_table'
+DETAILS_TABLE = 'disease_details_table'
+
+class ModelWatcher:
+    def __init__(self, interval=WATCH_INTERVAL, checksum_every=CHECKSUM_EVERY, on_model=swap_model, on_details=None):
+        self.interval = interval
+        self.checksum_every = max(int(checksum_every), 1)
+        self.on_model = on_model        # on_model(model, versi case base saat pembangunan dimulai)
+        self.on_details = on_details    # dipanggil setelah disease_details_table berubah
+        self._fingerprints = {}         # tabel -> (jumlah baris dan kunci terbesar, checksum)
+        self._polls = 0
+        self._reconciled = False        # tabel ringkasan sudah dicocokkan dengan case_base_table
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+        self.reloads = 0
+        self.failed_polls = 0
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    # Putaran pertama langsung dijalankan untuk mencatat sidik awal
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Model watcher poll failed; will retry")
+                self.failed_polls += 1
+            if self._stop.wait(self.interval):
+                return
+
+    # Satu putaran pemeriksaan; mengembalikan daftar tabel yang berubah sejak putaran sebelumnya
+    def poll(self):
+        full = self._polls % self.checksum_every == 0
+        self._polls += 1
+        # Penulisan kasus aplikasi ditahan sampai model baru terpasang: kasus yang di-commit sesudahnya
+        # ditambahkan ke model baru oleh listener nb, bukan dilewatkan sebagai tulisan sendiri
+        with open_connection() as cnx, own_case_writes() as own_ids:
+            changed = [table for table in (CASE_BASE_TABLE, DETAILS_TABLE)
+                       if self._changed(cnx, table, full, own_ids if table == CASE_BASE_TABLE else ())]
+            if not self._reconciled:
+                ensure_case_base_counts(cnx)
+                if CASE_BASE_TABLE not in changed and not case_base_counts_match(cnx, full=True):
+                    logger.info("Case base counts are stale at watcher start; rebuilding")
+                    changed.insert(0, CASE_BASE_TABLE)
+            if CASE_BASE_TABLE in changed:
+                self._reload_model(cnx)
+            self._reconciled = True
+        if DETAILS_TABLE in changed:
+            invalidate_tables(DETAILS_TABLE)
+            if self.on_details is not None:
+                self.on_details()
+        for table in changed:
+            metrics.inc('model_watch_changes_total', table=table)
+        return changed
+
+    # own_ids: d_case yang ditulis aplikasi sendiri sejak putaran sebelumnya (sudah ikut dalam sidik saat ini)
+    def _changed(self, cnx, table, full, own_ids=()):
+        fingerprint = get_table_fingerprint(cnx, table, checksum=full)
+        if fingerprint is None:
+            return False
+        cheap, checksum = fingerprint[:2], fingerprint[2:] if full else None
+        previous = self._fingerprints.get(table)
+        if previous is None:
+            if checksum is None:
+                checksum = (get_table_fingerprint(cnx, table, checksum=True) or ())[2:]
+            self._fingerprints[table] = (cheap, checksum)
+            return False
+        if own_ids:
+            previous = self._expected(cnx, table, previous, own_ids)
+        if not full:
+            checksum = previous[1]
+            # Checksum acuan ikut diperbarui agar putaran checksum berikutnya tidak melaporkan perubahan yang sama
+            if cheap != previous[0]:
+                checksum = (get_table_fingerprint(cnx, table, checksum=True) or ())[2:]
+        self._fingerprints[table] = (cheap, checksum)
+        return (cheap, checksum) != previous
+
+    # Sidik acuan ditambah kasus yang ditulis sendiri: jumlah baris, d_case terbesar (perbandingan string,
+    # sama seperti MAX di SQL) dan checksum baris-baris tersebut
+    def _expected(self, cnx, table, previous, own_ids):
+        (count, largest), checksum = previous
+        largest = max(own_ids) if largest is None else max(largest, *own_ids)
+        if checksum:
+            own_checksum = get_rows_checksum(cnx, table, 'd_case', own_ids)
+            checksum = (None,) if own_checksum is None else ((checksum[0] or 0) + own_checksum,)
+        return (count + len(own_ids), largest), checksum
+
+    # Tabel ringkasan dibangun ulang dari case_base_table (perubahan dari luar tidak memperbaruinya),
+    # lalu model baru dibangun penuh sebelum dipasang
+    def _reload_model(self, cnx):
+        start = time.perf_counter()
+        version = get_case_base_version()
+        ensure_case_base_counts(cnx)
+        rebuild_case_base_counts(cnx)
+        invalidate_tables(CASE_BASE_TABLE)
+        model = load_model_from_db(cnx)
+        self.on_model(model, version)
+        self.reloads += 1
+        seconds = time.perf_counter() - start
+        metrics.observe('model_reload_seconds', seconds)
+        logger.info("Case base changed; model rebuilt from %d cases in %.2fs", model.total_cases, seconds)
+
+def watch_interval():
+    return float(os.environ.get('MODEL_WATCH_INTERVAL', WATCH_INTERVAL))
+
+# Satu watcher per proses untuk model yang dipakai get_model (app.py); None jika dimatikan
+@cache_resource
+def start_model_watcher():
+    interval = watch_interval()
+    if interval <= 0 or os.environ.get('KNOWLEDGE_BASE'):
+        return None
+    return ModelWatcher(interval).start()